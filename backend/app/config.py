@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 
 class Settings(BaseSettings):
     GEMINI_API_KEY: str
@@ -9,11 +10,76 @@ class Settings(BaseSettings):
     REDIS_PORT: int = 6379
     REDIS_DB: int = 0
     CACHE_TTL: int = 3600  # 1 hour in seconds
+    CACHE_STALE_TTL: int = 86400  # Serve stale LLM outputs for up to 24h while refreshing
     DATABASE_URL: str = "sqlite:////app/data/hirehub.db"
     EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
     EMBEDDING_DIMENSION: int = 384
     GEMINI_TIMEOUT: int = 20  # 20 seconds timeout for Gemini API calls
     GEMINI_MAX_RETRIES: int = 0  # No retries - fail fast (Gemini API is highly reliable)
+    REQUEST_BUDGET_SECONDS: int = 45  # End-to-end budget for one /api/upload-cv request
+    SCORING_MODE: str = "llm"  # fast (local only) | llm (Gemini) | hybrid (fast now, LLM wording later)
+    FAST_SCORE_SKILL_SIMILARITY: float = 0.8  # Embedding cosine needed to count a skill as matched
+    PROMPT_COMPACTION_ENABLED: bool = True  # Project generator inputs onto per-generator profiles + token budgets
+    LLM_COMPACT_OUTPUT: bool = False  # Large generators answer with short keys/positional rows, expanded locally
+    CV_OPTIMIZE_MODE: str = "full"  # full (re-emit whole CV) | patch (model returns edits, applied locally)
+    PIPELINE_MODE: str = "sequential"  # sequential | speculative (questions from estimated gaps) | fused (one LLM call)
+    PIPELINE_PROCESS_WORKERS: int = 2  # Pool for CPU-bound pipeline stages (file extraction); 0 runs them in threads
+
+    UPLOAD_DEDUPE_ENABLED: bool = True  # Same CV + JD text (or Idempotency-Key) returns the existing analysis
+
+    # Background analysis jobs (POST /api/upload-cv/jobs)
+    JOB_QUEUE_BACKEND: str = "local"  # local (in-process queue) | redis (shared list, survives restarts)
+    JOB_WORKERS: int = 4  # Pipelines run concurrently per process
+    JOB_MAX_ATTEMPTS: int = 3  # Automatic attempts, each resuming from the last completed stage
+    JOB_BUDGET_SECONDS: int = 120  # Deadline budget per attempt (no proxy timeout to stay under)
+    JOB_STALE_SECONDS: int = 600  # Redis backend: a "running" job untouched this long is re-queued at startup
+
+    # Downstream artifacts generated ahead of the first GET, after submit-answers
+    PRECOMPUTE_ARTIFACTS: str = "cover_letter,learning_path,interview_prep"  # Comma-separated; empty disables
+    PRECOMPUTE_WORKERS: int = 1  # Background generations running at once per process
+    PRECOMPUTE_GATE_SHARE: float = 0.5  # Only start one while the LLM gate is below this share of its limit
+
+    # Bulk ranking of many CVs against one JD (POST /api/rank-cvs/stream)
+    BULK_RANK_MAX_FILES: int = 500
+    BULK_RANK_TOP_K: int = 10  # Default shortlist re-scored by the LLM; the rest keep the fast score
+    BULK_RANK_LLM_CONCURRENCY: int = 8  # Gemini calls in flight per bulk request (CV parses + refinements)
+    BULK_RANK_EMBED_BATCH_SIZE: int = 256  # Texts per embedding model batch
+
+    # Shared LLM gate: adaptive concurrency limit + circuit breaker
+    LLM_GATE_INITIAL_LIMIT: int = 8  # Concurrent Gemini calls allowed at startup
+    LLM_GATE_MIN_LIMIT: int = 1
+    LLM_GATE_MAX_LIMIT: int = 32
+    LLM_GATE_BACKOFF_RATIO: float = 0.7  # Multiplicative decrease on 429/timeout/slow calls
+    LLM_BREAKER_ERROR_RATE: float = 0.5  # Open the breaker at 50% upstream errors...
+    LLM_BREAKER_MIN_CALLS: int = 10  # ...once at least this many calls are in the window
+    LLM_BREAKER_WINDOW_SECONDS: int = 30
+    LLM_BREAKER_COOLDOWN_SECONDS: int = 15  # Fail fast this long before a half-open probe
+    LLM_GATE_SHARED_STATE: bool = False  # Share limit decreases / breaker state across workers via Redis
+
+    # Hedged LLM requests (duplicate slow calls once, first good response wins)
+    LLM_HEDGING_ENABLED: bool = False
+    LLM_HEDGE_PERCENTILE: float = 0.9  # Hedge calls still running past this latency percentile
+    LLM_HEDGE_BUDGET_RATIO: float = 0.05  # At most ~5% extra calls
+    LLM_HEDGE_MIN_SAMPLES: int = 20  # Latency samples needed before hedging an operation
+
+    # Distributed (Redis) token-bucket limiter for the Gemini quota, shared by all workers
+    RATE_LIMIT_ENABLED: bool = True
+    GEMINI_RPM_LIMIT: int = 1000  # Requests per minute
+    GEMINI_TPM_LIMIT: int = 1000000  # Estimated input + output tokens per minute
+
+    # Offline LLM stand-in for benchmarks and CI (canned JSON, simulated latency)
+    LLM_BACKEND: str = "gemini"  # gemini | fake
+    FAKE_LLM_LATENCY_MEDIAN: float = 2.0  # Seconds, log-normal median
+    FAKE_LLM_LATENCY_SIGMA: float = 0.4
+    FAKE_LLM_TAIL_PROBABILITY: float = 0.02  # Share of calls hitting the slow tail...
+    FAKE_LLM_TAIL_MULTIPLIER: float = 5.0  # ...and how much slower they are
+    FAKE_LLM_SECONDS_PER_OUTPUT_TOKEN: float = 0.0  # Extra latency per generated token
+    FAKE_LLM_FIRST_CHUNK_SHARE: float = 0.15  # Streamed calls: share of the latency spent before the first chunk
+    FAKE_LLM_RATE_LIMIT_RATE: float = 0.0  # Share of calls failing with 429
+    FAKE_LLM_TIMEOUT_RATE: float = 0.0  # Share of calls that hang until the caller times out
+    FAKE_LLM_HANG_SECONDS: float = 60.0  # How long a "timeout" call hangs if nobody cancels it
+    FAKE_LLM_TIME_SCALE: float = 1.0  # Multiply all simulated delays (0.01 = 100x faster)
+    FAKE_LLM_SEED: Optional[int] = None  # Fixed seed for reproducible latency/failure draws
 
     class Config:
         env_file = ".env"
@@ -1,25 +1,52 @@
-from fastapi import FastAPI, File, UploadFile, Form, Depends, HTTPException
+from fastapi import FastAPI, File, UploadFile, Form, Depends, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
+from typing import Callable, List, Optional
 import os
+import uuid
+import json
 import shutil
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
-from app.database import get_db
-from app.models import CVAnalysis
-from app.services.cv_parser import extract_text_from_pdf, extract_text_from_docx, parse_cv_with_gemini, store_cv_embeddings
-from app.services.jd_analyzer import analyze_jd_with_gemini, store_jd_embeddings
-from app.services.scorer import calculate_compatibility_score
-from app.services.question_gen import generate_smart_questions
-from app.services.cv_optimizer import optimize_cv, generate_cv_pdf
-from app.services.cover_letter_gen import generate_cover_letter, generate_cover_letter_pdf
-from app.services.learning_recommender import generate_learning_recommendations
-from app.services.interview_prep import generate_interview_prep
-from app.services.qdrant_service import init_collections, store_cv_embedding, store_jd_embedding
-from app.services.embeddings import get_embedding_model, generate_cv_jd_embeddings_batch
+from app.config import get_settings
+from app.database import get_db, SessionLocal
+from app.models import CVAnalysis, AnalysisJob, CVProfile
+from app.services.scorer import SCORING_MODES
+from app.services.question_gen import speculation_stats
+from app.services.pipeline import (
+    SUPPORTED_EXTENSIONS,
+    PROFILE_COMPLETED_STAGES,
+    new_pipeline_state,
+    new_profile_pipeline_state,
+    run_pipeline,
+    pipeline_response,
+    pipeline_stats,
+    shutdown_process_pool
+)
+from app.services.job_queue import job_workers, job_status, new_job_stages
+from app.services.bulk_rank import rank_cvs
+from app.services.upload_dedupe import upload_deduplicator
+from app.services.cv_profiles import create_cv_profile
+from app.services.precompute import precomputer, POLICY as PRECOMPUTE_POLICY, ARTIFACTS, ArtifactNotReady
+from app.services.cv_optimizer import optimize_cv_async, generate_cv_pdf, build_cv_optimize_prompt, CV_OPTIMIZE_GENERATION_CONFIG
+from app.services.cover_letter_gen import (
+    generate_cover_letter_pdf,
+    build_cover_letter_prompt,
+    COVER_LETTER_GENERATION_CONFIG
+)
+from app.services.interview_prep import build_interview_prep_prompt, INTERVIEW_PREP_GENERATION_CONFIG
+from app.services.qdrant_service import init_collections
+from app.services.embeddings import get_embedding_model
 from app.services.cache_service import is_redis_available
+from app.services.deadline import RequestDeadline
+from app.services.llm_gate import llm_gate
+from app.services.llm_client import llm_stats, stream_json_async
+from app.services.hedging import hedger
+from app.services.rate_limiter import rate_limiter
+from app.services.prompt_compaction import compaction_stats
+
+settings = get_settings()
 
 # Create necessary directories
 os.makedirs("/app/data", exist_ok=True)
@@ -37,11 +64,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# OPTIMIZATION: Gzip compression for responses > 1KB
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+class StreamFriendlyGZipMiddleware(GZipMiddleware):
+    """Gzip except for /stream endpoints - it holds streamed chunks back until its buffer fills"""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].endswith("/stream"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
 
-# Thread pool for parallel execution
-executor = ThreadPoolExecutor(max_workers=4)
+# OPTIMIZATION: Gzip compression for responses > 1KB
+app.add_middleware(StreamFriendlyGZipMiddleware, minimum_size=1000)
 
 # Initialize services on startup
 @app.on_event("startup")
@@ -67,8 +100,21 @@ async def startup_event():
     else:
         print("   ⚠️  Redis cache unavailable (caching disabled)")
 
+    # Background analysis jobs; interrupted ones resume from their checkpoint
+    job_workers.start(settings.JOB_WORKERS)
+    await job_workers.recover()
+
+    # Cover letter / learning path / interview prep generated ahead of the first GET
+    precomputer.start(settings.PRECOMPUTE_WORKERS)
+
     print("✅ HireHubAI Backend Ready!")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await job_workers.stop()
+    await precomputer.stop()
+    shutdown_process_pool()
+
 @app.get("/")
 def root():
     return {
@@ -81,120 +127,327 @@ def root():
 def health_check():
     return {"status": "healthy"}
 
+@app.get("/api/metrics")
+def get_metrics():
+    """Per-operation LLM stats, gate state (concurrency limit, breaker, queue times), hedging, quota, prompt-size,
+    pipeline stage/critical-path, job queue, precompute and upload dedupe stats"""
+    return {
+        "llm": llm_stats.snapshot(),
+        "llm_gate": llm_gate.stats(),
+        "hedging": hedger.stats(),
+        "rate_limiter": rate_limiter.stats(),
+        "speculation": dict(speculation_stats),
+        "prompt_compaction": compaction_stats.snapshot(),
+        "pipeline": pipeline_stats.snapshot(),
+        "jobs": job_workers.stats(),
+        "precompute": precomputer.stats(),
+        "dedupe": upload_deduplicator.stats()
+    }
+
+def _save_upload(file: UploadFile, prefix: Optional[str] = None) -> str:
+    """Store the uploaded CV under /app/uploads, rejecting unsupported types"""
+    if not file.filename.endswith(SUPPORTED_EXTENSIONS):
+        raise HTTPException(status_code=400, detail="Only PDF, DOCX, and TXT files supported")
+    if prefix is None:
+        # Unique per upload: a concurrent duplicate must not truncate the file while it is being extracted
+        prefix = f"{uuid.uuid4().hex[:8]}_"
+    file_path = f"/app/uploads/{prefix}{file.filename}"
+    with open(file_path, "wb") as buffer:
+        shutil.copyfileobj(file.file, buffer)
+    return file_path
+
+def _validate_scoring_mode(scoring_mode: Optional[str]):
+    if scoring_mode and scoring_mode not in SCORING_MODES:
+        raise HTTPException(status_code=400, detail=f"scoring_mode must be one of {', '.join(SCORING_MODES)}")
+
 @app.post("/api/upload-cv")
 async def upload_cv(
     file: UploadFile = File(...),
     jd_text: str = Form(...),
+    scoring_mode: Optional[str] = Form(None),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     db: Session = Depends(get_db)
 ):
-    """Step 1: Upload CV and JD, get analysis with RAG"""
-
-    try:
-        # Save uploaded file
-        file_path = f"/app/uploads/{file.filename}"
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-
-        # Extract text from CV
-        if file.filename.endswith('.pdf'):
-            cv_text = extract_text_from_pdf(file_path)
-        elif file.filename.endswith('.docx'):
-            cv_text = extract_text_from_docx(file_path)
-        elif file.filename.endswith('.txt'):
-            # Support .txt files for testing
-            with open(file_path, 'r', encoding='utf-8') as f:
-                cv_text = f.read()
-        else:
-            raise HTTPException(status_code=400, detail="Only PDF, DOCX, and TXT files supported")
-
-        # OPTIMIZATION: Parse CV and JD in parallel (saves ~5-6 seconds)
-        print("⚡ Running CV parsing and JD analysis in parallel...")
-        loop = asyncio.get_event_loop()
+    """Step 1: Upload CV and JD, get analysis with RAG (a repeated upload returns the existing analysis)"""
 
-        cv_parse_future = loop.run_in_executor(executor, parse_cv_with_gemini, cv_text)
-        jd_parse_future = loop.run_in_executor(executor, analyze_jd_with_gemini, jd_text)
+    _validate_scoring_mode(scoring_mode)
 
-        # Wait for both to complete
-        cv_parsed, jd_parsed = await asyncio.gather(cv_parse_future, jd_parse_future)
+    # One budget for the whole request; every stage gets what is left of it
+    deadline = RequestDeadline()
 
-        # Create database entry first
-        analysis = CVAnalysis(
-            cv_filename=file.filename,
-            cv_text=cv_text,
-            cv_parsed=cv_parsed,
-            jd_text=jd_text,
-            jd_parsed=jd_parsed
-        )
-
-        db.add(analysis)
-        db.commit()
-        db.refresh(analysis)
-
-        # OPTIMIZATION: Generate all embeddings in batch (saves ~1.7 seconds)
-        print("⚡ Generating embeddings in batch...")
-        embeddings_batch = generate_cv_jd_embeddings_batch(cv_parsed, jd_parsed)
-
-        # Store CV embedding in Qdrant
-        cv_embedding_id = store_cv_embedding(
-            cv_id=analysis.id,
-            text=embeddings_batch['cv_full']['text'],
-            embedding=embeddings_batch['cv_full']['embedding'],
-            metadata={
-                "section": "full",
-                "name": cv_parsed.get('personal_info', {}).get('name', 'Unknown'),
-                "years_of_experience": cv_parsed.get('years_of_experience', 0)
-            }
-        )
+    try:
+        # Save uploaded file
+        file_path = _save_upload(file)
 
-        # Store JD embedding in Qdrant
-        jd_embedding_id = store_jd_embedding(
-            jd_id=analysis.id,
-            text=embeddings_batch['jd_full']['text'],
-            embedding=embeddings_batch['jd_full']['embedding'],
-            metadata={
-                "requirement_type": "full",
-                "position": jd_parsed.get('position_title', 'Unknown'),
-                "company": jd_parsed.get('company_name', 'Unknown')
-            }
-        )
+        state = new_pipeline_state(file.filename, file_path, jd_text, scoring_mode)
+        return await upload_deduplicator.run(state, db, deadline, idempotency_key)
 
-        # Update with embedding IDs
-        analysis.cv_embedding_id = cv_embedding_id
-        analysis.jd_embedding_id = jd_embedding_id
-        db.commit()
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in upload_cv: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # Calculate compatibility score with RAG (ASYNC)
-        print("⚡ Running compatibility scoring (async)...")
-        score_data = await calculate_compatibility_score(cv_parsed, jd_parsed, analysis.id)
+def _format_event(event: str, payload: dict, sse: bool) -> str:
+    if sse:
+        return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+    return json.dumps({"event": event, **payload}) + "\n"
 
-        # Generate smart questions with RAG (ASYNC)
-        top_gaps = score_data.get('top_gaps', [])
-        print("⚡ Running question generation (async)...")
-        questions = await generate_smart_questions(cv_parsed, jd_parsed, top_gaps, analysis.id)
+@app.post("/api/upload-cv/stream")
+async def upload_cv_stream(
+    request: Request,
+    file: UploadFile = File(...),
+    jd_text: str = Form(...),
+    scoring_mode: Optional[str] = Form(None),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """
+    Step 1, streamed: one event per result as soon as it exists - cv_parsed,
+    jd_parsed, score, gaps, questions, analysis - then complete (the usual
+    upload-cv response) or error. NDJSON by default, SSE with
+    Accept: text/event-stream. A repeated upload gets only complete.
+    """
+
+    _validate_scoring_mode(scoring_mode)
+    file_path = _save_upload(file)
+    sse = "text/event-stream" in request.headers.get("accept", "")
+    state = new_pipeline_state(file.filename, file_path, jd_text, scoring_mode)
+
+    async def event_stream():
+        events: asyncio.Queue = asyncio.Queue()
+
+        async def run():
+            # Own session: the request's dependencies close before streaming ends
+            db = SessionLocal()
+            try:
+                response = await upload_deduplicator.run(
+                    state, db, RequestDeadline(), idempotency_key,
+                    on_event=lambda event, payload: events.put_nowait((event, payload))
+                )
+                events.put_nowait(("complete", response))
+            except Exception as e:
+                print(f"Error in upload_cv_stream: {e}")
+                events.put_nowait(("error", {"detail": str(e)}))
+            finally:
+                db.close()
+
+        task = asyncio.create_task(run())
+        try:
+            while True:
+                event, payload = await events.get()
+                yield _format_event(event, payload, sse)
+                if event in ("complete", "error"):
+                    break
+        finally:
+            # Client went away: stop spending LLM calls on it
+            task.cancel()
+
+    media_type = "text/event-stream" if sse else "application/x-ndjson"
+    return StreamingResponse(event_stream(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+@app.post("/api/rank-cvs/stream")
+async def rank_cvs_stream(
+    files: List[UploadFile] = File(...),
+    jd_text: str = Form(...),
+    top_k: int = Form(settings.BULK_RANK_TOP_K)
+):
+    """
+    Rank many CVs against one JD, streamed as NDJSON: jd_parsed, shortlist,
+    one candidate per CV in rank order (the top_k re-scored by the LLM),
+    failed for unreadable CVs, then complete or error. Nothing is stored.
+    """
+
+    if len(files) > settings.BULK_RANK_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {settings.BULK_RANK_MAX_FILES} CVs per request")
+    if top_k < 0:
+        raise HTTPException(status_code=400, detail="top_k must not be negative")
+
+    # Batch + position prefix: recruiters' files often share names (cv.pdf, resume.pdf)
+    batch_id = uuid.uuid4().hex[:8]
+    uploads = [(file.filename, _save_upload(file, prefix=f"bulk_{batch_id}_{i}_")) for i, file in enumerate(files)]
+
+    async def event_stream():
+        try:
+            async for event, payload in rank_cvs(uploads, jd_text, top_k):
+                yield _format_event(event, payload, sse=False)
+        except Exception as e:
+            print(f"Error in rank_cvs_stream: {e}")
+            yield _format_event("error", {"detail": str(e)}, sse=False)
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson", headers={"Cache-Control": "no-cache"})
+
+@app.post("/api/upload-cv/jobs", status_code=202)
+async def upload_cv_job(
+    file: UploadFile = File(...),
+    jd_text: str = Form(...),
+    scoring_mode: Optional[str] = Form(None),
+    db: Session = Depends(get_db)
+):
+    """Step 1 as a background job: returns a job ID to poll at /api/jobs/{job_id}"""
+
+    _validate_scoring_mode(scoring_mode)
+
+    job = AnalysisJob(stages=new_job_stages())
+    db.add(job)
+    db.flush()
+
+    # Job ID prefix keeps queued uploads with the same filename apart
+    file_path = _save_upload(file, prefix=f"{job.id}_")
+    job.state = new_pipeline_state(file.filename, file_path, jd_text, scoring_mode)
+    db.commit()
+
+    await job_workers.enqueue(job.id)
+    return {"job_id": job.id, "status": job.status, "status_url": f"/api/jobs/{job.id}"}
+
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: str, db: Session = Depends(get_db)):
+    """Per-stage progress of a background analysis, with results as stages complete"""
+    job = db.query(AnalysisJob).filter(AnalysisJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_status(job)
+
+@app.post("/api/jobs/{job_id}/retry", status_code=202)
+async def retry_job(job_id: str, db: Session = Depends(get_db)):
+    """Re-queue a failed job; it resumes from its last completed stage"""
+    job = db.query(AnalysisJob).filter(AnalysisJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status != "failed":
+        raise HTTPException(status_code=409, detail=f"Only failed jobs can be retried (job is {job.status})")
+
+    job.status = "queued"
+    job.attempts = 0
+    db.commit()
+    await job_workers.enqueue(job.id)
+    return job_status(job)
+
+def _profile_response(profile: CVProfile) -> dict:
+    return {
+        "id": profile.id,
+        "filename": profile.cv_filename,
+        "name": (profile.cv_parsed.get("personal_info") or {}).get("name"),
+        "sections": list((profile.section_embedding_ids or {}).keys()),
+        "cv_parsed": profile.cv_parsed,
+        "created_at": profile.created_at.isoformat() if profile.created_at else None
+    }
 
-        # Update analysis with results
-        analysis.compatibility_score = score_data.get('overall_score')
-        analysis.score_breakdown = score_data.get('breakdown')
-        analysis.gaps = top_gaps
-        analysis.strengths = score_data.get('strengths', [])
-        analysis.questions = questions
-        analysis.answers = {}
+@app.post("/api/cv-profiles", status_code=201)
+async def create_cv_profile_endpoint(file: UploadFile = File(...), db: Session = Depends(get_db)):
+    """Parse and embed a CV once, for analysis against any number of JDs"""
 
-        db.commit()
+    # Its own prefix: profiles outlive the upload and must not share a path with later uploads
+    file_path = _save_upload(file, prefix=f"profile_{uuid.uuid4().hex[:8]}_")
+    try:
+        profile = await create_cv_profile(file.filename, file_path, db)
+    except ValueError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    except Exception as e:
+        print(f"Error in create_cv_profile: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    return _profile_response(profile)
+
+@app.get("/api/cv-profiles/{profile_id}")
+def get_cv_profile(profile_id: str, db: Session = Depends(get_db)):
+    profile = db.query(CVProfile).filter(CVProfile.id == profile_id).first()
+    if not profile:
+        raise HTTPException(status_code=404, detail="CV profile not found")
+    return _profile_response(profile)
+
+@app.post("/api/cv-profiles/{profile_id}/analyze")
+async def analyze_cv_profile(
+    profile_id: str,
+    jd_text: str = Form(...),
+    scoring_mode: Optional[str] = Form(None),
+    db: Session = Depends(get_db)
+):
+    """Step 1 for a stored profile: same response as /api/upload-cv, without re-extracting or re-parsing the CV"""
 
-        return {
-            "id": analysis.id,
-            "score": score_data.get('overall_score'),
-            "breakdown": score_data.get('breakdown'),
-            "gaps": top_gaps,
-            "strengths": score_data.get('strengths'),
-            "questions": questions
-        }
+    _validate_scoring_mode(scoring_mode)
+    profile = db.query(CVProfile).filter(CVProfile.id == profile_id).first()
+    if not profile:
+        raise HTTPException(status_code=404, detail="CV profile not found")
 
+    try:
+        state = new_profile_pipeline_state(profile, jd_text, scoring_mode)
+        await run_pipeline(state, db, RequestDeadline(), completed=PROFILE_COMPLETED_STAGES)
+        return pipeline_response(state)
     except Exception as e:
-        print(f"Error in upload_cv: {e}")
+        print(f"Error in analyze_cv_profile: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _generation_stream(
+    analysis: CVAnalysis,
+    operation: str,
+    build_prompt: Callable[[dict], str],
+    generation_config: dict,
+    save: Callable[[CVAnalysis, dict], None]
+) -> StreamingResponse:
+    """
+    SSE stream of one long-form generation: delta {text} per chunk, field
+    {name, value} per completed top-level field, then complete {id, result}
+    or error. Only the final result is persisted (via save).
+    """
+
+    analysis_id = analysis.id
+    # Encoded prompt fragments memoised across this analysis' generators
+    fragments = dict(analysis.prompt_fragments or {})
+
+    async def event_stream():
+        try:
+            # Prompt building does RAG lookups (embeddings + Qdrant), which block
+            prompt = await asyncio.to_thread(build_prompt, fragments)
+            result = None
+            async for kind, value in stream_json_async(operation, prompt, generation_config):
+                if kind == "delta":
+                    yield _format_event("delta", {"text": value}, sse=True)
+                elif kind == "field":
+                    yield _format_event("field", {"name": value[0], "value": value[1]}, sse=True)
+                else:
+                    result = value
+
+            # Own session: the request's dependencies close before streaming ends
+            db = SessionLocal()
+            try:
+                stored = db.query(CVAnalysis).filter(CVAnalysis.id == analysis_id).first()
+                save(stored, result)
+                stored.prompt_fragments = fragments
+                db.commit()
+            finally:
+                db.close()
+            yield _format_event("complete", {"id": analysis_id, "result": result}, sse=True)
+        except Exception as e:
+            print(f"Error streaming {operation}: {e}")
+            yield _format_event("error", {"detail": str(e)}, sse=True)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+def _attached_stream(analysis_id: str, artifact: str) -> StreamingResponse:
+    """Stream for an artifact already being precomputed: no tokens to forward, complete once that run is stored"""
+    async def attached():
+        try:
+            result = await precomputer.generate(analysis_id, artifact)
+            yield _format_event("complete", {"id": analysis_id, "result": result}, sse=True)
+        except Exception as e:
+            yield _format_event("error", {"detail": str(e)}, sse=True)
+    return StreamingResponse(attached(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+def _clear_precomputed(analysis: CVAnalysis):
+    """New answers: drop artifacts built from the old ones; precompute rebuilds them"""
+    for artifact in PRECOMPUTE_POLICY:
+        # The learning path comes from the score and gaps - the answers leave it valid
+        if ARTIFACTS[artifact].needs_optimized_cv:
+            setattr(analysis, ARTIFACTS[artifact].column, None)
+
+def _store_optimized(analysis: CVAnalysis, answers: dict, optimized: dict) -> bool:
+    """Save answers and optimized CV; True if either changed (stored artifacts are then stale)"""
+    changed = answers != (analysis.answers or {}) or optimized != analysis.optimized_cv
+    analysis.answers = answers
+    analysis.optimized_cv = optimized
+    if changed:
+        _clear_precomputed(analysis)
+    return changed
+
 @app.post("/api/submit-answers/{analysis_id}")
 async def submit_answers(
     analysis_id: str,
@@ -208,19 +461,27 @@ async def submit_answers(
         if not analysis:
             raise HTTPException(status_code=404, detail="Analysis not found")
 
-        # Save answers
-        analysis.answers = answers
+        # Encoded prompt fragments memoised across this analysis' generators
+        fragments = dict(analysis.prompt_fragments or {})
 
-        # Generate optimized CV with RAG
-        optimized = optimize_cv(
+        # Generate optimized CV with RAG (patch mode diffs against the previous submission)
+        optimized = await optimize_cv_async(
             analysis.cv_parsed,
             analysis.jd_parsed,
             answers,
-            analysis.id
+            analysis.id,
+            previous_optimized=analysis.optimized_cv,
+            previous_answers=analysis.answers or {},
+            fragments=fragments
         )
-        analysis.optimized_cv = optimized
+
+        # Save answers; unchanged ones keep the stored cover letter / interview prep
+        changed = _store_optimized(analysis, answers, optimized)
+        analysis.prompt_fragments = fragments
 
         db.commit()
+        if changed:
+            precomputer.schedule(analysis_id)
 
         return {
             "id": analysis_id,
@@ -232,6 +493,31 @@ async def submit_answers(
         print(f"Error in submit_answers: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/submit-answers/{analysis_id}/stream")
+async def submit_answers_stream(
+    analysis_id: str,
+    answers: dict,
+    db: Session = Depends(get_db)
+):
+    """Step 2, streamed over SSE: the optimized CV as it is generated (always the full-CV prompt)"""
+
+    analysis = db.query(CVAnalysis).filter(CVAnalysis.id == analysis_id).first()
+    if not analysis:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+
+    cv_parsed, jd_parsed = analysis.cv_parsed, analysis.jd_parsed
+
+    def save(stored: CVAnalysis, optimized: dict):
+        if _store_optimized(stored, answers, optimized):
+            # Queued only; workers pick it up after the commit that follows
+            precomputer.schedule(analysis_id)
+
+    return _generation_stream(
+        analysis, "cv_optimize",
+        lambda fragments: build_cv_optimize_prompt(cv_parsed, jd_parsed, answers, analysis_id, fragments),
+        CV_OPTIMIZE_GENERATION_CONFIG, save
+    )
+
 @app.get("/api/download-cv/{analysis_id}")
 async def download_cv(
     analysis_id: str,
@@ -251,7 +537,8 @@ async def download_cv(
         output_filename = f"optimized_cv_{analysis_id}.pdf"
         output_path = f"/app/outputs/{output_filename}"
 
-        generate_cv_pdf(analysis.optimized_cv, output_path)
+        # reportlab rendering is CPU work - keep it off the event loop
+        await asyncio.to_thread(generate_cv_pdf, analysis.optimized_cv, output_path)
 
         return FileResponse(
             output_path,
@@ -307,18 +594,8 @@ async def generate_cover_letter_endpoint(
         if not analysis.optimized_cv:
             raise HTTPException(status_code=400, detail="CV not optimized yet. Please answer questions first.")
 
-        # Generate cover letter
-        cover_letter = generate_cover_letter(
-            analysis.cv_parsed,
-            analysis.jd_parsed,
-            analysis.answers or {},
-            analysis.optimized_cv,
-            analysis.id
-        )
-
-        # Save to database
-        analysis.cover_letter = cover_letter
-        db.commit()
+        # Generate and save cover letter (joins a precompute run already in flight)
+        cover_letter = await precomputer.generate(analysis_id, "cover_letter")
 
         return {
             "id": analysis_id,
@@ -326,10 +603,42 @@ async def generate_cover_letter_endpoint(
             "cover_letter": cover_letter
         }
 
+    except HTTPException:
+        raise
+    except ArtifactNotReady as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         print(f"Error in generate_cover_letter: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/generate-cover-letter/{analysis_id}/stream")
+async def generate_cover_letter_stream(
+    analysis_id: str,
+    db: Session = Depends(get_db)
+):
+    """Phase 7, streamed over SSE: the cover letter paragraph by paragraph"""
+
+    analysis = db.query(CVAnalysis).filter(CVAnalysis.id == analysis_id).first()
+    if not analysis:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+
+    if not analysis.optimized_cv:
+        raise HTTPException(status_code=400, detail="CV not optimized yet. Please answer questions first.")
+
+    if precomputer.is_running(analysis_id, "cover_letter"):
+        return _attached_stream(analysis_id, "cover_letter")
+
+    jd_parsed, answers, optimized_cv = analysis.jd_parsed, analysis.answers or {}, analysis.optimized_cv
+
+    def save(stored: CVAnalysis, cover_letter: dict):
+        stored.cover_letter = cover_letter
+
+    return _generation_stream(
+        analysis, "cover_letter",
+        lambda fragments: build_cover_letter_prompt(jd_parsed, answers, optimized_cv, analysis_id, fragments),
+        COVER_LETTER_GENERATION_CONFIG, save
+    )
+
 @app.get("/api/download-cover-letter/{analysis_id}")
 async def download_cover_letter(
     analysis_id: str,
@@ -349,7 +658,8 @@ async def download_cover_letter(
         output_filename = f"cover_letter_{analysis_id}.pdf"
         output_path = f"/app/outputs/{output_filename}"
 
-        generate_cover_letter_pdf(
+        await asyncio.to_thread(
+            generate_cover_letter_pdf,
             analysis.cover_letter,
             analysis.cv_parsed,
             analysis.jd_parsed,
@@ -378,22 +688,9 @@ async def get_learning_recommendations(
         if not analysis:
             raise HTTPException(status_code=404, detail="Analysis not found")
 
-        # Generate if not already cached
+        # Generate if not already cached (or precomputing - then wait for that run)
         if not analysis.learning_recommendations:
-            learning_path = generate_learning_recommendations(
-                analysis.cv_parsed,
-                analysis.jd_parsed,
-                analysis.gaps or [],
-                {
-                    "overall_score": analysis.compatibility_score,
-                    "breakdown": analysis.score_breakdown
-                },
-                analysis.id
-            )
-
-            # Save to database
-            analysis.learning_recommendations = learning_path
-            db.commit()
+            learning_path = await precomputer.generate(analysis_id, "learning_path")
         else:
             learning_path = analysis.learning_recommendations
 
@@ -402,6 +699,10 @@ async def get_learning_recommendations(
             "learning_recommendations": learning_path
         }
 
+    except HTTPException:
+        raise
+    except ArtifactNotReady as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         print(f"Error in get_learning_recommendations: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -421,19 +722,9 @@ async def get_interview_prep(
         if not analysis.optimized_cv:
             raise HTTPException(status_code=400, detail="CV not optimized yet. Please answer questions first.")
 
-        # Generate if not already cached
+        # Generate if not already cached (or precomputing - then wait for that run)
         if not analysis.interview_prep:
-            interview_guide = generate_interview_prep(
-                analysis.cv_parsed,
-                analysis.jd_parsed,
-                analysis.optimized_cv,
-                analysis.answers or {},
-                analysis.id
-            )
-
-            # Save to database
-            analysis.interview_prep = interview_guide
-            db.commit()
+            interview_guide = await precomputer.generate(analysis_id, "interview_prep")
         else:
             interview_guide = analysis.interview_prep
 
@@ -442,6 +733,42 @@ async def get_interview_prep(
             "interview_prep": interview_guide
         }
 
+    except HTTPException:
+        raise
+    except ArtifactNotReady as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         print(f"Error in get_interview_prep: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/interview-prep/{analysis_id}/stream")
+async def get_interview_prep_stream(
+    analysis_id: str,
+    db: Session = Depends(get_db)
+):
+    """Phase 9, streamed over SSE: the interview guide section by section (complete at once if cached)"""
+
+    analysis = db.query(CVAnalysis).filter(CVAnalysis.id == analysis_id).first()
+    if not analysis:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+
+    if not analysis.optimized_cv:
+        raise HTTPException(status_code=400, detail="CV not optimized yet. Please answer questions first.")
+
+    if analysis.interview_prep:
+        cached = _format_event("complete", {"id": analysis_id, "result": analysis.interview_prep}, sse=True)
+        return StreamingResponse(iter([cached]), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    if precomputer.is_running(analysis_id, "interview_prep"):
+        return _attached_stream(analysis_id, "interview_prep")
+
+    jd_parsed, optimized_cv, answers = analysis.jd_parsed, analysis.optimized_cv, analysis.answers or {}
+
+    def save(stored: CVAnalysis, interview_guide: dict):
+        stored.interview_prep = interview_guide
+
+    return _generation_stream(
+        analysis, "interview_prep",
+        lambda fragments: build_interview_prep_prompt(jd_parsed, optimized_cv, answers, analysis_id, fragments),
+        INTERVIEW_PREP_GENERATION_CONFIG, save
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Float, JSON, DateTime, Text
+from sqlalchemy import Column, String, Float, Integer, JSON, DateTime, Text, inspect, text
 from datetime import datetime
 import uuid
 from app.database import Base, engine
@@ -24,7 +24,63 @@ class CVAnalysis(Base):
     cover_letter = Column(JSON, nullable=True)  # Phase 7
     learning_recommendations = Column(JSON, nullable=True)  # Phase 8
     interview_prep = Column(JSON, nullable=True)  # Phase 9
+    prompt_fragments = Column(JSON, nullable=True)  # Content hash -> encoded TOON prompt fragment
+    cv_profile_id = Column(String, nullable=True)  # Set when analyzed from a stored CVProfile
+    content_hash = Column(String, nullable=True, index=True)  # (CV text, JD text, pipeline version); null if degraded
     created_at = Column(DateTime, default=datetime.utcnow)
 
+class CVProfile(Base):
+    """A CV parsed and embedded once, analyzed against any number of job descriptions"""
+    __tablename__ = "cv_profiles"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    cv_filename = Column(String)
+    cv_text = Column(Text)
+    cv_parsed = Column(JSON)
+    cv_embedding_id = Column(String, nullable=True)  # Qdrant point ID of the "full" section
+    section_embedding_ids = Column(JSON)  # Section name -> Qdrant point ID
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class IdempotencyKey(Base):
+    """Idempotency-Key header of an /api/upload-cv request -> the analysis it produced"""
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String, primary_key=True)
+    analysis_id = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class AnalysisJob(Base):
+    """Background /api/upload-cv run, checkpointed after every pipeline stage"""
+    __tablename__ = "analysis_jobs"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    status = Column(String, default="queued")  # queued | running | completed | failed
+    current_stage = Column(String, nullable=True)
+    stages = Column(JSON)  # stage -> {"status": pending|running|done|failed, "seconds": float}
+    state = Column(JSON)  # Pipeline state as of the last completed stage
+    result = Column(JSON, nullable=True)  # upload-cv response shape, filled in as stages complete
+    analysis_id = Column(String, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+def _add_missing_columns():
+    """create_all() never alters existing tables - add new nullable columns (and their indexes) to older databases"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                    print(f"✅ Added column {table.name}.{column.name}")
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
 # Create tables
 Base.metadata.create_all(bind=engine)
+_add_missing_columns()
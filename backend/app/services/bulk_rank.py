@@ -0,0 +1,167 @@
+"""
+Bulk ranking: one job description against many CVs (/api/rank-cvs/stream)
+Recruiters screen 50-500 CVs per posting; running /api/upload-cv for each
+re-analyzes the JD every time and scores one CV at a time. Here:
+    1. the JD is parsed once, while every CV is extracted (process pool) and
+       parsed, with at most BULK_RANK_LLM_CONCURRENCY Gemini calls in flight
+    2. CV/JD texts and all skills are embedded in large batches, and every CV
+       is scored by the local fast scorer (no Gemini call)
+    3. only the top_k get an LLM score
+
+Results are yielded in the fast ranker's order: a shortlisted CV once its
+LLM score is in, the rest right after. complete gives the shortlist's
+ranks re-ordered by LLM score. Nothing is persisted - open a candidate through
+/api/upload-cv to get an analysis row, questions and generators.
+
+Usage:
+    async for event, payload in rank_cvs(uploads, jd_text, top_k):
+        ...
+"""
+
+import os
+import time
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, List, Tuple
+import numpy as np
+from app.config import get_settings
+from app.services.cv_parser import parse_cv_with_gemini_async
+from app.services.jd_analyzer import analyze_jd_with_gemini_async
+from app.services.scorer import calculate_compatibility_score
+from app.services.fast_scorer import calculate_fast_score, prepare_skill_embeddings
+from app.services.embeddings import generate_embeddings_batch, cv_embedding_text, jd_embedding_text
+from app.services.pipeline import extract_cv_text
+from app.services.rate_limiter import priority_scope, PRIORITY_NORMAL
+
+settings = get_settings()
+
+
+async def _prepare_candidate(candidate: dict, limited: Callable[[Callable[[], Awaitable]], Awaitable]):
+    """Extract and parse one CV; failures are recorded on the candidate, not raised"""
+    try:
+        candidate["cv_text"] = await extract_cv_text(candidate["filename"], candidate["file_path"])
+    except Exception as e:
+        candidate["error"] = f"Text extraction failed: {e}"
+        return
+    finally:
+        # Bulk uploads are not kept: nothing refers to the file once its text is out
+        if os.path.exists(candidate["file_path"]):
+            os.remove(candidate["file_path"])
+
+    cv_parsed = await limited(lambda: parse_cv_with_gemini_async(candidate["cv_text"]))
+    if cv_parsed.get("error"):
+        candidate["error"] = f"CV parsing failed: {cv_parsed['error']}"
+    else:
+        candidate["cv_parsed"] = cv_parsed
+
+
+def _fast_rank(candidates: List[dict], jd_parsed: dict) -> List[dict]:
+    """Fast-score every candidate, best first (thread: embedding and scoring are CPU work)"""
+    batch_size = settings.BULK_RANK_EMBED_BATCH_SIZE
+    try:
+        texts = [jd_embedding_text(jd_parsed)] + [cv_embedding_text(c["cv_parsed"]) for c in candidates]
+        vectors = np.asarray(generate_embeddings_batch(texts, batch_size=batch_size), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True).clip(min=1e-9)
+        similarities = (vectors[1:] @ vectors[0]).tolist()
+    except Exception as e:
+        # Only a tie-breaker - rank on the fast score alone
+        print(f"⚠️  Bulk ranking similarity skipped: {e}")
+        similarities = [0.0] * len(candidates)
+
+    prepare_skill_embeddings([c["cv_parsed"] for c in candidates], jd_parsed, batch_size=batch_size)
+    for candidate, similarity in zip(candidates, similarities):
+        candidate["similarity"] = similarity
+        candidate["fast_score"] = calculate_fast_score(candidate["cv_parsed"], jd_parsed)
+    return sorted(candidates, key=lambda c: (-c["fast_score"]["overall_score"], -c["similarity"]))
+
+
+def _candidate_result(rank: int, candidate: dict, score_data: dict, refined: bool) -> dict:
+    return {
+        "rank": rank,
+        "filename": candidate["filename"],
+        "name": (candidate["cv_parsed"].get("personal_info") or {}).get("name"),
+        "score": score_data.get("overall_score"),
+        "fast_score": candidate["fast_score"].get("overall_score"),
+        "similarity": round(candidate["similarity"], 3),
+        "refined": refined,
+        "breakdown": score_data.get("breakdown"),
+        "gaps": score_data.get("top_gaps", []),
+        "strengths": score_data.get("strengths", [])
+    }
+
+
+async def rank_cvs(uploads: List[Tuple[str, str]], jd_text: str, top_k: int) -> AsyncIterator[Tuple[str, dict]]:
+    """
+    Rank uploaded CVs ((filename, file_path) pairs) against one JD
+
+    Yields (event, payload): jd_parsed, shortlist (fast ranking done), one
+    candidate per ranked CV in rank order, one failed per CV that could not
+    be read or parsed, then complete - or error if the JD cannot be parsed.
+    """
+    started = time.monotonic()
+    llm_slots = asyncio.Semaphore(settings.BULK_RANK_LLM_CONCURRENCY)
+
+    async def limited(make_call: Callable[[], Awaitable]):
+        # Normal priority: single uploads (interactive) go first in the rate limiter queue
+        async with llm_slots:
+            with priority_scope(PRIORITY_NORMAL):
+                return await make_call()
+
+    candidates = [{"filename": filename, "file_path": file_path} for filename, file_path in uploads]
+    jd_task = asyncio.create_task(limited(lambda: analyze_jd_with_gemini_async(jd_text)))
+    cv_tasks = [asyncio.create_task(_prepare_candidate(candidate, limited)) for candidate in candidates]
+    refinements: List[asyncio.Task] = []
+    try:
+        jd_parsed = await jd_task
+        if jd_parsed.get("error"):
+            yield "error", {"detail": f"Job description parsing failed: {jd_parsed['error']}"}
+            return
+        yield "jd_parsed", {"jd_parsed": jd_parsed}
+
+        await asyncio.gather(*cv_tasks)
+        parsed = [c for c in candidates if "cv_parsed" in c]
+        failed = [c for c in candidates if "error" in c]
+        ranked = await asyncio.to_thread(_fast_rank, parsed, jd_parsed) if parsed else []
+        shortlist = ranked[:max(0, top_k)]
+        print(f"⚡ Fast-ranked {len(ranked)} CVs in {time.monotonic() - started:.2f}s, "
+              f"refining the top {len(shortlist)}")
+        yield "shortlist", {"ranked": len(ranked), "failed": len(failed), "top_k": len(shortlist)}
+
+        # Started in rank order, so the head of the stream is usually the first to finish
+        refinements = [
+            asyncio.create_task(limited(lambda c=c: calculate_compatibility_score(
+                c["cv_parsed"], jd_parsed, scoring_mode="llm"
+            )))
+            for c in shortlist
+        ]
+
+        refined_scores, refined_count = [], 0
+        for rank, candidate in enumerate(ranked, 1):
+            score_data, refined = candidate["fast_score"], False
+            if rank <= len(refinements):
+                llm_score = await refinements[rank - 1]
+                # On error the fast score stands
+                if not llm_score.get("error"):
+                    score_data, refined = llm_score, True
+                    refined_count += 1
+                refined_scores.append((score_data.get("overall_score") or 0, rank))
+            yield "candidate", _candidate_result(rank, candidate, score_data, refined)
+
+        for candidate in failed:
+            yield "failed", {"filename": candidate["filename"], "detail": candidate["error"]}
+
+        yield "complete", {
+            "ranked": len(ranked),
+            "refined": refined_count,
+            "failed": len(failed),
+            # Ranks of the shortlist, best LLM score first
+            "refined_order": [rank for _, rank in sorted(refined_scores, key=lambda s: -s[0])],
+            "seconds": round(time.monotonic() - started, 2)
+        }
+    finally:
+        # Client went away or the JD failed: stop spending LLM calls on this batch
+        for task in [jd_task, *cv_tasks, *refinements]:
+            task.cancel()
+        await asyncio.gather(jd_task, *cv_tasks, *refinements, return_exceptions=True)
+        for candidate in candidates:
+            if os.path.exists(candidate["file_path"]):
+                os.remove(candidate["file_path"])
@@ -5,9 +5,12 @@ Reduces latency by caching expensive API calls
 
 import redis
 import json
+import time
+import asyncio
 import hashlib
 from typing import Optional, Any, Callable
 from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
 from app.config import get_settings
 
 settings = get_settings()
@@ -15,6 +18,16 @@ settings = get_settings()
 # Global Redis client (lazy-loaded)
 _redis_client: Optional[redis.Redis] = None
 
+# Stale-while-revalidate: envelope marker, refresh lock lifetime and the
+# small pool that runs background refreshes off the request path
+SWR_STORED_AT = "_swr_stored_at"
+SWR_REFRESH_LOCK_TTL = 120
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-refresh")
+_refresh_tasks: set = set()
+
+# Per-call control arguments that must not change the cache key
+NON_KEY_KWARGS = ("deadline",)
+
 
 def get_redis_client() -> redis.Redis:
     """Get or create Redis client with connection pooling"""
@@ -112,34 +125,160 @@ def clear_cache_pattern(pattern: str = "hirehub:*") -> int:
         return 0
 
 
-def cached(prefix: str, ttl: Optional[int] = None):
+def _is_stale(entry: Any, ttl: int) -> bool:
+    """True if a stale-while-revalidate envelope is past its soft TTL"""
+    return time.time() - entry.get(SWR_STORED_AT, 0) >= ttl
+
+
+def _unwrap(entry: Any) -> Any:
+    """Return the cached value, unwrapping stale-while-revalidate envelopes"""
+    if isinstance(entry, dict) and SWR_STORED_AT in entry:
+        return entry["value"]
+    return entry
+
+
+def _acquire_refresh_lock(cache_key: str) -> bool:
+    """Make sure only one worker refreshes a stale key at a time"""
+    try:
+        client = get_redis_client()
+        return bool(client.set(f"{cache_key}:refresh", "1", nx=True, ex=SWR_REFRESH_LOCK_TTL))
+    except redis.RedisError as e:
+        print(f"⚠️  Redis lock error: {e}")
+        return False
+
+
+def _refresh_in_background(prefix: str, cache_key: str, func: Callable, args, kwargs, hard_ttl: int):
+    """Recompute a stale entry and store it, keeping the stale value on failure"""
+    try:
+        result = func(*args, **kwargs)
+        # Services return an "error" fallback instead of raising;
+        # never replace a good stale value with one of those
+        if isinstance(result, dict) and result.get("error"):
+            print(f"⚠️  Cache refresh returned an error, keeping stale value: {prefix}")
+            return
+        set_cached(cache_key, {"value": result, SWR_STORED_AT: time.time()}, hard_ttl)
+        print(f"🔄 Cache refreshed: {prefix}")
+    except Exception as e:
+        print(f"⚠️  Cache refresh failed for {prefix}: {e}")
+    finally:
+        delete_cached(f"{cache_key}:refresh")
+
+
+async def _refresh_in_background_async(prefix: str, cache_key: str, func: Callable, args, kwargs, hard_ttl: int):
+    """Async counterpart of _refresh_in_background for coroutine functions"""
+    try:
+        result = await func(*args, **kwargs)
+        if isinstance(result, dict) and result.get("error"):
+            print(f"⚠️  Cache refresh returned an error, keeping stale value: {prefix}")
+            return
+        await asyncio.to_thread(set_cached, cache_key, {"value": result, SWR_STORED_AT: time.time()}, hard_ttl)
+        print(f"🔄 Cache refreshed: {prefix}")
+    except Exception as e:
+        print(f"⚠️  Cache refresh failed for {prefix}: {e}")
+    finally:
+        await asyncio.to_thread(delete_cached, f"{cache_key}:refresh")
+
+
+def _key_kwargs(kwargs: dict) -> dict:
+    """Drop per-call control arguments (e.g. deadline) before hashing"""
+    return {k: v for k, v in kwargs.items() if k not in NON_KEY_KWARGS}
+
+
+def cached(prefix: str, ttl: Optional[int] = None, stale_ttl: Optional[int] = None):
     """
     Decorator for caching function results in Redis
 
+    With stale_ttl set, entries are fresh for ttl seconds, then served stale
+    for up to stale_ttl more seconds while a single background refresh
+    recomputes them. Redis only evicts them after ttl + stale_ttl.
+
+    Results carrying an "error" key are never cached, and control kwargs
+    listed in NON_KEY_KWARGS (pass them by keyword) are left out of the key.
+
     Usage:
         @cached("cv_parse")
         def parse_cv(text: str) -> dict:
             # Expensive operation
             return result
+
+        @cached("jd_analyze", ttl=3600, stale_ttl=86400)
+        def analyze_jd(text: str) -> dict:
+            return result
     """
     def decorator(func: Callable) -> Callable:
+        soft_ttl = ttl or settings.CACHE_TTL
+
+        def lookup(cache_key: str):
+            """Return (hit, value, needs_refresh) for a cache key"""
+            cached_result = get_cached(cache_key)
+            if cached_result is None:
+                print(f"⚠️  Cache miss: {prefix}")
+                return False, None, False
+            if (
+                stale_ttl
+                and isinstance(cached_result, dict)
+                and SWR_STORED_AT in cached_result
+                and _is_stale(cached_result, soft_ttl)
+            ):
+                print(f"✅ Cache hit (stale): {prefix}")
+                return True, _unwrap(cached_result), _acquire_refresh_lock(cache_key)
+            print(f"✅ Cache hit: {prefix}")
+            return True, _unwrap(cached_result), False
+
+        def store(cache_key: str, result: Any):
+            # Error fallbacks (including deadline cuts) are per-request, not cacheable
+            if isinstance(result, dict) and result.get("error"):
+                return
+            if stale_ttl:
+                set_cached(cache_key, {"value": result, SWR_STORED_AT: time.time()}, soft_ttl + stale_ttl)
+            else:
+                set_cached(cache_key, result, ttl)
+
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                key_kwargs = _key_kwargs(kwargs)
+                cache_key = generate_cache_key(prefix, *args, **key_kwargs)
+                # Blocking Redis round trips (GET, SET NX refresh lock) - keep them off the event loop
+                hit, value, needs_refresh = await asyncio.to_thread(lookup, cache_key)
+                if hit:
+                    if needs_refresh:
+                        task = asyncio.create_task(_refresh_in_background_async(
+                            prefix, cache_key, func, args, key_kwargs, soft_ttl + stale_ttl
+                        ))
+                        # Keep a reference so the task is not garbage collected mid-flight
+                        _refresh_tasks.add(task)
+                        task.add_done_callback(_refresh_tasks.discard)
+                    return value
+
+                result = await func(*args, **kwargs)
+                await asyncio.to_thread(store, cache_key, result)
+                return result
+
+            return async_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs):
             # Generate cache key from function arguments
-            cache_key = generate_cache_key(prefix, *args, **kwargs)
+            key_kwargs = _key_kwargs(kwargs)
+            cache_key = generate_cache_key(prefix, *args, **key_kwargs)
 
             # Try to get cached result
-            cached_result = get_cached(cache_key)
-            if cached_result is not None:
-                print(f"✅ Cache hit: {prefix}")
-                return cached_result
+            hit, value, needs_refresh = lookup(cache_key)
+            if hit:
+                if needs_refresh:
+                    # Background refreshes are not bound by the caller's deadline
+                    _refresh_executor.submit(
+                        _refresh_in_background, prefix, cache_key, func,
+                        args, key_kwargs, soft_ttl + stale_ttl
+                    )
+                return value
 
             # Execute function if cache miss
-            print(f"⚠️  Cache miss: {prefix}")
             result = func(*args, **kwargs)
 
             # Store result in cache
-            set_cached(cache_key, result, ttl)
+            store(cache_key, result)
 
             return result
 
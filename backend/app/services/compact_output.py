@@ -0,0 +1,158 @@
+"""
+Compact-key structured output (LLM_COMPACT_OUTPUT=true)
+Output tokens dominate generation latency, so large generators can ask the
+model for abbreviated keys and positional rows instead of verbose JSON, and
+expand the answer locally into the usual shape - stored data and API
+responses do not change.
+
+Spec forms:
+    obj(su="professional_summary", sk=("skills", obj(...)))   short keys
+    row("company", "role", ...)                                positional array
+    many(spec)                                                 list of spec
+
+Usage (via llm_client):
+    data = generate_json("learning_path", prompt, config, compact_spec=LEARNING_PATH_COMPACT)
+
+expand() passes unknown keys and already-expanded objects through, so a
+model that ignores the compact format still yields the normal shape.
+"""
+
+import json
+from typing import Any, Optional, Union
+
+# Marks compact-output prompts (also lets the offline stand-in answer in kind)
+COMPACT_OUTPUT_MARKER = "COMPACT OUTPUT FORMAT"
+
+Spec = Union[None, dict, tuple, list]
+
+
+def _field(field: Union[str, tuple]) -> tuple:
+    return (field, None) if isinstance(field, str) else field
+
+
+def obj(**fields: Union[str, tuple]) -> dict:
+    """Object with short keys: short=long_name or short=(long_name, spec)"""
+    return {short: _field(field) for short, field in fields.items()}
+
+
+def row(*fields: Union[str, tuple]) -> tuple:
+    """Object sent as a positional array, values in field order"""
+    return tuple(_field(field) for field in fields)
+
+
+def many(spec: Spec) -> list:
+    """List whose items follow spec"""
+    return [spec]
+
+
+def expand(value: Any, spec: Spec) -> Any:
+    """Compact model output -> full result shape"""
+    if spec is None or value is None:
+        return value
+    if isinstance(spec, list):
+        return [expand(item, spec[0]) for item in value] if isinstance(value, list) else value
+    if isinstance(spec, tuple):
+        if not isinstance(value, list):
+            return value  # already a full object
+        return {
+            long: expand(value[i] if i < len(value) else None, sub)
+            for i, (long, sub) in enumerate(spec)
+        }
+    if not isinstance(value, dict):
+        return value
+    expanded = {}
+    for key, item in value.items():
+        if key in spec:
+            long, sub = spec[key]
+            expanded[long] = expand(item, sub)
+        else:
+            expanded[key] = item
+    return expanded
+
+
+def compress(value: Any, spec: Spec) -> Any:
+    """Full result shape -> compact form (inverse of expand)"""
+    if spec is None or value is None:
+        return value
+    if isinstance(spec, list):
+        return [compress(item, spec[0]) for item in value] if isinstance(value, list) else value
+    if isinstance(spec, tuple):
+        if not isinstance(value, dict):
+            return value
+        return [compress(value.get(long), sub) for long, sub in spec]
+    if not isinstance(value, dict):
+        return value
+    shorts = {long: (short, sub) for short, (long, sub) in spec.items()}
+    compressed = {}
+    for key, item in value.items():
+        if key in shorts:
+            short, sub = shorts[key]
+            compressed[short] = compress(item, sub)
+        else:
+            compressed[key] = item
+    return compressed
+
+
+def _template(spec: Spec, name: Optional[str] = None) -> Any:
+    if spec is None:
+        return f"<{name}>"
+    if isinstance(spec, list):
+        return [_template(spec[0], name)]
+    if isinstance(spec, tuple):
+        return [_template(sub, long) for long, sub in spec]
+    return {short: _template(sub, long) for short, (long, sub) in spec.items()}
+
+
+def compact_output_instructions(spec: Spec) -> str:
+    """Prompt suffix asking for the compact form of the structure described above it"""
+    return f"""{COMPACT_OUTPUT_MARKER}: to keep the response short, return the structure above in this compact form instead.
+Keys are abbreviations; arrays of <field> placeholders are positional rows - give the values in exactly that order (null if unknown).
+Keep the same content and level of detail as the full structure.
+{json.dumps(_template(spec), separators=(",", ":"))}"""
+
+
+CV_COMPACT = obj(
+    pi=("personal_info", obj(n="name", e="email", p="phone", l="location", li="linkedin", gh="github", pf="portfolio")),
+    su="professional_summary",
+    sk=("skills", obj(t="technical_skills", to="tools", so="soft_skills")),
+    ex=("experience", many(row("company", "role", "duration", "location", "achievements"))),
+    ed=("education", many(row("degree", "institution", "year", "gpa"))),
+    pr=("projects", many(row("name", "description", "technologies", "link"))),
+    ce="certifications",
+    la="languages",
+    ye="years_of_experience",
+)
+
+LEARNING_PATH_COMPACT = obj(
+    cs="current_score",
+    ts="target_score",
+    ew="estimated_weeks",
+    qw=("quick_wins", many(row("action", "time", "impact", "description"))),
+    pc=("priority_courses", many(row(
+        "title", "platform", "url", "duration", "cost", "impact", "priority", "skills_covered", "why_recommended"
+    ))),
+    rm=("roadmap", many(row("week", "focus", "tasks", "hours_per_week", "milestone"))),
+    ti=("total_investment", row("time_hours", "cost_usd", "expected_score_improvement")),
+    rc="recommendations",
+)
+
+INTERVIEW_PREP_COMPACT = obj(
+    st=("stages", many(row(
+        "stage_name", "duration", "interviewer", "focus",
+        ("questions", many(row("question", "category", "priority", "suggested_answer", "tips", "why_they_ask")))
+    ))),
+    td=("technical_deep_dives", many(row(
+        "topic", "likely_questions", "preparation_tips", "example_projects_to_mention"
+    ))),
+    sm=("star_method_examples", many(row("situation", "task", "action", "result", "applicable_to"))),
+    rf=("red_flags_to_address", many(row("concern", "how_to_address", "example_response"))),
+    qa=("questions_to_ask_them", many(row("question", "category", "why_ask"))),
+    gt="general_tips",
+)
+
+# Operation -> compact spec, for generators and the offline stand-in
+COMPACT_SPECS = {
+    "cv_optimize": CV_COMPACT,
+    "learning_path": LEARNING_PATH_COMPACT,
+    "interview_prep": INTERVIEW_PREP_COMPACT,
+}
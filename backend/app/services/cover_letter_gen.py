@@ -1,6 +1,5 @@
 import os
-import google.generativeai as genai
-import json
+import asyncio
 from app.config import get_settings
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -10,20 +9,25 @@ from reportlab.lib.enums import TA_LEFT, TA_JUSTIFY
 from app.services.embeddings import generate_embedding
 from app.services.qdrant_service import get_rag_context_for_cv
 from app.services.toon_serializer import to_toon_string
+from app.services.prompt_compaction import compact_inputs
+from app.services.llm_client import generate_json, generate_json_async
 
 settings = get_settings()
-genai.configure(api_key=settings.GEMINI_API_KEY)
 
-def generate_cover_letter(
-    cv_data: dict,
+COVER_LETTER_GENERATION_CONFIG = {
+    "temperature": 0.5,
+    "response_mime_type": "application/json"
+}
+
+
+def build_cover_letter_prompt(
     jd_data: dict,
     answers: dict,
     optimized_cv: dict,
-    cv_id: str = None
-) -> dict:
-    """Generate personalized cover letter using AI with RAG context"""
-
-    model = genai.GenerativeModel('gemini-2.0-flash-exp')
+    cv_id: str = None,
+    fragments: dict = None
+) -> str:
+    """Cover letter prompt with RAG context (shared by the blocking and streaming paths)"""
 
     # Get RAG context from similar successful cover letters
     rag_context = ""
@@ -36,16 +40,19 @@ def generate_cover_letter(
     if rag_context:
         rag_section = f"BEST PRACTICES FROM SUCCESSFUL COVER LETTERS:\n{rag_context}\n\n"
 
+    # Only the fields this generator uses, within its token budget
+    inputs = compact_inputs("cover_letter", cv=optimized_cv, jd=jd_data, answers=answers)
+
     prompt = f"""Write a compelling, professional cover letter for this job application:
 
 OPTIMIZED CV:
-{to_toon_string(optimized_cv)}
+{to_toon_string(inputs['cv'], fragments)}
 
 JOB DESCRIPTION:
-{to_toon_string(jd_data)}
+{to_toon_string(inputs['jd'], fragments)}
 
 USER'S ADDITIONAL CONTEXT (from questions):
-{to_toon_string(answers)}
+{to_toon_string(inputs['answers'], fragments)}
 
 {rag_section}INSTRUCTIONS:
 1. Opening: Strong hook that shows enthusiasm and alignment with company mission
@@ -78,34 +85,59 @@ Return JSON with this structure:
     }
 }"""
 
-    generation_config = {
-        "temperature": 0.5,
-        "response_mime_type": "application/json"
+    return prompt
+
+
+def _fallback_cover_letter(cv_data: dict, error: Exception) -> dict:
+    return {
+        "error": str(error),
+        "opening_paragraph": "I am writing to express my interest in this position.",
+        "body_paragraph_1": "Based on my experience, I believe I would be a strong fit.",
+        "body_paragraph_2": "I am excited about this opportunity.",
+        "closing_paragraph": "Thank you for considering my application.",
+        "signature": cv_data.get('personal_info', {})
     }
 
-    try:
-        response = model.generate_content(prompt, generation_config=generation_config)
-        response_text = response.text.strip()
 
-        if response_text.startswith("```"):
-            response_text = response_text.split("```")[1]
-            if response_text.startswith("json"):
-                response_text = response_text[4:]
-            response_text = response_text.strip()
+def generate_cover_letter(
+    cv_data: dict,
+    jd_data: dict,
+    answers: dict,
+    optimized_cv: dict,
+    cv_id: str = None,
+    fragments: dict = None
+) -> dict:
+    """Generate personalized cover letter using AI with RAG context"""
+
+    prompt = build_cover_letter_prompt(jd_data, answers, optimized_cv, cv_id, fragments)
 
-        cover_letter = json.loads(response_text)
+    try:
+        cover_letter = generate_json("cover_letter", prompt, COVER_LETTER_GENERATION_CONFIG)
         return cover_letter
 
     except Exception as e:
         print(f"Error generating cover letter with Gemini: {e}")
-        return {
-            "error": str(e),
-            "opening_paragraph": "I am writing to express my interest in this position.",
-            "body_paragraph_1": "Based on my experience, I believe I would be a strong fit.",
-            "body_paragraph_2": "I am excited about this opportunity.",
-            "closing_paragraph": "Thank you for considering my application.",
-            "signature": cv_data.get('personal_info', {})
-        }
+        return _fallback_cover_letter(cv_data, e)
+
+
+async def generate_cover_letter_async(
+    cv_data: dict,
+    jd_data: dict,
+    answers: dict,
+    optimized_cv: dict,
+    cv_id: str = None,
+    fragments: dict = None
+) -> dict:
+    """Generate personalized cover letter (ASYNC: RAG lookup in a worker thread)"""
+
+    prompt = await asyncio.to_thread(build_cover_letter_prompt, jd_data, answers, optimized_cv, cv_id, fragments)
+
+    try:
+        return await generate_json_async("cover_letter", prompt, COVER_LETTER_GENERATION_CONFIG)
+
+    except Exception as e:
+        print(f"Error generating cover letter with Gemini: {e}")
+        return _fallback_cover_letter(cv_data, e)
 
 def generate_cover_letter_pdf(cover_letter: dict, cv_data: dict, jd_data: dict, output_path: str) -> str:
     """Generate professional cover letter PDF"""
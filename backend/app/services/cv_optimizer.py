@@ -1,6 +1,6 @@
 import os
-import google.generativeai as genai
-import json
+import asyncio
+from typing import Optional, Tuple
 from app.config import get_settings
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -10,36 +10,126 @@ from reportlab.lib.enums import TA_LEFT, TA_CENTER
 from app.services.embeddings import generate_embedding
 from app.services.qdrant_service import get_rag_context_for_cv, get_rag_context_for_jd
 from app.services.toon_serializer import to_toon_string
+from app.services.prompt_compaction import compact_inputs
+from app.services.llm_client import generate_json, generate_json_async
+from app.services.compact_output import CV_COMPACT
+from app.services.cv_patch import apply_cv_patch, indexed_cv_view, changed_answers, removed_answers, PATCH_RESPONSE_SCHEMA
 
 settings = get_settings()
-genai.configure(api_key=settings.GEMINI_API_KEY)
 
-def optimize_cv(cv_data: dict, jd_data: dict, answers: dict, cv_id: str = None) -> dict:
-    """Generate optimized CV using AI with RAG context"""
+def _optimization_rag_section(jd_data: dict, cv_id: str = None) -> str:
+    """Best-practice snippets from similar successful CVs, if any"""
+    if not cv_id:
+        return ""
+    query_text = f"Optimize CV for {jd_data.get('position_title', 'position')}"
+    query_embedding = generate_embedding(query_text)
+    rag_context = get_rag_context_for_cv(cv_id, query_text, query_embedding)
+    return f"BEST PRACTICES FROM SIMILAR SUCCESSFUL CVS:\n{rag_context}\n\n" if rag_context else ""
 
-    model = genai.GenerativeModel('gemini-2.0-flash-exp')
+
+CV_PATCH_GENERATION_CONFIG = {
+    "temperature": 0.4,
+    "response_mime_type": "application/json"
+}
+
+
+def _build_cv_patch_prompt(cv_data: dict, jd_data: dict, answers: dict, cv_id: str = None,
+                           previous_optimized: dict = None, previous_answers: dict = None,
+                           fragments: dict = None) -> Tuple[dict, Optional[str]]:
+    """(CV to patch, edit prompt); no prompt when resubmitted answers are unchanged"""
+
+    # Resubmission: start from the previous result and only send what changed -
+    # unless an answer was withdrawn, which only a patch of the original CV drops
+    base = cv_data
+    new_answers = answers
+    if previous_optimized and previous_answers and not removed_answers(previous_answers, answers):
+        new_answers = changed_answers(previous_answers, answers)
+        if not new_answers:
+            print("♻️  Answers unchanged, reusing previous optimized CV")
+            return previous_optimized, None
+        base = previous_optimized
+
+    inputs = compact_inputs("cv_optimize", jd=jd_data, answers=new_answers)
+
+    prompt = f"""Improve this CV for the job description using the user's answers. Return ONLY the edits to make.
+
+EDITABLE CV SECTIONS (indexes are used in edit paths):
+{indexed_cv_view(base)}
+
+JOB REQUIREMENTS:
+{to_toon_string(inputs['jd'], fragments)}
+
+USER'S ADDITIONAL INFORMATION (from questions):
+{to_toon_string(inputs['answers'], fragments)}
+
+{_optimization_rag_section(jd_data, cv_id)}ALLOWED EDITS:
+- {{"op": "replace", "path": "/professional_summary", "value": "..."}}
+- {{"op": "replace", "path": "/experience/<i>/achievements/<j>", "value": "..."}} (rewrite a bullet)
+- {{"op": "add", "path": "/experience/<i>/achievements/-", "value": "..."}} (new bullet)
+- {{"op": "add", "path": "/skills/<technical_skills|tools|soft_skills>/-", "value": "..."}}
+- {{"op": "replace", "path": "/projects/<i>/description", "value": "..."}}
+
+CRITICAL RULES:
+- DO NOT fabricate experience
+- Only use information from the CV + user answers
+- Use keywords from the job description naturally, quantify where possible
+- Only include edits that change something; leave everything else out
+
+Return JSON in this format:
+{PATCH_RESPONSE_SCHEMA}"""
+
+    return base, prompt
+
+
+def _apply_patch_result(base: dict, result: dict) -> dict:
+    patched, applied, rejected = apply_cv_patch(base, result.get("edits", []))
+    print(f"🩹 Applied {applied} CV edits ({rejected} rejected)")
+    return patched
+
+
+def _optimize_cv_patch(cv_data: dict, jd_data: dict, answers: dict, cv_id: str = None,
+                       previous_optimized: dict = None, previous_answers: dict = None,
+                       fragments: dict = None) -> dict:
+    """Ask only for edits to the CV and apply them locally"""
+
+    base, prompt = _build_cv_patch_prompt(cv_data, jd_data, answers, cv_id, previous_optimized, previous_answers, fragments)
+    if prompt is None:
+        return base
+
+    try:
+        return _apply_patch_result(base, generate_json("cv_optimize_patch", prompt, CV_PATCH_GENERATION_CONFIG))
+
+    except Exception as e:
+        print(f"Error optimizing CV with Gemini: {e}")
+        return base
+
+
+CV_OPTIMIZE_GENERATION_CONFIG = {
+    "temperature": 0.4,
+    "response_mime_type": "application/json"
+}
+
+
+def build_cv_optimize_prompt(cv_data: dict, jd_data: dict, answers: dict, cv_id: str = None,
+                             fragments: dict = None) -> str:
+    """Full-CV optimization prompt (shared by the blocking and streaming paths)"""
 
     # Get RAG context from similar successful CVs
-    rag_context = ""
-    if cv_id:
-        query_text = f"Optimize CV for {jd_data.get('position_title', 'position')}"
-        query_embedding = generate_embedding(query_text)
-        rag_context = get_rag_context_for_cv(cv_id, query_text, query_embedding)
+    rag_section = _optimization_rag_section(jd_data, cv_id)
 
-    rag_section = ""
-    if rag_context:
-        rag_section = f"BEST PRACTICES FROM SIMILAR SUCCESSFUL CVS:\n{rag_context}\n\n"
+    # Only the fields this generator uses, within its token budget
+    inputs = compact_inputs("cv_optimize", cv=cv_data, jd=jd_data, answers=answers)
 
     prompt = f"""Optimize this CV for the job description, incorporating user's answers:
 
 ORIGINAL CV:
-{to_toon_string(cv_data)}
+{to_toon_string(inputs['cv'], fragments)}
 
 JOB REQUIREMENTS:
-{to_toon_string(jd_data)}
+{to_toon_string(inputs['jd'], fragments)}
 
 USER'S ADDITIONAL INFORMATION (from questions):
-{to_toon_string(answers)}
+{to_toon_string(inputs['answers'], fragments)}
 
 {rag_section}INSTRUCTIONS:
 1. Rewrite professional summary to emphasize alignment with job
@@ -58,28 +148,57 @@ CRITICAL RULES:
 
 Return optimized CV in same JSON structure as the original CV."""
 
-    generation_config = {
-        "temperature": 0.4,
-        "response_mime_type": "application/json"
-    }
+    return prompt
 
-    try:
-        response = model.generate_content(prompt, generation_config=generation_config)
-        response_text = response.text.strip()
 
-        if response_text.startswith("```"):
-            response_text = response_text.split("```")[1]
-            if response_text.startswith("json"):
-                response_text = response_text[4:]
-            response_text = response_text.strip()
+def optimize_cv(cv_data: dict, jd_data: dict, answers: dict, cv_id: str = None,
+                previous_optimized: dict = None, previous_answers: dict = None,
+                fragments: dict = None) -> dict:
+    """Generate optimized CV using AI with RAG context
+
+    fragments: the analysis' encoded-prompt memo (see to_toon_string), updated in place
+    """
+
+    if settings.CV_OPTIMIZE_MODE == "patch":
+        return _optimize_cv_patch(cv_data, jd_data, answers, cv_id, previous_optimized, previous_answers, fragments)
+
+    prompt = build_cv_optimize_prompt(cv_data, jd_data, answers, cv_id, fragments)
 
-        optimized = json.loads(response_text)
+    try:
+        optimized = generate_json("cv_optimize", prompt, CV_OPTIMIZE_GENERATION_CONFIG, compact_spec=CV_COMPACT)
         return optimized
 
     except Exception as e:
         print(f"Error optimizing CV with Gemini: {e}")
         return cv_data
 
+
+async def optimize_cv_async(cv_data: dict, jd_data: dict, answers: dict, cv_id: str = None,
+                            previous_optimized: dict = None, previous_answers: dict = None,
+                            fragments: dict = None) -> dict:
+    """optimize_cv for async endpoints: RAG lookups in a worker thread, Gemini call on the event loop"""
+
+    if settings.CV_OPTIMIZE_MODE == "patch":
+        base, prompt = await asyncio.to_thread(
+            _build_cv_patch_prompt, cv_data, jd_data, answers, cv_id, previous_optimized, previous_answers, fragments
+        )
+        if prompt is None:
+            return base
+        try:
+            return _apply_patch_result(base, await generate_json_async("cv_optimize_patch", prompt, CV_PATCH_GENERATION_CONFIG))
+        except Exception as e:
+            print(f"Error optimizing CV with Gemini: {e}")
+            return base
+
+    prompt = await asyncio.to_thread(build_cv_optimize_prompt, cv_data, jd_data, answers, cv_id, fragments)
+
+    try:
+        return await generate_json_async("cv_optimize", prompt, CV_OPTIMIZE_GENERATION_CONFIG, compact_spec=CV_COMPACT)
+
+    except Exception as e:
+        print(f"Error optimizing CV with Gemini: {e}")
+        return cv_data
+
 def generate_cv_pdf(cv_data: dict, output_path: str) -> str:
     """Generate PDF from CV data using ReportLab"""
 
@@ -1,39 +1,22 @@
-import fitz  # PyMuPDF
-from docx import Document
 import os
-import google.generativeai as genai
-import json
+from typing import Optional
 from app.config import get_settings
 from app.services.embeddings import generate_embedding, generate_embeddings_batch
 from app.services.qdrant_service import store_cv_embedding
 from app.services.cache_service import cached
-from app.services.timeout_handler import with_timeout_and_retry
+from app.services.deadline import RequestDeadline, bind_deadline
+from app.services.llm_client import generate_json, generate_json_async
 
 settings = get_settings()
-genai.configure(api_key=settings.GEMINI_API_KEY)
 
-def extract_text_from_pdf(file_path: str) -> str:
-    """Extract text from PDF"""
-    doc = fitz.open(file_path)
-    text = ""
-    for page in doc:
-        text += page.get_text()
-    return text
+CV_PARSE_GENERATION_CONFIG = {
+    "temperature": 0.3,
+    "response_mime_type": "application/json"
+}
 
-def extract_text_from_docx(file_path: str) -> str:
-    """Extract text from DOCX"""
-    doc = Document(file_path)
-    text = "\n".join([para.text for para in doc.paragraphs])
-    return text
-
-@cached("cv_parse", ttl=3600)
-@with_timeout_and_retry(timeout_seconds=30, max_retries=2)
-def parse_cv_with_gemini(cv_text: str) -> dict:
-    """Use Gemini to structure CV data"""
-
-    model = genai.GenerativeModel('gemini-2.0-flash-exp')
-
-    prompt = f"""Extract structured information from this CV/Resume:
+def _build_cv_parse_prompt(cv_text: str) -> str:
+    """Prompt asking Gemini for the structured CV JSON"""
+    return f"""Extract structured information from this CV/Resume:
 
 {cv_text}
 
@@ -86,39 +69,51 @@ Return ONLY a valid JSON object (no markdown, no backticks) with this exact stru
 
 Extract ALL information present in the CV. Be thorough and accurate."""
 
-    generation_config = {
-        "temperature": 0.3,
-        "response_mime_type": "application/json"
+def _fallback_cv(cv_text: str, error: Exception) -> dict:
+    """Minimal CV structure returned when Gemini parsing fails"""
+    return {
+        "error": str(error),
+        "personal_info": {},
+        "professional_summary": cv_text[:500],
+        "skills": {"technical_skills": [], "tools": [], "soft_skills": []},
+        "experience": [],
+        "education": [],
+        "projects": [],
+        "certifications": [],
+        "languages": [],
+        "years_of_experience": 0
     }
 
-    try:
-        response = model.generate_content(prompt, generation_config=generation_config)
-        response_text = response.text.strip()
-
-        # Handle potential markdown code blocks
-        if response_text.startswith("```"):
-            response_text = response_text.split("```")[1]
-            if response_text.startswith("json"):
-                response_text = response_text[4:]
-            response_text = response_text.strip()
+# Per-attempt timeout and retries for the parse call
+CV_PARSE_TIMEOUT = 30
+CV_PARSE_RETRIES = 2
 
-        parsed_data = json.loads(response_text)
-        return parsed_data
+@cached("cv_parse", ttl=3600, stale_ttl=settings.CACHE_STALE_TTL)
+def parse_cv_with_gemini(cv_text: str) -> dict:
+    """Use Gemini to structure CV data"""
+    try:
+        return generate_json(
+            "cv_parse", _build_cv_parse_prompt(cv_text), CV_PARSE_GENERATION_CONFIG,
+            timeout_seconds=CV_PARSE_TIMEOUT, max_retries=CV_PARSE_RETRIES
+        )
+    except Exception as e:
+        print(f"Error parsing CV with Gemini: {e}")
+        return _fallback_cv(cv_text, e)
 
+@cached("cv_parse", ttl=3600, stale_ttl=settings.CACHE_STALE_TTL)
+async def parse_cv_with_gemini_async(cv_text: str, deadline: Optional[RequestDeadline] = None) -> dict:
+    """Use Gemini to structure CV data (ASYNC, shares the cv_parse cache)"""
+    try:
+        with bind_deadline(deadline):
+            return await generate_json_async(
+                "cv_parse", _build_cv_parse_prompt(cv_text), CV_PARSE_GENERATION_CONFIG,
+                timeout_seconds=CV_PARSE_TIMEOUT, max_retries=CV_PARSE_RETRIES
+            )
     except Exception as e:
+        if deadline and deadline.expired:
+            deadline.mark_cut("parse_cv")
         print(f"Error parsing CV with Gemini: {e}")
-        return {
-            "error": str(e),
-            "personal_info": {},
-            "professional_summary": cv_text[:500],
-            "skills": {"technical_skills": [], "tools": [], "soft_skills": []},
-            "experience": [],
-            "education": [],
-            "projects": [],
-            "certifications": [],
-            "languages": [],
-            "years_of_experience": 0
-        }
+        return _fallback_cv(cv_text, e)
 
 def store_cv_embeddings(cv_id: str, cv_parsed: dict) -> str:
     """Generate and store embeddings for different CV sections in Qdrant"""
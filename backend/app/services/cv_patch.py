@@ -0,0 +1,139 @@
+"""
+Patch-mode CV optimization helpers (CV_OPTIMIZE_MODE=patch)
+Instead of re-emitting the whole CV, the model returns a short list of
+JSON-patch-like edits which are validated and applied locally:
+
+    {"op": "replace", "path": "/professional_summary", "value": "..."}
+    {"op": "replace", "path": "/experience/0/achievements/2", "value": "..."}
+    {"op": "add", "path": "/experience/1/achievements/-", "value": "..."}
+    {"op": "add", "path": "/skills/technical_skills/-", "value": "Kubernetes"}
+    {"op": "replace", "path": "/projects/0/description", "value": "..."}
+
+Only these paths are editable - contact details, education, companies,
+roles and dates can never be changed by a patch.
+"""
+
+import re
+import copy
+from typing import Any, List, Tuple
+
+SKILL_CATEGORIES = ("technical_skills", "tools", "soft_skills")
+
+# (op, pattern) pairs a patch may use
+EDITABLE_PATHS = [
+    ("replace", re.compile(r"^/professional_summary$")),
+    ("replace", re.compile(r"^/experience/(\d+)/achievements/(\d+)$")),
+    ("add", re.compile(r"^/experience/(\d+)/achievements/-$")),
+    ("add", re.compile(r"^/skills/(%s)/-$" % "|".join(SKILL_CATEGORIES))),
+    ("replace", re.compile(r"^/projects/(\d+)/description$")),
+]
+
+MAX_TEXT_LENGTH = 1000
+MAX_SKILL_LENGTH = 60
+# More edits than this is a rewrite, not a patch - the rest are ignored
+MAX_EDITS = 40
+
+PATCH_RESPONSE_SCHEMA = """{
+    "edits": [
+        {"op": "replace|add", "path": "one of the editable paths", "value": "string"}
+    ]
+}"""
+
+
+def indexed_cv_view(cv: dict) -> str:
+    """The editable parts of the CV with the indexes patches refer to"""
+    lines = [f"/professional_summary: {cv.get('professional_summary', '')}", "/experience:"]
+    for i, exp in enumerate(cv.get('experience', []) or []):
+        lines.append(f"  [{i}] {exp.get('role', '')} at {exp.get('company', '')} ({exp.get('duration', '')})")
+        for j, bullet in enumerate(exp.get('achievements', []) or []):
+            lines.append(f"      achievements[{j}]: {bullet}")
+    skills = cv.get('skills', {}) or {}
+    lines.append("/skills:")
+    for category in SKILL_CATEGORIES:
+        lines.append(f"  {category}: {', '.join(skills.get(category, []) or [])}")
+    lines.append("/projects:")
+    for i, project in enumerate(cv.get('projects', []) or []):
+        lines.append(f"  [{i}] {project.get('name', '')}: {project.get('description', '')}")
+    return "\n".join(lines)
+
+
+def changed_answers(previous: dict, current: dict) -> dict:
+    """Answers that are new or differ from the previous submission"""
+    return {key: value for key, value in (current or {}).items() if (previous or {}).get(key) != value}
+
+
+def removed_answers(previous: dict, current: dict) -> bool:
+    """True if a previous answer was dropped or blanked - edits on top of that result cannot take it back"""
+    return any(value and not (current or {}).get(key) for key, value in (previous or {}).items())
+
+
+def _valid_text(value: Any, max_length: int) -> bool:
+    return isinstance(value, str) and 0 < len(value.strip()) <= max_length
+
+
+def _apply_edit(cv: dict, edit: dict) -> bool:
+    """Apply one edit in place; False if it is not allowed or does not fit the CV"""
+    if not isinstance(edit, dict):
+        return False
+    op, path, value = edit.get("op"), edit.get("path", ""), edit.get("value")
+    for allowed_op, pattern in EDITABLE_PATHS:
+        match = pattern.match(path) if isinstance(path, str) else None
+        if op == allowed_op and match:
+            break
+    else:
+        return False
+
+    parts = path.strip("/").split("/")
+    if parts[0] == "professional_summary":
+        if not _valid_text(value, MAX_TEXT_LENGTH):
+            return False
+        cv["professional_summary"] = value.strip()
+        return True
+
+    if parts[0] == "skills":
+        if not _valid_text(value, MAX_SKILL_LENGTH):
+            return False
+        # Parsed CVs may carry null sections - replace them rather than fail on them
+        categories = cv.get("skills") or {}
+        cv["skills"] = categories
+        skills = categories.get(parts[1]) or []
+        categories[parts[1]] = skills
+        if value.strip().lower() in {s.lower() for s in skills}:
+            return False
+        skills.append(value.strip())
+        return True
+
+    if not _valid_text(value, MAX_TEXT_LENGTH):
+        return False
+    items = cv.get(parts[0], []) or []
+    index = int(parts[1])
+    if index >= len(items) or not isinstance(items[index], dict):
+        return False
+
+    if parts[0] == "projects":
+        items[index]["description"] = value.strip()
+        return True
+
+    bullets = items[index].get("achievements") or []
+    items[index]["achievements"] = bullets
+    if parts[3] == "-":
+        bullets.append(value.strip())
+        return True
+    bullet_index = int(parts[3])
+    if bullet_index >= len(bullets):
+        return False
+    bullets[bullet_index] = value.strip()
+    return True
+
+
+def apply_cv_patch(cv: dict, edits: List[dict]) -> Tuple[dict, int, int]:
+    """Apply validated edits to a copy of cv; returns (patched, applied, rejected)"""
+    patched = copy.deepcopy(cv)
+    applied = rejected = 0
+    for edit in (edits or [])[:MAX_EDITS]:
+        if _apply_edit(patched, edit):
+            applied += 1
+        else:
+            rejected += 1
+            print(f"⚠️  Rejected CV edit: {edit}")
+    return patched, applied, rejected
@@ -0,0 +1,59 @@
+"""
+Reusable CV profiles (/api/cv-profiles)
+Candidates apply to many jobs. A profile is extracted, parsed and embedded
+once - one vector per section (full, summary, skills, each role and
+project) in the CV collection - and every later analysis against a new JD
+starts from it, paying only for the JD parse, scoring and questions.
+
+Usage:
+    profile = await create_cv_profile(file.filename, file_path, db)
+    state = new_profile_pipeline_state(profile, jd_text)
+    await run_pipeline(state, db, RequestDeadline(), completed=PROFILE_COMPLETED_STAGES)
+"""
+
+import asyncio
+from sqlalchemy.orm import Session
+from app.models import CVProfile
+from app.services.cv_parser import parse_cv_with_gemini_async
+from app.services.embeddings import generate_embeddings_batch, cv_section_texts
+from app.services.qdrant_service import store_cv_sections
+from app.services.pipeline import extract_cv_text
+
+
+def _embed_and_store_sections(profile_id: str, cv_parsed: dict) -> dict:
+    """Embed every section in one batch and store them in one upsert; section -> point ID"""
+    sections = cv_section_texts(cv_parsed)
+    print(f"⚡ Generating {len(sections)} section embeddings in batch...")
+    embeddings = generate_embeddings_batch(list(sections.values()))
+    return store_cv_sections(
+        cv_id=profile_id,
+        sections=[
+            {"section": name, "text": text, "embedding": embedding}
+            for (name, text), embedding in zip(sections.items(), embeddings)
+        ],
+        metadata={
+            "cv_profile_id": profile_id,
+            "name": cv_parsed.get('personal_info', {}).get('name', 'Unknown'),
+            "years_of_experience": cv_parsed.get('years_of_experience', 0)
+        }
+    )
+
+
+async def create_cv_profile(filename: str, file_path: str, db: Session) -> CVProfile:
+    """Extract, parse and embed a CV once; raises ValueError if it cannot be parsed"""
+    cv_text = await extract_cv_text(filename, file_path)
+    cv_parsed = await parse_cv_with_gemini_async(cv_text)
+    if cv_parsed.get("error"):
+        # A fallback parse would be reused by every later analysis - refuse to store it
+        raise ValueError(f"CV parsing failed: {cv_parsed['error']}")
+
+    profile = CVProfile(cv_filename=filename, cv_text=cv_text, cv_parsed=cv_parsed)
+    db.add(profile)
+    db.flush()
+
+    section_ids = await asyncio.to_thread(_embed_and_store_sections, profile.id, cv_parsed)
+    profile.section_embedding_ids = section_ids
+    profile.cv_embedding_id = section_ids.get("full")
+    db.commit()
+    print(f"✅ Stored CV profile {profile.id} ({len(section_ids)} section vectors)")
+    return profile
@@ -0,0 +1,78 @@
+"""
+Request-level deadline budget for the analysis pipeline
+Created once per request and passed through every stage, so each stage
+gets the remaining budget as its timeout instead of its own fixed one
+"""
+
+import math
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+from app.config import get_settings
+from app.services.timeout_handler import deadline_scope
+
+settings = get_settings()
+
+
+class RequestDeadline:
+    """
+    Time budget shared by all stages of one request
+
+    Usage:
+        deadline = RequestDeadline(45)
+        cv_parsed = await parse_cv_with_gemini_async(cv_text, deadline=deadline)
+        ...
+        return {..., "degraded_stages": deadline.cut_stages}
+    """
+
+    def __init__(self, budget_seconds: Optional[float] = None):
+        self.budget_seconds = budget_seconds or settings.REQUEST_BUDGET_SECONDS
+        self.started_at = time.monotonic()
+        self.deadline = self.started_at + self.budget_seconds
+        self.cut_stages: List[str] = []
+
+    def remaining(self) -> float:
+        """Seconds left in the budget (never negative)"""
+        return max(self.deadline - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout_for(self, cap: Optional[float] = None) -> float:
+        """Timeout for the next stage: the remaining budget, optionally capped"""
+        remaining = self.remaining()
+        return min(remaining, cap) if cap else remaining
+
+    def qdrant_timeout(self) -> int:
+        """Remaining budget as the whole seconds Qdrant's timeout expects"""
+        return max(1, math.ceil(self.remaining()))
+
+    def mark_cut(self, stage: str):
+        """Record that a stage was skipped or degraded because the budget ran out"""
+        if stage not in self.cut_stages:
+            print(f"⏰ Deadline exceeded, degrading stage: {stage}")
+            self.cut_stages.append(stage)
+
+    @contextmanager
+    def bind(self):
+        """Bound every timeout/retry scope opened in this block by the deadline"""
+        with deadline_scope(self.deadline):
+            yield
+
+    def summary(self) -> dict:
+        return {
+            "budget_seconds": self.budget_seconds,
+            "elapsed_seconds": round(time.monotonic() - self.started_at, 3),
+            "cut_stages": list(self.cut_stages)
+        }
+
+
+@contextmanager
+def bind_deadline(deadline: Optional[RequestDeadline]):
+    """deadline.bind() that tolerates deadline=None"""
+    if deadline is None:
+        yield
+        return
+    with deadline.bind():
+        yield
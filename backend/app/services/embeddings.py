@@ -1,7 +1,7 @@
 from sentence_transformers import SentenceTransformer
 from app.config import get_settings
 import numpy as np
-from typing import List, Union
+from typing import Dict, List, Union
 
 settings = get_settings()
 
@@ -20,10 +20,10 @@ def generate_embedding(text: str) -> List[float]:
     embedding = model.encode(text, convert_to_tensor=False)
     return embedding.tolist()
 
-def generate_embeddings_batch(texts: List[str]) -> List[List[float]]:
+def generate_embeddings_batch(texts: List[str], batch_size: int = 32) -> List[List[float]]:
     """Generate embeddings for multiple texts"""
     model = get_embedding_model()
-    embeddings = model.encode(texts, convert_to_tensor=False)
+    embeddings = model.encode(texts, batch_size=batch_size, convert_to_tensor=False)
     return embeddings.tolist()
 
 def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
@@ -32,6 +32,40 @@ def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
     vec2_np = np.array(vec2)
     return float(np.dot(vec1_np, vec2_np) / (np.linalg.norm(vec1_np) * np.linalg.norm(vec2_np)))
 
+def cv_embedding_text(cv_parsed: dict) -> str:
+    """The text a CV is embedded as (summary, skills, roles)"""
+    cv_full_text = f"""
+    Summary: {cv_parsed.get('professional_summary', '')}
+    Skills: {', '.join(cv_parsed.get('skills', {}).get('technical_skills', []))}
+    Experience: {' '.join([f"{exp.get('role', '')} at {exp.get('company', '')}" for exp in cv_parsed.get('experience', [])])}
+    """
+    return cv_full_text.strip()
+
+def cv_section_texts(cv_parsed: dict) -> Dict[str, str]:
+    """Section name -> text for a CV's section vectors; "full" is the usual whole-CV text"""
+    sections = {'full': cv_embedding_text(cv_parsed)}
+    if cv_parsed.get('professional_summary'):
+        sections['summary'] = cv_parsed['professional_summary']
+    skills = cv_parsed.get('skills', {}) or {}
+    skill_names = list(skills.get('technical_skills', []) or []) + list(skills.get('tools', []) or [])
+    if skill_names:
+        sections['skills'] = f"Skills: {', '.join(skill_names)}"
+    for i, exp in enumerate(cv_parsed.get('experience', []) or []):
+        achievements = ' '.join(exp.get('achievements', []) or [])
+        sections[f'experience_{i}'] = f"{exp.get('role', '')} at {exp.get('company', '')}: {achievements}".strip()
+    for i, project in enumerate(cv_parsed.get('projects', []) or []):
+        sections[f'project_{i}'] = f"{project.get('name', '')}: {project.get('description', '')}".strip()
+    return sections
+
+def jd_embedding_text(jd_parsed: dict) -> str:
+    """The text a JD is embedded as (position, requirements, responsibilities)"""
+    jd_full_text = f"""
+    Position: {jd_parsed.get('position_title', '')}
+    Requirements: {', '.join([skill['skill'] for skill in jd_parsed.get('hard_skills_required', [])])}
+    Responsibilities: {' '.join(jd_parsed.get('responsibilities', []))}
+    """
+    return jd_full_text.strip()
+
 def generate_cv_jd_embeddings_batch(cv_parsed: dict, jd_parsed: dict) -> dict:
     """
     Generate all required embeddings for CV and JD analysis in a single batch
@@ -44,21 +78,11 @@ def generate_cv_jd_embeddings_batch(cv_parsed: dict, jd_parsed: dict) -> dict:
     text_labels = []
 
     # 1. CV full text
-    cv_full_text = f"""
-    Summary: {cv_parsed.get('professional_summary', '')}
-    Skills: {', '.join(cv_parsed.get('skills', {}).get('technical_skills', []))}
-    Experience: {' '.join([f"{exp.get('role', '')} at {exp.get('company', '')}" for exp in cv_parsed.get('experience', [])])}
-    """
-    texts_to_embed.append(cv_full_text.strip())
+    texts_to_embed.append(cv_embedding_text(cv_parsed))
     text_labels.append('cv_full')
 
     # 2. JD full text
-    jd_full_text = f"""
-    Position: {jd_parsed.get('position_title', '')}
-    Requirements: {', '.join([skill['skill'] for skill in jd_parsed.get('hard_skills_required', [])])}
-    Responsibilities: {' '.join(jd_parsed.get('responsibilities', []))}
-    """
-    texts_to_embed.append(jd_full_text.strip())
+    texts_to_embed.append(jd_embedding_text(jd_parsed))
     text_labels.append('jd_full')
 
     # 3. Score query embedding
@@ -0,0 +1,414 @@
+"""
+Offline stand-in for Gemini (LLM_BACKEND=fake)
+Returns schema-valid JSON for every operation with latency drawn from a
+configurable distribution, so load and latency experiments run without an
+API key and are reproducible with FAKE_LLM_SEED.
+
+Latency per call:
+    log-normal(median, sigma)
+    x tail multiplier for FAKE_LLM_TAIL_PROBABILITY of calls
+    + FAKE_LLM_SECONDS_PER_OUTPUT_TOKEN per generated token
+    all x FAKE_LLM_TIME_SCALE (e.g. 0.01 for fast benchmarks)
+
+Streamed calls (stream=True) deliver the same payload in chunks: the first
+after FAKE_LLM_FIRST_CHUNK_SHARE of the drawn latency, the rest spread
+evenly over the remainder.
+
+Injected failures: FAKE_LLM_RATE_LIMIT_RATE of calls raise a 429
+(ResourceExhausted); FAKE_LLM_TIMEOUT_RATE of calls hang until the caller's
+timeout fires (or FAKE_LLM_HANG_SECONDS) and then raise DeadlineExceeded.
+"""
+
+import re
+import json
+import math
+import time
+import random
+import asyncio
+import hashlib
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional
+from google.api_core import exceptions as google_exceptions
+from app.config import get_settings
+from app.services.rate_limiter import estimate_tokens
+from app.services.compact_output import COMPACT_OUTPUT_MARKER, COMPACT_SPECS, compress
+
+settings = get_settings()
+
+_rng = random.Random(settings.FAKE_LLM_SEED)
+
+
+def _prompt_seed(prompt: str) -> int:
+    """Stable per-prompt seed so the same input always gets the same answer"""
+    return int(hashlib.sha256(prompt.encode()).hexdigest()[:8], 16)
+
+
+def _find_email(prompt: str) -> Optional[str]:
+    match = re.search(r"[\w.+-]+@[\w-]+\.[\w.]+", prompt)
+    return match.group(0) if match else None
+
+
+def _cv_parse(prompt: str) -> dict:
+    return {
+        "personal_info": {
+            "name": "Alex Doe",
+            "email": _find_email(prompt) or "alex.doe@example.com",
+            "phone": None,
+            "location": "Berlin, Germany",
+            "linkedin": None,
+            "github": None,
+            "portfolio": None
+        },
+        "professional_summary": "Full stack developer building scalable web applications.",
+        "skills": {
+            "technical_skills": ["JavaScript", "TypeScript", "React", "Node.js", "PostgreSQL"],
+            "tools": ["Docker", "Git", "AWS"],
+            "soft_skills": ["Communication", "Teamwork", "Problem solving"]
+        },
+        "experience": [
+            {
+                "company": "Acme Corp",
+                "role": "Senior Developer",
+                "duration": "2020 - Present",
+                "location": "Berlin",
+                "achievements": ["Cut page load time by 40%", "Led migration to microservices"]
+            },
+            {
+                "company": "Startup GmbH",
+                "role": "Developer",
+                "duration": "2017 - 2020",
+                "location": None,
+                "achievements": ["Built the customer dashboard in React"]
+            }
+        ],
+        "education": [
+            {"degree": "BSc Computer Science", "institution": "TU Berlin", "year": "2017", "gpa": None}
+        ],
+        "projects": [
+            {
+                "name": "Open source CLI",
+                "description": "Developer tooling for API testing",
+                "technologies": ["Node.js", "TypeScript"],
+                "link": None
+            }
+        ],
+        "certifications": ["AWS Certified Developer"],
+        "languages": ["English", "German"],
+        "years_of_experience": 7
+    }
+
+
+def _jd_analyze(prompt: str) -> dict:
+    return {
+        "company_name": "Example Cloud Inc",
+        "position_title": "Senior Full Stack Developer",
+        "location": "Remote",
+        "work_mode": "remote",
+        "salary_range": None,
+        "experience_years_required": 5,
+        "experience_level": "senior",
+        "hard_skills_required": [
+            {"skill": "React", "priority": "critical"},
+            {"skill": "Node.js", "priority": "critical"},
+            {"skill": "Kubernetes", "priority": "important"},
+            {"skill": "GraphQL", "priority": "nice"}
+        ],
+        "soft_skills_required": ["Mentoring", "Communication"],
+        "responsibilities": ["Design scalable microservices", "Mentor junior developers"],
+        "tech_stack": ["React", "Node.js", "PostgreSQL", "AWS", "Kubernetes"],
+        "domain_expertise": {"industry": "SaaS", "specific_knowledge": ["Cloud platforms"]},
+        "implicit_requirements": ["Ownership of production systems"],
+        "company_culture_signals": ["Remote-first"],
+        "ats_keywords": ["React", "Node.js", "AWS", "microservices"]
+    }
+
+
+def _score(prompt: str) -> dict:
+    rng = random.Random(_prompt_seed(prompt))
+    parts = {
+        "hard_skills": (35, rng.randint(50, 95)),
+        "soft_skills": (15, rng.randint(50, 95)),
+        "experience": (20, rng.randint(50, 100)),
+        "domain": (15, rng.randint(40, 90)),
+        "portfolio": (10, rng.randint(40, 90)),
+        "logistics": (5, rng.randint(70, 100)),
+    }
+    overall = round(sum(weight * score for weight, score in parts.values()) / 100)
+    breakdown = {
+        name: {"score": score, "weight": weight, "assessment": "Simulated assessment"}
+        for name, (weight, score) in parts.items()
+    }
+    breakdown["hard_skills"].update({"matched": ["React", "Node.js"], "missing": ["Kubernetes", "GraphQL"]})
+    breakdown["soft_skills"].update({"matched": ["Communication"], "missing": ["Mentoring"]})
+    breakdown["experience"].update({"candidate_years": 7, "required_years": 5})
+    return {
+        "overall_score": overall,
+        "breakdown": breakdown,
+        "top_gaps": [
+            {"gap": "Kubernetes", "priority": "critical", "impact": "+10% score if added"},
+            {"gap": "GraphQL", "priority": "medium", "impact": "+3% score if added"}
+        ],
+        "strengths": ["Strong React and Node.js background"],
+        "recommendations": ["Highlight any container orchestration experience"]
+    }
+
+
+def _questions(prompt: str) -> list:
+    return [
+        {
+            "question": "Have you deployed or operated services on Kubernetes?",
+            "category": "technical",
+            "priority": "critical",
+            "potential_impact": "+10% score if yes",
+            "why_asking": "Kubernetes is a critical requirement missing from the CV",
+            "suggested_answers": [
+                "Yes, I deployed our services to EKS and maintained the Helm charts",
+                "I used Kubernetes locally with minikube for side projects",
+                "No, but I have extensive Docker experience"
+            ]
+        },
+        {
+            "question": "Have you mentored other developers?",
+            "category": "soft_skills",
+            "priority": "high",
+            "potential_impact": "+5% score if yes",
+            "why_asking": "The role includes mentoring junior developers",
+            "suggested_answers": [
+                "Yes, I onboarded and mentored two junior developers",
+                "I regularly run code reviews and pairing sessions",
+                "Not formally yet"
+            ]
+        }
+    ]
+
+
+def _cv_optimize_patch(prompt: str) -> dict:
+    return {
+        "edits": [
+            {"op": "replace", "path": "/professional_summary",
+             "value": "Full-stack engineer with 5 years building scalable Python and React products."},
+            {"op": "replace", "path": "/experience/0/achievements/0",
+             "value": "Cut API latency by 40% by introducing Redis caching and query tuning"},
+            {"op": "add", "path": "/experience/0/achievements/-",
+             "value": "Containerised 6 services with Docker and deployed them to Kubernetes"},
+            {"op": "add", "path": "/skills/tools/-", "value": "Kubernetes"}
+        ]
+    }
+
+
+def _cover_letter(prompt: str) -> dict:
+    return {
+        "opening_paragraph": "I am excited to apply for the Senior Full Stack Developer role.",
+        "body_paragraph_1": "At Acme Corp I led the migration to microservices and cut page load time by 40%.",
+        "body_paragraph_2": "Your focus on scalable cloud products matches the work I enjoy most.",
+        "body_paragraph_3": None,
+        "closing_paragraph": "I would welcome the chance to discuss how I can contribute to your team.",
+        "signature": {
+            "name": "Alex Doe",
+            "email": _find_email(prompt) or "alex.doe@example.com",
+            "phone": "",
+            "location": "Berlin, Germany"
+        }
+    }
+
+
+def _learning_path(prompt: str) -> dict:
+    return {
+        "current_score": 70,
+        "target_score": 85,
+        "estimated_weeks": 6,
+        "quick_wins": [
+            {"action": "Add Docker projects to CV", "time": "2 hours", "impact": "+3% score",
+             "description": "Shows container experience relevant to Kubernetes"}
+        ],
+        "priority_courses": [
+            {
+                "title": "Kubernetes for Developers",
+                "platform": "Udemy",
+                "url": None,
+                "duration": "20 hours",
+                "cost": "$19.99",
+                "impact": "+10% score",
+                "priority": "critical",
+                "skills_covered": ["Kubernetes", "Helm"],
+                "why_recommended": "Closes the biggest gap in the job requirements"
+            }
+        ],
+        "roadmap": [
+            {"week": 1, "focus": "Kubernetes basics", "tasks": ["Complete modules 1-3"],
+             "hours_per_week": 8, "milestone": "Deploy a sample app locally"}
+        ],
+        "total_investment": {"time_hours": 40, "cost_usd": 20, "expected_score_improvement": "+15%"},
+        "recommendations": ["Build a small project that uses the new skills"]
+    }
+
+
+def _interview_prep(prompt: str) -> dict:
+    return {
+        "stages": [
+            {
+                "stage_name": "Phone Screen",
+                "duration": "30 minutes",
+                "interviewer": "HR/Recruiter",
+                "focus": "Culture fit, basic qualifications",
+                "questions": [
+                    {
+                        "question": "Why are you interested in this role?",
+                        "category": "motivation",
+                        "priority": "critical",
+                        "suggested_answer": "I enjoy building scalable products and your platform is a great fit.",
+                        "tips": ["Connect your answer to the company's mission"],
+                        "why_they_ask": "Checks motivation and research"
+                    }
+                ]
+            }
+        ],
+        "technical_deep_dives": [
+            {
+                "topic": "Microservices architecture",
+                "likely_questions": ["How do you handle service-to-service failures?"],
+                "preparation_tips": ["Review the migration project at Acme Corp"],
+                "example_projects_to_mention": ["Microservices migration"]
+            }
+        ],
+        "star_method_examples": [
+            {
+                "situation": "Slow page loads hurt conversion",
+                "task": "Improve frontend performance",
+                "action": "Introduced code splitting and caching",
+                "result": "Page load time cut by 40%",
+                "applicable_to": ["performance", "impact"]
+            }
+        ],
+        "red_flags_to_address": [
+            {
+                "concern": "No Kubernetes in CV",
+                "how_to_address": "Point to Docker experience and current learning",
+                "example_response": "I have run containers in production and am learning Kubernetes now."
+            }
+        ],
+        "questions_to_ask_them": [
+            {"question": "How is the platform team organised?", "category": "team",
+             "why_ask": "Shows interest in collaboration"}
+        ],
+        "general_tips": ["Use concrete numbers from your experience"]
+    }
+
+
+# cv_optimize returns the CV structure, so it reuses the parse payload
+RESPONSE_BUILDERS: Dict[str, Callable[[str], Any]] = {
+    "cv_parse": _cv_parse,
+    "jd_analyze": _jd_analyze,
+    "score": _score,
+    "questions": _questions,
+    "score_questions": lambda prompt: {"score": _score(prompt), "questions": _questions(prompt)},
+    "cv_optimize": _cv_parse,
+    "cv_optimize_patch": _cv_optimize_patch,
+    "cover_letter": _cover_letter,
+    "learning_path": _learning_path,
+    "interview_prep": _interview_prep,
+}
+
+
+class _UsageMetadata:
+    def __init__(self, prompt_tokens: int, output_tokens: int):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+
+
+class FakeResponse:
+    """Mimics the parts of GenerateContentResponse the client reads"""
+
+    def __init__(self, text: str, prompt: str):
+        self.text = text
+        self.usage_metadata = _UsageMetadata(estimate_tokens(prompt), estimate_tokens(text))
+
+
+class FakeStreamResponse:
+    """Mimics an async streamed GenerateContentResponse: iterate for chunks with .text"""
+
+    CHUNK_CHARS = 64
+
+    def __init__(self, response: FakeResponse, latency: float):
+        self.text = response.text
+        self.usage_metadata = response.usage_metadata
+        self._latency = latency
+
+    async def __aiter__(self):
+        chunks = [self.text[i:i + self.CHUNK_CHARS] for i in range(0, len(self.text), self.CHUNK_CHARS)]
+        first = self._latency * settings.FAKE_LLM_FIRST_CHUNK_SHARE
+        rest = (self._latency - first) / max(len(chunks) - 1, 1)
+        for index, text in enumerate(chunks):
+            await asyncio.sleep(first if index == 0 else rest)
+            yield FakeResponse(text, "")
+
+
+def sample_latency(output_tokens: int = 0) -> float:
+    """Draw one call latency (seconds, already time-scaled)"""
+    latency = _rng.lognormvariate(math.log(settings.FAKE_LLM_LATENCY_MEDIAN), settings.FAKE_LLM_LATENCY_SIGMA)
+    if _rng.random() < settings.FAKE_LLM_TAIL_PROBABILITY:
+        latency *= settings.FAKE_LLM_TAIL_MULTIPLIER
+    latency += output_tokens * settings.FAKE_LLM_SECONDS_PER_OUTPUT_TOKEN
+    return latency * settings.FAKE_LLM_TIME_SCALE
+
+
+def _draw_failure() -> Optional[str]:
+    roll = _rng.random()
+    if roll < settings.FAKE_LLM_RATE_LIMIT_RATE:
+        return "rate_limited"
+    if roll < settings.FAKE_LLM_RATE_LIMIT_RATE + settings.FAKE_LLM_TIMEOUT_RATE:
+        return "timeout"
+    return None
+
+
+class FakeGenerativeModel:
+    """Drop-in for genai.GenerativeModel serving one operation's payload"""
+
+    def __init__(self, operation: Optional[str]):
+        self.operation = operation
+        self._build = RESPONSE_BUILDERS.get(operation, lambda prompt: {})
+
+    def _respond(self, prompt: str) -> FakeResponse:
+        payload = self._build(prompt)
+        if COMPACT_OUTPUT_MARKER in prompt and self.operation in COMPACT_SPECS:
+            payload = compress(payload, COMPACT_SPECS[self.operation])
+        return FakeResponse(json.dumps(payload), prompt)
+
+    def _hang_seconds(self, request_options: Optional[dict]) -> float:
+        hang = settings.FAKE_LLM_HANG_SECONDS * settings.FAKE_LLM_TIME_SCALE
+        timeout = (request_options or {}).get("timeout")
+        return min(hang, timeout) if timeout else hang
+
+    def generate_content(self, prompt: str, request_options: Optional[dict] = None, **kwargs) -> FakeResponse:
+        failure = _draw_failure()
+        if failure == "rate_limited":
+            raise google_exceptions.ResourceExhausted("429 Resource has been exhausted (fake backend)")
+        if failure == "timeout":
+            time.sleep(self._hang_seconds(request_options))
+            raise google_exceptions.DeadlineExceeded("504 Deadline Exceeded (fake backend)")
+
+        response = self._respond(prompt)
+        time.sleep(sample_latency(response.usage_metadata.candidates_token_count))
+        return response
+
+    async def generate_content_async(self, prompt: str, request_options: Optional[dict] = None,
+                                     stream: bool = False, **kwargs) -> FakeResponse:
+        failure = _draw_failure()
+        if failure == "rate_limited":
+            raise google_exceptions.ResourceExhausted("429 Resource has been exhausted (fake backend)")
+        if failure == "timeout":
+            # Usually cancelled first by the caller's asyncio timeout
+            await asyncio.sleep(self._hang_seconds(request_options))
+            raise google_exceptions.DeadlineExceeded("504 Deadline Exceeded (fake backend)")
+
+        response = self._respond(prompt)
+        latency = sample_latency(response.usage_metadata.candidates_token_count)
+        if stream:
+            return FakeStreamResponse(response, latency)
+        await asyncio.sleep(latency)
+        return response
+
+
+@lru_cache(maxsize=32)
+def get_fake_model(operation: Optional[str]) -> FakeGenerativeModel:
+    return FakeGenerativeModel(operation)
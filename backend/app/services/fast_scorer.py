@@ -0,0 +1,278 @@
+"""
+Deterministic local compatibility scorer (SCORING_MODE=fast / hybrid)
+Computes the same weighted breakdown the LLM scorer returns - hard skills
+35, soft skills 15, experience 20, domain 15, portfolio 10, logistics 5 -
+from the parsed CV and JD, without a Gemini round trip.
+
+Skills are matched in two passes: normalized names first (case, punctuation
+and common aliases such as "k8s" -> "kubernetes"), then embedding similarity
+for whatever is still unmatched. Skill embeddings are memoised, so a warm
+call takes a few milliseconds.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+import numpy as np
+from app.config import get_settings
+
+settings = get_settings()
+
+WEIGHTS = {
+    "hard_skills": 35,
+    "soft_skills": 15,
+    "experience": 20,
+    "domain": 15,
+    "portfolio": 10,
+    "logistics": 5,
+}
+
+# How much each JD skill priority counts towards the hard-skill score
+PRIORITY_WEIGHTS = {"critical": 3.0, "important": 2.0, "nice": 1.0}
+
+SKILL_ALIASES = {
+    "js": "javascript",
+    "ts": "typescript",
+    "node": "nodejs",
+    "reactjs": "react",
+    "vuejs": "vue",
+    "nextjs": "next",
+    "postgres": "postgresql",
+    "psql": "postgresql",
+    "mongo": "mongodb",
+    "k8s": "kubernetes",
+    "amazon web services": "aws",
+    "gcp": "google cloud",
+    "google cloud platform": "google cloud",
+    "ml": "machine learning",
+    "ci cd": "cicd",
+    "golang": "go",
+}
+
+# Max memoised skill embeddings
+EMBEDDING_CACHE_SIZE = 5000
+_embedding_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+# Scoring runs in worker threads (bulk ranking, fast/hybrid uploads) - guards the cache, not the model call
+_embedding_cache_lock = threading.Lock()
+
+
+def normalize_skill(skill: str) -> str:
+    """Canonical form used for exact matching"""
+    text = skill.lower().strip()
+    text = re.sub(r"\.(js|net)\b", r"\1", text)  # node.js -> nodejs, asp.net -> aspnet
+    text = re.sub(r"[^a-z0-9+#]+", " ", text).strip()
+    return SKILL_ALIASES.get(text, text)
+
+
+def _embed(texts: List[str], batch_size: int = 32) -> Dict[str, np.ndarray]:
+    """Unit-normalised embeddings for texts, computing only cache misses"""
+    result = {}
+    with _embedding_cache_lock:
+        for text in dict.fromkeys(texts):
+            if text in _embedding_cache:
+                _embedding_cache.move_to_end(text)
+                result[text] = _embedding_cache[text]
+    missing = [t for t in dict.fromkeys(texts) if t not in result]
+    if missing:
+        from app.services.embeddings import generate_embeddings_batch
+        vectors = generate_embeddings_batch(missing, batch_size=batch_size)
+        # Returned from this batch, so another thread's evictions cannot take them away
+        for text, vector in zip(missing, vectors):
+            vector = np.asarray(vector, dtype=np.float32)
+            result[text] = vector / (np.linalg.norm(vector) or 1.0)
+        with _embedding_cache_lock:
+            for text in missing:
+                _embedding_cache[text] = result[text]
+            while len(_embedding_cache) > EMBEDDING_CACHE_SIZE:
+                _embedding_cache.popitem(last=False)
+    return result
+
+
+def match_skills(required: List[str], candidate: List[str]) -> Tuple[List[str], List[str]]:
+    """Split required skills into (matched, missing) against the candidate's skills"""
+    candidate_norm = {normalize_skill(s) for s in candidate if s}
+    matched, unmatched = [], []
+    for skill in required:
+        (matched if normalize_skill(skill) in candidate_norm else unmatched).append(skill)
+
+    if unmatched and candidate_norm:
+        try:
+            vectors = _embed(unmatched + sorted(candidate_norm))
+            candidate_matrix = np.stack([vectors[s] for s in sorted(candidate_norm)])
+            still_missing = []
+            for skill in unmatched:
+                best = float(np.max(candidate_matrix @ vectors[skill]))
+                (matched if best >= settings.FAST_SCORE_SKILL_SIMILARITY else still_missing).append(skill)
+            unmatched = still_missing
+        except Exception as e:
+            # Embeddings are a refinement - exact matches alone still give a score
+            print(f"⚠️  Fast scorer embedding match skipped: {e}")
+
+    return matched, unmatched
+
+
+def _candidate_skills(cv_data: dict) -> List[str]:
+    skills = cv_data.get('skills', {}) or {}
+    found = list(skills.get('technical_skills', [])) + list(skills.get('tools', []))
+    for project in cv_data.get('projects', []) or []:
+        found.extend(project.get('technologies', []) or [])
+    return found
+
+
+def prepare_skill_embeddings(cvs: List[dict], jd_data: dict, batch_size: int = 256):
+    """
+    Embed every skill that scoring these CVs against one JD will compare, in
+    one large batch - calculate_fast_score then only hits the memo. Used by
+    bulk ranking, where per-CV batches of a dozen skills would dominate.
+    """
+    hard_names, _, _ = _hard_skill_priorities(jd_data)
+    texts = hard_names + list(jd_data.get('soft_skills_required', []) or [])
+    for cv_data in cvs:
+        texts.extend(normalize_skill(s) for s in _candidate_skills(cv_data) if s)
+        texts.extend(normalize_skill(s) for s in (cv_data.get('skills', {}) or {}).get('soft_skills', []) if s)
+    texts = list(dict.fromkeys(texts))
+    # The memo must hold all of them at once, or the per-CV calls would recompute evicted ones
+    if texts and len(texts) <= EMBEDDING_CACHE_SIZE:
+        _embed(texts, batch_size=batch_size)
+
+
+def _cv_text(cv_data: dict) -> str:
+    parts = [cv_data.get('professional_summary', '') or '']
+    for exp in cv_data.get('experience', []) or []:
+        parts.append(f"{exp.get('role', '')} {exp.get('company', '')}")
+        parts.extend(exp.get('achievements', []) or [])
+    for project in cv_data.get('projects', []) or []:
+        parts.append(project.get('description', '') or '')
+    return " ".join(parts).lower()
+
+
+def _as_years(value) -> float:
+    """Years from LLM JSON as a number: 5, "5", "5+", "3-5 years" (first number) - else 0"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return max(0.0, float(value))
+    match = re.search(r"\d+(?:\.\d+)?", value) if isinstance(value, str) else None
+    return float(match.group()) if match else 0.0
+
+
+def _experience_score(candidate_years: float, required_years: float) -> int:
+    if not required_years:
+        return 100
+    return round(min(1.0, candidate_years / required_years) * 100)
+
+
+def _domain_score(cv_data: dict, jd_data: dict) -> Tuple[int, str]:
+    domain = jd_data.get('domain_expertise', {}) or {}
+    terms = list(domain.get('specific_knowledge', []) or []) + list(jd_data.get('tech_stack', []) or [])
+    if domain.get('industry'):
+        terms.append(domain['industry'])
+    if not terms:
+        return 70, "No specific domain requirements stated"
+
+    text = _cv_text(cv_data)
+    skills_norm = {normalize_skill(s) for s in _candidate_skills(cv_data)}
+    hits = [t for t in terms if t.lower() in text or normalize_skill(t) in skills_norm]
+    score = round(len(hits) / len(terms) * 100)
+    return score, f"{len(hits)} of {len(terms)} domain and stack terms found in the CV"
+
+
+def _portfolio_score(cv_data: dict) -> Tuple[int, str]:
+    projects = cv_data.get('projects', []) or []
+    info = cv_data.get('personal_info', {}) or {}
+    has_link = bool(info.get('github') or info.get('portfolio')) or any(p.get('link') for p in projects)
+    score = min(100, 40 + 20 * len(projects) + (20 if has_link else 0))
+    return score, f"{len(projects)} project{'s' if len(projects) != 1 else ''} listed{', public links available' if has_link else ''}"
+
+
+def _logistics_score(cv_data: dict, jd_data: dict) -> Tuple[int, str]:
+    work_mode = (jd_data.get('work_mode') or '').lower()
+    if work_mode == 'remote':
+        return 100, "Remote role"
+    cv_location = ((cv_data.get('personal_info', {}) or {}).get('location') or '').lower()
+    jd_location = (jd_data.get('location') or '').lower()
+    if not cv_location or not jd_location:
+        return 80, "Location not stated on both sides"
+    city = jd_location.split(',')[0].strip()
+    if city and city in cv_location:
+        return 100, "Candidate is based in the job location"
+    return 60, "Candidate may need to relocate or commute"
+
+
+def _hard_skill_gaps(missing: List[str], priorities: Dict[str, float], total_weight: float) -> List[dict]:
+    """Missing hard skills in the top_gaps shape, most important first"""
+    # Impact = that skill's share of the hard-skill weight
+    return [
+        {
+            "gap": skill,
+            "priority": "critical" if priorities[skill] >= 3 else "high" if priorities[skill] >= 2 else "medium",
+            "impact": f"+{max(1, round(WEIGHTS['hard_skills'] * priorities[skill] / total_weight))}% score if added"
+        }
+        for skill in sorted(missing, key=lambda s: -priorities[s])
+    ][:5]
+
+
+def _hard_skill_priorities(jd_data: dict) -> Tuple[List[str], Dict[str, float], float]:
+    hard_required = jd_data.get('hard_skills_required', []) or []
+    names = [s.get('skill', '') for s in hard_required if s.get('skill')]
+    priorities = {s.get('skill', ''): PRIORITY_WEIGHTS.get(s.get('priority'), 2.0) for s in hard_required}
+    return names, priorities, sum(priorities[s] for s in names) or 1.0
+
+
+def estimate_gaps(cv_data: dict, jd_data: dict) -> List[dict]:
+    """Required hard skills the CV does not show - a local guess at the LLM's top_gaps"""
+    names, priorities, total_weight = _hard_skill_priorities(jd_data)
+    _, missing = match_skills(names, _candidate_skills(cv_data))
+    return _hard_skill_gaps(missing, priorities, total_weight)
+
+
+def calculate_fast_score(cv_data: dict, jd_data: dict) -> dict:
+    """Compatibility score in the same shape as the LLM scorer, computed locally"""
+    hard_names, priorities, total_weight = _hard_skill_priorities(jd_data)
+    hard_matched, hard_missing = match_skills(hard_names, _candidate_skills(cv_data))
+    hard_score = round(sum(priorities[s] for s in hard_matched) / total_weight * 100) if hard_names else 100
+
+    soft_required = jd_data.get('soft_skills_required', []) or []
+    soft_matched, soft_missing = match_skills(soft_required, (cv_data.get('skills', {}) or {}).get('soft_skills', []))
+    soft_score = round(len(soft_matched) / len(soft_required) * 100) if soft_required else 100
+
+    candidate_years = _as_years(cv_data.get('years_of_experience'))
+    required_years = _as_years(jd_data.get('experience_years_required'))
+    experience_score = _experience_score(candidate_years, required_years)
+    domain_score, domain_note = _domain_score(cv_data, jd_data)
+    portfolio_score, portfolio_note = _portfolio_score(cv_data)
+    logistics_score, logistics_note = _logistics_score(cv_data, jd_data)
+
+    breakdown = {
+        "hard_skills": {"score": hard_score, "weight": WEIGHTS["hard_skills"],
+                        "matched": hard_matched, "missing": hard_missing},
+        "soft_skills": {"score": soft_score, "weight": WEIGHTS["soft_skills"],
+                        "matched": soft_matched, "missing": soft_missing},
+        "experience": {"score": experience_score, "weight": WEIGHTS["experience"],
+                       "candidate_years": candidate_years, "required_years": required_years,
+                       "assessment": f"{candidate_years:g} years against {required_years:g} required"},
+        "domain": {"score": domain_score, "weight": WEIGHTS["domain"], "assessment": domain_note},
+        "portfolio": {"score": portfolio_score, "weight": WEIGHTS["portfolio"], "assessment": portfolio_note},
+        "logistics": {"score": logistics_score, "weight": WEIGHTS["logistics"], "assessment": logistics_note},
+    }
+    overall = round(sum(part["score"] * part["weight"] for part in breakdown.values()) / 100)
+
+    top_gaps = _hard_skill_gaps(hard_missing, priorities, total_weight)
+    if required_years and candidate_years < required_years:
+        top_gaps.append({
+            "gap": f"{required_years - candidate_years:g} more years of experience",
+            "priority": "high",
+            "impact": f"+{WEIGHTS['experience'] - round(experience_score * WEIGHTS['experience'] / 100)}% score"
+        })
+
+    strengths = [f"Matches required skill: {s}" for s in hard_matched[:5]]
+    if required_years and candidate_years >= required_years:
+        strengths.append(f"{candidate_years:g} years of experience meets the {required_years:g} required")
+
+    return {
+        "overall_score": overall,
+        "breakdown": breakdown,
+        "top_gaps": top_gaps,
+        "strengths": strengths,
+        "recommendations": [f"Highlight or build experience with {gap['gap']}" for gap in top_gaps[:3]],
+        "scoring_mode": "fast"
+    }
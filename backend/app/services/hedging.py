@@ -0,0 +1,173 @@
+"""
+Hedged requests for tail-latency reduction
+If an LLM call has not finished by the operation's tracked latency
+percentile (p90 by default), one duplicate is issued; the first good
+response wins and the other call is cancelled.
+
+Hedges are paid from a token budget: every primary call earns
+LLM_HEDGE_BUDGET_RATIO tokens and every hedge spends one, so at most
+~5% extra calls are made however slow upstream gets.
+
+Usage:
+    result = await hedged("score", lambda: _score_attempt(prompt))
+"""
+
+import time
+import asyncio
+import threading
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+from app.config import get_settings
+
+settings = get_settings()
+
+T = TypeVar("T")
+
+# Latency samples kept per operation
+LATENCY_WINDOW = 200
+# Max hedge tokens that can be banked during quiet periods
+MAX_BUDGET_TOKENS = 10.0
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies per operation"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, operation: str, latency: float):
+        with self._lock:
+            self._samples.setdefault(operation, deque(maxlen=self.window)).append(latency)
+
+    def percentile(self, operation: str, q: float, min_samples: int = 0) -> Optional[float]:
+        """Latency percentile, or None until min_samples have been seen"""
+        with self._lock:
+            samples = self._samples.get(operation)
+            if not samples or len(samples) < max(min_samples, 1):
+                return None
+            ordered = sorted(samples)
+        return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+class HedgeBudget:
+    """Token bucket capping hedges to a fraction of primary calls"""
+
+    def __init__(self, ratio: float, max_tokens: float = MAX_BUDGET_TOKENS):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = 0.0
+        self._lock = threading.Lock()
+
+    def earn(self):
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return True
+            return False
+
+
+class Hedger:
+    """Runs calls with an optional hedge once they pass the latency percentile"""
+
+    def __init__(
+        self,
+        enabled: bool,
+        percentile: float,
+        budget_ratio: float,
+        min_samples: int
+    ):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.tracker = LatencyTracker()
+        self.budget = HedgeBudget(budget_ratio)
+        self._counters = {"calls": 0, "hedges": 0, "hedge_wins": 0, "budget_denied": 0}
+
+    async def run(self, operation: str, make_call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run make_call(), hedging with a second make_call() if it is slow
+
+        make_call must create a fresh awaitable on every invocation. A call
+        that raises is not "good": the other call's result is used instead.
+        """
+        self._counters["calls"] += 1
+        self.budget.earn()
+        started = time.monotonic()
+
+        hedge_after = None
+        if self.enabled:
+            hedge_after = self.tracker.percentile(operation, self.percentile, self.min_samples)
+
+        primary = asyncio.ensure_future(make_call())
+        if hedge_after is None:
+            result = await primary
+            self.tracker.record(operation, time.monotonic() - started)
+            return result
+
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+        except asyncio.CancelledError:
+            primary.cancel()
+            raise
+        if done:
+            result = primary.result()
+            self.tracker.record(operation, time.monotonic() - started)
+            return result
+
+        if not self.budget.try_spend():
+            self._counters["budget_denied"] += 1
+            result = await primary
+            self.tracker.record(operation, time.monotonic() - started)
+            return result
+
+        self._counters["hedges"] += 1
+        print(f"🪁 Hedging {operation} after {hedge_after:.2f}s")
+        hedge = asyncio.ensure_future(make_call())
+        pending = {primary, hedge}
+        last_error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.cancelled():
+                        continue
+                    if task.exception() is not None:
+                        last_error = task.exception()
+                        continue
+                    if task is hedge:
+                        self._counters["hedge_wins"] += 1
+                    self.tracker.record(operation, time.monotonic() - started)
+                    return task.result()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "percentile": self.percentile,
+            "budget_tokens": round(self.budget.tokens, 2),
+            "hedge_rate": round(self._counters["hedges"] / max(self._counters["calls"], 1), 4),
+            **self._counters
+        }
+
+
+# Process-wide hedger shared by all LLM call sites
+hedger = Hedger(
+    enabled=settings.LLM_HEDGING_ENABLED,
+    percentile=settings.LLM_HEDGE_PERCENTILE,
+    budget_ratio=settings.LLM_HEDGE_BUDGET_RATIO,
+    min_samples=settings.LLM_HEDGE_MIN_SAMPLES
+)
+
+
+async def hedged(operation: str, make_call: Callable[[], Awaitable[T]]) -> T:
+    """Run an LLM call through the shared hedger"""
+    return await hedger.run(operation, make_call)
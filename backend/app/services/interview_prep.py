@@ -1,24 +1,29 @@
 import os
-import google.generativeai as genai
-import json
+import asyncio
 from app.config import get_settings
 from app.services.embeddings import generate_embedding
 from app.services.qdrant_service import get_rag_context_for_cv, get_rag_context_for_jd
 from app.services.toon_serializer import to_toon_string
+from app.services.prompt_compaction import compact_inputs
+from app.services.llm_client import generate_json, generate_json_async
+from app.services.compact_output import INTERVIEW_PREP_COMPACT
 
 settings = get_settings()
-genai.configure(api_key=settings.GEMINI_API_KEY)
 
-def generate_interview_prep(
-    cv_data: dict,
+INTERVIEW_PREP_GENERATION_CONFIG = {
+    "temperature": 0.4,
+    "response_mime_type": "application/json"
+}
+
+
+def build_interview_prep_prompt(
     jd_data: dict,
     optimized_cv: dict,
     answers: dict,
-    cv_id: str = None
-) -> dict:
-    """Generate comprehensive interview preparation guide"""
-
-    model = genai.GenerativeModel('gemini-2.0-flash-exp')
+    cv_id: str = None,
+    fragments: dict = None
+) -> str:
+    """Interview prep prompt with RAG context (shared by the blocking and streaming paths)"""
 
     # Get RAG context from similar successful interviews
     rag_context = ""
@@ -31,16 +36,19 @@ def generate_interview_prep(
     if rag_context:
         rag_section = f"INSIGHTS FROM SIMILAR SUCCESSFUL INTERVIEWS:\n{rag_context}\n\n"
 
+    # Only the fields this generator uses, within its token budget
+    inputs = compact_inputs("interview_prep", cv=optimized_cv, jd=jd_data, answers=answers)
+
     prompt = f"""Create a comprehensive interview preparation guide for this candidate:
 
 CANDIDATE PROFILE (OPTIMIZED):
-{to_toon_string(optimized_cv)}
+{to_toon_string(inputs['cv'], fragments)}
 
 JOB DESCRIPTION:
-{to_toon_string(jd_data)}
+{to_toon_string(inputs['jd'], fragments)}
 
 ADDITIONAL CONTEXT:
-{to_toon_string(answers)}
+{to_toon_string(inputs['answers'], fragments)}
 
 {rag_section}Generate interview prep covering:
 1. Phone Screen (30 min) - HR/Recruiter questions
@@ -109,32 +117,59 @@ Return JSON:
 
 Base ALL answers on the candidate's ACTUAL experience from their CV. Be specific and authentic."""
 
-    generation_config = {
-        "temperature": 0.4,
-        "response_mime_type": "application/json"
+    return prompt
+
+
+def _fallback_interview_prep(error: Exception) -> dict:
+    return {
+        "error": str(error),
+        "stages": [],
+        "technical_deep_dives": [],
+        "star_method_examples": [],
+        "red_flags_to_address": [],
+        "questions_to_ask_them": [],
+        "general_tips": []
     }
 
-    try:
-        response = model.generate_content(prompt, generation_config=generation_config)
-        response_text = response.text.strip()
 
-        if response_text.startswith("```"):
-            response_text = response_text.split("```")[1]
-            if response_text.startswith("json"):
-                response_text = response_text[4:]
-            response_text = response_text.strip()
+def generate_interview_prep(
+    cv_data: dict,
+    jd_data: dict,
+    optimized_cv: dict,
+    answers: dict,
+    cv_id: str = None,
+    fragments: dict = None
+) -> dict:
+    """Generate comprehensive interview preparation guide"""
+
+    prompt = build_interview_prep_prompt(jd_data, optimized_cv, answers, cv_id, fragments)
 
-        interview_prep = json.loads(response_text)
+    try:
+        interview_prep = generate_json("interview_prep", prompt, INTERVIEW_PREP_GENERATION_CONFIG, compact_spec=INTERVIEW_PREP_COMPACT)
         return interview_prep
 
     except Exception as e:
         print(f"Error generating interview prep with Gemini: {e}")
-        return {
-            "error": str(e),
-            "stages": [],
-            "technical_deep_dives": [],
-            "star_method_examples": [],
-            "red_flags_to_address": [],
-            "questions_to_ask_them": [],
-            "general_tips": []
-        }
+        return _fallback_interview_prep(e)
+
+
+async def generate_interview_prep_async(
+    cv_data: dict,
+    jd_data: dict,
+    optimized_cv: dict,
+    answers: dict,
+    cv_id: str = None,
+    fragments: dict = None
+) -> dict:
+    """Generate interview preparation guide (ASYNC: RAG lookups in a worker thread)"""
+
+    prompt = await asyncio.to_thread(build_interview_prep_prompt, jd_data, optimized_cv, answers, cv_id, fragments)
+
+    try:
+        return await generate_json_async(
+            "interview_prep", prompt, INTERVIEW_PREP_GENERATION_CONFIG, compact_spec=INTERVIEW_PREP_COMPACT
+        )
+
+    except Exception as e:
+        print(f"Error generating interview prep with Gemini: {e}")
+        return _fallback_interview_prep(e)
@@ -1,23 +1,22 @@
 import os
-import google.generativeai as genai
-import json
+from typing import Optional
 from app.config import get_settings
 from app.services.embeddings import generate_embedding
 from app.services.qdrant_service import store_jd_embedding
 from app.services.cache_service import cached
-from app.services.timeout_handler import with_timeout_and_retry
+from app.services.deadline import RequestDeadline, bind_deadline
+from app.services.llm_client import generate_json, generate_json_async
 
 settings = get_settings()
-genai.configure(api_key=settings.GEMINI_API_KEY)
 
-@cached("jd_analyze", ttl=3600)
-@with_timeout_and_retry(timeout_seconds=30, max_retries=2)
-def analyze_jd_with_gemini(jd_text: str) -> dict:
-    """Extract requirements from job description"""
-
-    model = genai.GenerativeModel('gemini-2.0-flash-exp')
+JD_ANALYZE_GENERATION_CONFIG = {
+    "temperature": 0.3,
+    "response_mime_type": "application/json"
+}
 
-    prompt = f"""Analyze this job description and extract requirements:
+def _build_jd_analyze_prompt(jd_text: str) -> str:
+    """Prompt asking Gemini for the structured JD requirements"""
+    return f"""Analyze this job description and extract requirements:
 
 {jd_text}
 
@@ -50,25 +49,34 @@ Return ONLY a valid JSON object (no markdown, no backticks) with:
 
 Be thorough and extract all information."""
 
-    generation_config = {
-        "temperature": 0.3,
-        "response_mime_type": "application/json"
-    }
+# Per-attempt timeout and retries for the analysis call
+JD_ANALYZE_TIMEOUT = 30
+JD_ANALYZE_RETRIES = 2
 
+@cached("jd_analyze", ttl=3600, stale_ttl=settings.CACHE_STALE_TTL)
+def analyze_jd_with_gemini(jd_text: str) -> dict:
+    """Extract requirements from job description"""
     try:
-        response = model.generate_content(prompt, generation_config=generation_config)
-        response_text = response.text.strip()
-
-        if response_text.startswith("```"):
-            response_text = response_text.split("```")[1]
-            if response_text.startswith("json"):
-                response_text = response_text[4:]
-            response_text = response_text.strip()
-
-        parsed_data = json.loads(response_text)
-        return parsed_data
+        return generate_json(
+            "jd_analyze", _build_jd_analyze_prompt(jd_text), JD_ANALYZE_GENERATION_CONFIG,
+            timeout_seconds=JD_ANALYZE_TIMEOUT, max_retries=JD_ANALYZE_RETRIES
+        )
+    except Exception as e:
+        print(f"Error analyzing JD with Gemini: {e}")
+        return {"error": str(e)}
 
+@cached("jd_analyze", ttl=3600, stale_ttl=settings.CACHE_STALE_TTL)
+async def analyze_jd_with_gemini_async(jd_text: str, deadline: Optional[RequestDeadline] = None) -> dict:
+    """Extract requirements from job description (ASYNC, shares the jd_analyze cache)"""
+    try:
+        with bind_deadline(deadline):
+            return await generate_json_async(
+                "jd_analyze", _build_jd_analyze_prompt(jd_text), JD_ANALYZE_GENERATION_CONFIG,
+                timeout_seconds=JD_ANALYZE_TIMEOUT, max_retries=JD_ANALYZE_RETRIES
+            )
     except Exception as e:
+        if deadline and deadline.expired:
+            deadline.mark_cut("parse_jd")
         print(f"Error analyzing JD with Gemini: {e}")
         return {"error": str(e)}
 
@@ -0,0 +1,242 @@
+"""
+Background analysis jobs (POST /api/upload-cv/jobs)
+The endpoint stores the upload, creates an AnalysisJob and returns 202; a
+pool of worker tasks takes job IDs off a queue and runs the pipeline,
+checkpointing the job after every stage. A failed attempt is re-queued up
+to JOB_MAX_ATTEMPTS times and resumes from the last completed stage, as do
+jobs interrupted by a restart.
+
+Queue backends (JOB_QUEUE_BACKEND):
+    local: in-process asyncio queue - jobs are recovered from the DB at startup
+    redis: shared list, so several API processes can feed one worker pool
+"""
+
+import copy
+import time
+import asyncio
+from datetime import datetime, timedelta
+from typing import List, Optional
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models import AnalysisJob
+from app.services.deadline import RequestDeadline
+from app.services.pipeline import STAGES, run_pipeline, pipeline_response
+
+settings = get_settings()
+
+JOB_QUEUE_KEY = "hirehub:jobs"
+# Redis BLPOP timeout; must stay under the client's 5s socket timeout
+POLL_SECONDS = 1
+# Automatic retries wait attempts x this long before re-queueing
+RETRY_BACKOFF_SECONDS = 2
+
+
+class _LocalQueue:
+    def __init__(self):
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    async def put(self, job_id: str):
+        self._queue.put_nowait(job_id)
+
+    async def get(self) -> Optional[str]:
+        return await self._queue.get()
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+
+class _RedisQueue:
+    async def put(self, job_id: str):
+        from app.services.cache_service import get_redis_client
+        await asyncio.to_thread(get_redis_client().rpush, JOB_QUEUE_KEY, job_id)
+
+    async def get(self) -> Optional[str]:
+        from app.services.cache_service import get_redis_client
+        try:
+            item = await asyncio.to_thread(get_redis_client().blpop, JOB_QUEUE_KEY, POLL_SECONDS)
+        except Exception as e:
+            print(f"⚠️  Job queue unavailable: {e}")
+            await asyncio.sleep(POLL_SECONDS)
+            return None
+        return item[1] if item else None
+
+    def depth(self) -> int:
+        from app.services.cache_service import get_redis_client
+        try:
+            return get_redis_client().llen(JOB_QUEUE_KEY)
+        except Exception:
+            return -1
+
+
+def new_job_stages() -> dict:
+    return {stage: {"status": "pending"} for stage in STAGES}
+
+
+def job_status(job: AnalysisJob) -> dict:
+    """GET /api/jobs/{id} response"""
+    stages = job.stages or {}
+    done = sum(1 for stage in STAGES if stages.get(stage, {}).get("status") == "done")
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "current_stage": job.current_stage,
+        "stages": [{"stage": stage, **stages.get(stage, {"status": "pending"})} for stage in STAGES],
+        "progress": round(done / len(STAGES), 2),
+        "attempts": job.attempts,
+        "error": job.error,
+        "analysis_id": job.analysis_id,
+        "result": job.result
+    }
+
+
+class JobWorkers:
+    """Worker pool that runs queued analysis jobs"""
+
+    def __init__(self):
+        self.queue = None
+        self._tasks: List[asyncio.Task] = []
+        self._retry_tasks: set = set()
+        self._stats = {"completed": 0, "failed": 0, "retried": 0, "resumed": 0}
+
+    def start(self, count: int):
+        self.queue = _RedisQueue() if settings.JOB_QUEUE_BACKEND == "redis" else _LocalQueue()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(count)]
+        print(f"   👷 {count} job workers started ({settings.JOB_QUEUE_BACKEND} queue)")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def enqueue(self, job_id: str):
+        await self.queue.put(job_id)
+
+    async def _enqueue_later(self, job_id: str, delay: float):
+        await asyncio.sleep(delay)
+        await self.enqueue(job_id)
+
+    async def recover(self):
+        """Re-queue jobs a previous process left queued or running; they resume from their checkpoint"""
+        db = SessionLocal()
+        try:
+            query = db.query(AnalysisJob)
+            if settings.JOB_QUEUE_BACKEND == "redis":
+                # Queued IDs are still in Redis; only pick up runs nobody has touched for a while
+                stale_before = datetime.utcnow() - timedelta(seconds=settings.JOB_STALE_SECONDS)
+                jobs = query.filter(AnalysisJob.status == "running", AnalysisJob.updated_at < stale_before).all()
+            else:
+                jobs = query.filter(AnalysisJob.status.in_(("queued", "running"))).all()
+            for job in jobs:
+                job.status = "queued"
+            db.commit()
+            job_ids = [job.id for job in jobs]
+        finally:
+            db.close()
+
+        for job_id in job_ids:
+            await self.enqueue(job_id)
+        if job_ids:
+            print(f"   ♻️  Re-queued {len(job_ids)} interrupted jobs")
+
+    async def _worker(self, index: int):
+        while True:
+            job_id = await self.queue.get()
+            if not job_id:
+                continue
+            try:
+                await self.run_job(job_id)
+            except Exception as e:
+                # Never let one job take the worker down
+                print(f"❌ Job worker {index} error on {job_id}: {e}")
+
+    async def run_job(self, job_id: str):
+        """One attempt at a job, skipping stages already completed"""
+        db = SessionLocal()
+        try:
+            # Claim atomically so a job queued twice only runs once
+            claimed = db.query(AnalysisJob).filter(
+                AnalysisJob.id == job_id, AnalysisJob.status == "queued"
+            ).update({"status": "running"}, synchronize_session=False)
+            db.commit()
+            if not claimed:
+                return  # Unknown, finished, or picked up by another worker
+            job = db.query(AnalysisJob).filter(AnalysisJob.id == job_id).first()
+
+            stages = copy.deepcopy(job.stages or new_job_stages())
+            completed = [stage for stage in STAGES if stages.get(stage, {}).get("status") == "done"]
+            if completed:
+                self._stats["resumed"] += 1
+                print(f"♻️  Resuming job {job_id} after {completed[-1]}")
+            job.attempts = (job.attempts or 0) + 1
+            db.commit()
+
+            state = copy.deepcopy(job.state)
+            started_at = {}
+
+            def on_stage_start(stage: str):
+                started_at[stage] = time.monotonic()
+                stages[stage] = {"status": "running"}
+                job.current_stage = stage
+                job.stages = copy.deepcopy(stages)
+                db.commit()
+
+            def on_stage_done(stage: str, state: dict):
+                stages[stage] = {"status": "done", "seconds": round(time.monotonic() - started_at[stage], 2)}
+                job.stages = copy.deepcopy(stages)
+                job.state = copy.deepcopy(state)
+                # Partial results for polling clients (score, questions, ... as their stages finish)
+                job.result = pipeline_response(state)
+                if state.get("persisted"):
+                    # The analysis row only exists once persist has run
+                    job.analysis_id = state["analysis_id"]
+                db.commit()
+
+            try:
+                await run_pipeline(
+                    state, db, RequestDeadline(settings.JOB_BUDGET_SECONDS), completed,
+                    on_stage_start=on_stage_start, on_stage_done=on_stage_done
+                )
+            except Exception as e:
+                db.rollback()
+                failed_stage = getattr(e, "stage", job.current_stage)
+                for stage, info in stages.items():
+                    # Stages cancelled alongside the failing one just run again
+                    if info.get("status") == "running":
+                        stages[stage] = {"status": "pending"}
+                if failed_stage:
+                    stages[failed_stage] = {"status": "failed"}
+                job.stages = copy.deepcopy(stages)
+                job.error = str(e)
+                retry = job.attempts < settings.JOB_MAX_ATTEMPTS
+                job.status = "queued" if retry else "failed"
+                db.commit()
+                print(f"❌ Job {job_id} failed at {failed_stage} (attempt {job.attempts}): {e}")
+                if retry:
+                    self._stats["retried"] += 1
+                    task = asyncio.create_task(self._enqueue_later(job_id, RETRY_BACKOFF_SECONDS * job.attempts))
+                    self._retry_tasks.add(task)
+                    task.add_done_callback(self._retry_tasks.discard)
+                else:
+                    self._stats["failed"] += 1
+                return
+
+            job.status = "completed"
+            job.current_stage = None
+            job.error = None
+            db.commit()
+            self._stats["completed"] += 1
+            print(f"✅ Job {job_id} completed")
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        return {
+            "backend": settings.JOB_QUEUE_BACKEND,
+            "workers": len(self._tasks),
+            "queue_depth": self.queue.depth() if self.queue else 0,
+            **self._stats
+        }
+
+
+job_workers = JobWorkers()
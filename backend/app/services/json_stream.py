@@ -0,0 +1,74 @@
+"""
+Incremental parsing of a streamed JSON object
+
+Gemini streams JSON output as arbitrary text chunks. IncrementalJSONFields
+watches the top level of the object and hands back each field as soon as
+its value is complete, so a client can render e.g. the cover letter's
+opening paragraph before the closing one has been generated.
+
+Usage:
+    fields = IncrementalJSONFields()
+    async for chunk in response:
+        for name, value in fields.feed(chunk.text):
+            ...
+    result = extract_json(fields.text)
+"""
+
+import json
+from typing import List, Optional, Tuple
+
+
+class IncrementalJSONFields:
+    """Yields (name, value) for each top-level field of a JSON object once it is complete"""
+
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._key_start: Optional[int] = None
+        self._value_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, object]]:
+        self.text += chunk
+        fields = []
+        text = self.text
+        while self._pos < len(text):
+            pos, char = self._pos, text[self._pos]
+            self._pos += 1
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._value_start is None and self._key_start is None:
+                    self._key_start = pos
+            elif char == ":" and self._depth == 1 and self._value_start is None:
+                self._value_start = pos + 1
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                if self._depth == 1:
+                    self._finish_field(pos, fields)
+                self._depth -= 1
+            elif char == "," and self._depth == 1:
+                self._finish_field(pos, fields)
+        return fields
+
+    def _finish_field(self, end: int, fields: list):
+        if self._key_start is not None and self._value_start is not None:
+            try:
+                name = json.loads(self.text[self._key_start:self._value_start - 1].strip())
+                fields.append((name, json.loads(self.text[self._value_start:end])))
+            except json.JSONDecodeError:
+                pass  # Not plain JSON (e.g. fenced); the final extract_json still handles it
+        self._key_start = None
+        self._value_start = None
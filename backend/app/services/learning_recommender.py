@@ -1,24 +1,30 @@
 import os
-import google.generativeai as genai
-import json
+import asyncio
 from app.config import get_settings
 from app.services.embeddings import generate_embedding
 from app.services.qdrant_service import get_rag_context_for_cv
 from app.services.toon_serializer import to_toon_string
+from app.services.prompt_compaction import compact_inputs
+from app.services.llm_client import generate_json, generate_json_async
+from app.services.compact_output import LEARNING_PATH_COMPACT
 
 settings = get_settings()
-genai.configure(api_key=settings.GEMINI_API_KEY)
 
-def generate_learning_recommendations(
+LEARNING_PATH_GENERATION_CONFIG = {
+    "temperature": 0.4,
+    "response_mime_type": "application/json"
+}
+
+
+def build_learning_path_prompt(
     cv_data: dict,
     jd_data: dict,
     gaps: list,
     score_data: dict,
-    cv_id: str = None
-) -> dict:
-    """Generate personalized learning path with courses and timeline"""
-
-    model = genai.GenerativeModel('gemini-2.0-flash-exp')
+    cv_id: str = None,
+    fragments: dict = None
+) -> str:
+    """Learning path prompt with RAG context (shared by the blocking and async paths)"""
 
     # Get RAG context from similar successful learning paths
     rag_context = ""
@@ -33,16 +39,19 @@ def generate_learning_recommendations(
 
     current_score = score_data.get('overall_score', 0)
 
+    # Only the fields this generator uses, within its token budget
+    inputs = compact_inputs("learning_path", cv=cv_data, jd=jd_data, gaps=gaps)
+
     prompt = f"""Create a personalized learning path to improve this candidate's profile:
 
 CURRENT PROFILE:
-{to_toon_string(cv_data)}
+{to_toon_string(inputs['cv'], fragments)}
 
 JOB REQUIREMENTS:
-{to_toon_string(jd_data)}
+{to_toon_string(inputs['jd'], fragments)}
 
 IDENTIFIED GAPS:
-{to_toon_string(gaps)}
+{to_toon_string(inputs['gaps'], fragments)}
 
 CURRENT SCORE: {current_score}%
 TARGET SCORE: 85%+
@@ -99,38 +108,65 @@ Return JSON:
 
 Be specific with real courses, realistic timelines, and accurate costs."""
 
-    generation_config = {
-        "temperature": 0.4,
-        "response_mime_type": "application/json"
+    return prompt
+
+
+def _fallback_learning_path(score_data: dict, error: Exception) -> dict:
+    return {
+        "error": str(error),
+        "current_score": score_data.get('overall_score', 0),
+        "target_score": 85,
+        "estimated_weeks": 10,
+        "quick_wins": [],
+        "priority_courses": [],
+        "roadmap": [],
+        "total_investment": {
+            "time_hours": 0,
+            "cost_usd": 0,
+            "expected_score_improvement": "+0%"
+        },
+        "recommendations": []
     }
 
-    try:
-        response = model.generate_content(prompt, generation_config=generation_config)
-        response_text = response.text.strip()
 
-        if response_text.startswith("```"):
-            response_text = response_text.split("```")[1]
-            if response_text.startswith("json"):
-                response_text = response_text[4:]
-            response_text = response_text.strip()
+def generate_learning_recommendations(
+    cv_data: dict,
+    jd_data: dict,
+    gaps: list,
+    score_data: dict,
+    cv_id: str = None,
+    fragments: dict = None
+) -> dict:
+    """Generate personalized learning path with courses and timeline"""
+
+    prompt = build_learning_path_prompt(cv_data, jd_data, gaps, score_data, cv_id, fragments)
 
-        learning_path = json.loads(response_text)
+    try:
+        learning_path = generate_json("learning_path", prompt, LEARNING_PATH_GENERATION_CONFIG, compact_spec=LEARNING_PATH_COMPACT)
         return learning_path
 
     except Exception as e:
         print(f"Error generating learning recommendations with Gemini: {e}")
-        return {
-            "error": str(e),
-            "current_score": score_data.get('overall_score', 0),
-            "target_score": 85,
-            "estimated_weeks": 10,
-            "quick_wins": [],
-            "priority_courses": [],
-            "roadmap": [],
-            "total_investment": {
-                "time_hours": 0,
-                "cost_usd": 0,
-                "expected_score_improvement": "+0%"
-            },
-            "recommendations": []
-        }
+        return _fallback_learning_path(score_data, e)
+
+
+async def generate_learning_recommendations_async(
+    cv_data: dict,
+    jd_data: dict,
+    gaps: list,
+    score_data: dict,
+    cv_id: str = None,
+    fragments: dict = None
+) -> dict:
+    """Generate personalized learning path (ASYNC: RAG lookup in a worker thread)"""
+
+    prompt = await asyncio.to_thread(build_learning_path_prompt, cv_data, jd_data, gaps, score_data, cv_id, fragments)
+
+    try:
+        return await generate_json_async(
+            "learning_path", prompt, LEARNING_PATH_GENERATION_CONFIG, compact_spec=LEARNING_PATH_COMPACT
+        )
+
+    except Exception as e:
+        print(f"Error generating learning recommendations with Gemini: {e}")
+        return _fallback_learning_path(score_data, e)
@@ -0,0 +1,304 @@
+"""
+Central Gemini client - the single hot path for every LLM call
+
+    data = await generate_json_async("score", prompt, SCORE_GENERATION_CONFIG,
+                                     timeout_seconds=20, max_retries=1, hedge=True)
+    data = generate_json("cover_letter", prompt, COVER_LETTER_GENERATION_CONFIG)
+    async for kind, value in stream_json_async("cover_letter", prompt, COVER_LETTER_GENERATION_CONFIG):
+        ...  # ("delta", text) / ("field", (name, value)) / ("result", data)
+
+Each call goes through: retry -> timeout -> hedging -> rate limiter ->
+concurrency gate -> Gemini -> JSON extraction, and is recorded in the
+per-operation stats (latency, token usage, error classes).
+GenerativeModel instances are built once per (model, generation config).
+LLM_BACKEND=fake swaps Gemini for the offline stand-in in fake_llm.py.
+"""
+
+import json
+import time
+import asyncio
+import builtins
+import threading
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+import google.generativeai as genai
+from app.config import get_settings
+from app.services.llm_gate import llm_gate, CircuitOpenError
+from app.services.rate_limiter import rate_limiter
+from app.services.hedging import hedged
+from app.services.compact_output import compact_output_instructions, expand
+from app.services.json_stream import IncrementalJSONFields
+from app.services.timeout_handler import (
+    TimeoutError,
+    RetryExhaustedError,
+    with_timeout_and_retry,
+    with_timeout_and_retry_async,
+    with_timeout,
+    with_timeout_async,
+    get_remaining_timeout,
+    is_retryable_error
+)
+
+settings = get_settings()
+genai.configure(api_key=settings.GEMINI_API_KEY)
+
+DEFAULT_MODEL = "gemini-2.0-flash-exp"
+# Upper bound for a call made outside any timeout scope
+UNSCOPED_REQUEST_TIMEOUT = 120
+
+
+@lru_cache(maxsize=32)
+def _cached_model(model_name: str, config_key: str):
+    return genai.GenerativeModel(model_name, generation_config=json.loads(config_key))
+
+
+def get_model(
+    generation_config: Optional[dict] = None,
+    model_name: str = DEFAULT_MODEL,
+    operation: Optional[str] = None
+):
+    """Shared GenerativeModel for a (model, generation config) pair, or the offline stand-in"""
+    if settings.LLM_BACKEND == "fake":
+        from app.services.fake_llm import get_fake_model
+        return get_fake_model(operation)
+    return _cached_model(model_name, json.dumps(generation_config or {}, sort_keys=True))
+
+
+def extract_json(response_text: str) -> Any:
+    """
+    Decode model output as JSON
+
+    With response_mime_type=application/json the body is bare JSON, so try
+    that first; only fall back to stripping markdown fences when it fails.
+    """
+    try:
+        return json.loads(response_text)
+    except json.JSONDecodeError:
+        pass
+
+    response_text = response_text.strip()
+    if response_text.startswith("```"):
+        response_text = response_text.split("```")[1]
+        if response_text.startswith("json"):
+            response_text = response_text[4:]
+        response_text = response_text.strip()
+
+    return json.loads(response_text)
+
+
+def classify_error(exc: BaseException) -> str:
+    """Coarse error class used for stats and logging"""
+    if isinstance(exc, CircuitOpenError):
+        return "circuit_open"
+    if isinstance(exc, RetryExhaustedError):
+        return "retries_exhausted"
+    if isinstance(exc, (TimeoutError, builtins.TimeoutError)):
+        return "timeout"
+    if isinstance(exc, (json.JSONDecodeError, ValueError)):
+        return "parse_error"
+    if getattr(exc, "code", None) == 429 or "resource exhausted" in str(exc).lower():
+        return "rate_limited"
+    if is_retryable_error(exc):
+        return "upstream_error"
+    return "client_error"
+
+
+class _LLMStats:
+    """Per-operation call counts, latency, token usage and error classes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ops: Dict[str, dict] = {}
+
+    def _op(self, operation: str) -> dict:
+        return self._ops.setdefault(operation, {
+            "calls": 0, "errors": {}, "latency_total": 0.0,
+            "prompt_tokens": 0, "output_tokens": 0
+        })
+
+    def record_call(self, operation: str, latency: float, response: Any):
+        usage = getattr(response, "usage_metadata", None)
+        with self._lock:
+            op = self._op(operation)
+            op["calls"] += 1
+            op["latency_total"] += latency
+            if usage is not None:
+                op["prompt_tokens"] += getattr(usage, "prompt_token_count", 0) or 0
+                op["output_tokens"] += getattr(usage, "candidates_token_count", 0) or 0
+
+    def record_error(self, operation: str, exc: BaseException):
+        error_class = classify_error(exc)
+        with self._lock:
+            errors = self._op(operation)["errors"]
+            errors[error_class] = errors.get(error_class, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._ops.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                name: {
+                    "calls": op["calls"],
+                    "avg_latency": round(op["latency_total"] / op["calls"], 3) if op["calls"] else 0.0,
+                    "prompt_tokens": op["prompt_tokens"],
+                    "output_tokens": op["output_tokens"],
+                    "errors": dict(op["errors"])
+                }
+                for name, op in self._ops.items()
+            }
+
+
+llm_stats = _LLMStats()
+
+
+def _call(operation: str, prompt: str, generation_config: Optional[dict]) -> Any:
+    """One blocking Gemini call plus JSON decoding"""
+    model = get_model(generation_config, operation=operation)
+    rate_limiter.acquire(operation, prompt)
+    started = time.monotonic()
+    with llm_gate.slot(operation):
+        response = model.generate_content(
+            prompt,
+            request_options={"timeout": get_remaining_timeout(default=UNSCOPED_REQUEST_TIMEOUT)}
+        )
+    llm_stats.record_call(operation, time.monotonic() - started, response)
+    return extract_json(response.text)
+
+
+async def _call_async(operation: str, prompt: str, generation_config: Optional[dict]) -> Any:
+    """One async Gemini call plus JSON decoding"""
+    model = get_model(generation_config, operation=operation)
+    await rate_limiter.acquire_async(operation, prompt)
+    started = time.monotonic()
+    async with llm_gate.slot_async(operation):
+        response = await model.generate_content_async(prompt)
+    llm_stats.record_call(operation, time.monotonic() - started, response)
+    return extract_json(response.text)
+
+
+def _with_compact_output(prompt: str, compact_spec: Any):
+    """Append the compact-format instructions when the mode is on"""
+    if compact_spec is None or not settings.LLM_COMPACT_OUTPUT:
+        return prompt, None
+    return prompt + "\n\n" + compact_output_instructions(compact_spec), compact_spec
+
+
+def generate_json(
+    operation: str,
+    prompt: str,
+    generation_config: Optional[dict] = None,
+    timeout_seconds: Optional[int] = None,
+    max_retries: Optional[int] = None,
+    compact_spec: Any = None
+) -> Any:
+    """
+    Blocking LLM call returning decoded JSON
+
+    timeout_seconds / max_retries add the timeout_handler policies; without
+    them the call runs once, bounded only by any enclosing deadline.
+    With compact_spec and LLM_COMPACT_OUTPUT on, the model answers with
+    short keys/positional rows which are expanded to the full shape here.
+    Errors are recorded and re-raised for the caller's fallback.
+    """
+    prompt, compact_spec = _with_compact_output(prompt, compact_spec)
+
+    def attempt():
+        return _call(operation, prompt, generation_config)
+    attempt.__name__ = operation  # readable retry/timeout log lines
+
+    if max_retries is not None:
+        attempt = with_timeout_and_retry(timeout_seconds, max_retries)(attempt)
+    elif timeout_seconds is not None:
+        attempt = with_timeout(timeout_seconds)(attempt)
+
+    try:
+        return expand(attempt(), compact_spec)
+    except Exception as e:
+        llm_stats.record_error(operation, e)
+        raise
+
+
+async def generate_json_async(
+    operation: str,
+    prompt: str,
+    generation_config: Optional[dict] = None,
+    timeout_seconds: Optional[int] = None,
+    max_retries: Optional[int] = None,
+    hedge: bool = False,
+    compact_spec: Any = None
+) -> Any:
+    """
+    Async LLM call returning decoded JSON
+
+    Same policies as generate_json; hedge=True also routes each attempt
+    through the shared hedger (a parse failure lets the hedge win).
+    """
+    prompt, compact_spec = _with_compact_output(prompt, compact_spec)
+
+    async def attempt():
+        if hedge:
+            return await hedged(operation, lambda: _call_async(operation, prompt, generation_config))
+        return await _call_async(operation, prompt, generation_config)
+    attempt.__name__ = operation
+
+    if max_retries is not None:
+        attempt = with_timeout_and_retry_async(timeout_seconds, max_retries)(attempt)
+    elif timeout_seconds is not None:
+        attempt = with_timeout_async(timeout_seconds)(attempt)
+
+    try:
+        return expand(await attempt(), compact_spec)
+    except Exception as e:
+        llm_stats.record_error(operation, e)
+        raise
+
+
+async def stream_json_async(
+    operation: str,
+    prompt: str,
+    generation_config: Optional[dict] = None
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Streamed LLM call: yields ("delta", text) per chunk, ("field", (name, value))
+    for each top-level field as soon as it is complete, then ("result", data)
+
+    No retries, hedging or compact output - chunks already reached the
+    client, so a failure is raised (and recorded) for the caller to report.
+    Bounded by the enclosing deadline (UNSCOPED_REQUEST_TIMEOUT outside one),
+    which is only enforced while waiting on Gemini, never while the caller
+    holds a chunk.
+    """
+    model = get_model(generation_config, operation=operation)
+    fields = IncrementalJSONFields()
+    budget = get_remaining_timeout(default=UNSCOPED_REQUEST_TIMEOUT)
+    deadline = asyncio.get_running_loop().time() + budget
+    try:
+        async with asyncio.timeout_at(deadline):
+            await rate_limiter.acquire_async(operation, prompt)
+        started = time.monotonic()
+        async with llm_gate.slot_async(operation):
+            async with asyncio.timeout_at(deadline):
+                response = await model.generate_content_async(prompt, stream=True)
+            chunks = aiter(response)
+            while True:
+                # Timed per chunk: a timeout must not fire while suspended at a yield below
+                async with asyncio.timeout_at(deadline):
+                    try:
+                        chunk = await anext(chunks)
+                    except StopAsyncIteration:
+                        break
+                yield "delta", chunk.text
+                for field in fields.feed(chunk.text):
+                    yield "field", field
+        llm_stats.record_call(operation, time.monotonic() - started, response)
+        result = extract_json(fields.text)
+    except builtins.TimeoutError:
+        e = TimeoutError(f"{operation} stream exceeded timeout of {budget:.1f} seconds")
+        llm_stats.record_error(operation, e)
+        raise e
+    except Exception as e:
+        llm_stats.record_error(operation, e)
+        raise
+    yield "result", result
@@ -0,0 +1,425 @@
+"""
+Shared admission gate for Gemini calls
+Adaptive (AIMD) concurrency limit + circuit breaker + queue-time metrics
+
+Every service wraps its generate_content call in a gate slot:
+
+    with llm_gate.slot("jd_analyze"):
+        response = model.generate_content(...)
+
+    async with llm_gate.slot_async("score"):
+        response = await model.generate_content_async(...)
+
+The limit grows by ~1 per window of successful calls and is cut
+multiplicatively on 429s, timeouts, 5xx or latency well above the
+operation's baseline. When the recent error rate spikes, the breaker opens
+and calls fail fast with CircuitOpenError until a cooldown probe succeeds.
+"""
+
+import time
+import asyncio
+import threading
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+from typing import Deque, Dict, Optional
+from app.config import get_settings
+from app.services.timeout_handler import TimeoutError, is_retryable_error, get_remaining_timeout
+
+settings = get_settings()
+
+# Latency above this multiple of an operation's baseline counts as overload
+LATENCY_TOLERANCE = 2.0
+# Smoothing factor for per-operation latency baselines
+BASELINE_ALPHA = 0.1
+# How often (seconds) a worker syncs with the shared Redis state
+SHARED_SYNC_INTERVAL = 1.0
+SHARED_STATE_KEY = "hirehub:llm_gate"
+# Queue-time samples kept for percentile metrics
+QUEUE_SAMPLES = 500
+# Longest a blocking caller outside any timeout scope waits for a slot
+UNSCOPED_WAIT_TIMEOUT = 120
+
+
+class CircuitOpenError(Exception):
+    """Raised when the breaker is open and the call is rejected without queueing"""
+    pass
+
+
+class _Waiter:
+    """A queued caller: either a thread (event) or a coroutine (future)"""
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop
+        self.future = loop.create_future() if loop else None
+        self.event = None if loop else threading.Event()
+        self.granted = False
+
+    def wake(self):
+        self.granted = True
+        if self.loop:
+            self.loop.call_soon_threadsafe(_set_result_if_pending, self.future)
+        else:
+            self.event.set()
+
+
+def _set_result_if_pending(future: asyncio.Future):
+    if not future.done():
+        future.set_result(True)
+
+
+class CircuitBreaker:
+    """Error-rate circuit breaker over a sliding time window"""
+
+    def __init__(self, error_rate: float, min_calls: int, window_seconds: float, cooldown_seconds: float):
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self.outcomes: Deque = deque()  # (timestamp, ok)
+        self.open_until = 0.0
+        self.probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.probe_in_flight:
+            return "half_open"
+        if not self.open_until:
+            return "closed"
+        return "open" if time.time() < self.open_until else "half_open"
+
+    def allow(self) -> bool:
+        """Admit a call; in half-open state only one probe is let through"""
+        state = self.state
+        if state == "open":
+            return False
+        if state == "half_open":
+            if self.probe_in_flight:
+                return False
+            self.probe_in_flight = True
+        return True
+
+    def record(self, ok: bool) -> bool:
+        """Record an outcome; returns True if this outcome opened the breaker"""
+        now = time.time()
+        if self.probe_in_flight:
+            self.probe_in_flight = False
+            if ok:
+                self.open_until = 0.0
+                self.outcomes.clear()
+                print("✅ LLM circuit breaker closed")
+                return False
+            self.open_until = now + self.cooldown_seconds
+            return True
+
+        self.outcomes.append((now, ok))
+        while self.outcomes and self.outcomes[0][0] < now - self.window_seconds:
+            self.outcomes.popleft()
+
+        if len(self.outcomes) >= self.min_calls:
+            failures = sum(1 for _, success in self.outcomes if not success)
+            if failures / len(self.outcomes) >= self.error_rate:
+                self.open_until = now + self.cooldown_seconds
+                self.outcomes.clear()
+                print(f"🚨 LLM circuit breaker opened for {self.cooldown_seconds}s")
+                return True
+        return False
+
+
+class LLMGate:
+    """AIMD concurrency limiter and circuit breaker shared by all LLM calls"""
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        breaker: CircuitBreaker,
+        shared_state: bool = False
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.breaker = breaker
+        self.shared_state = shared_state
+
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self._waiters: Deque[_Waiter] = deque()
+
+        self._baselines: Dict[str, float] = {}
+        self._queue_times: Deque[float] = deque(maxlen=QUEUE_SAMPLES)
+        self._counters = {"admitted": 0, "rejected": 0, "succeeded": 0, "failed": 0, "decreases": 0}
+
+        self._last_shared_sync = 0.0
+        self._last_shared_decrease = 0.0
+
+    # ---- admission -------------------------------------------------------
+
+    def _try_admit(self) -> bool:
+        """Must hold _lock. Take a slot if one is free and nobody is queued ahead."""
+        if self._inflight < int(self.limit) and not self._waiters:
+            self._inflight += 1
+            return True
+        return False
+
+    def _check_breaker(self, operation: str):
+        """Must hold _lock."""
+        if not self.breaker.allow():
+            self._counters["rejected"] += 1
+            raise CircuitOpenError(f"LLM circuit open, rejecting {operation}")
+
+    def _release(self):
+        with self._lock:
+            self._inflight -= 1
+            self._grant_waiters()
+
+    def _grant_waiters(self):
+        """Must hold _lock. Hand free slots to queued callers in FIFO order."""
+        while self._waiters and self._inflight < int(self.limit):
+            waiter = self._waiters.popleft()
+            self._inflight += 1
+            waiter.wake()
+
+    def _acquire(self, operation: str) -> float:
+        """Block the calling thread until a slot is free; returns queue time"""
+        self._sync_shared_state()
+        started = time.monotonic()
+        with self._lock:
+            self._check_breaker(operation)
+            if self._try_admit():
+                return 0.0
+            waiter = _Waiter()
+            self._waiters.append(waiter)
+        # Bounded by the caller's timeout scope, like the async path's cancellation
+        if not waiter.event.wait(timeout=get_remaining_timeout(default=UNSCOPED_WAIT_TIMEOUT)):
+            with self._lock:
+                if waiter.granted:
+                    # Slot was handed over just as the wait expired - give it back
+                    self._inflight -= 1
+                    self._grant_waiters()
+                else:
+                    self._waiters.remove(waiter)
+            raise TimeoutError(f"{operation} timed out waiting for an LLM slot")
+        return time.monotonic() - started
+
+    async def _acquire_async(self, operation: str) -> float:
+        """Wait (without blocking the loop) until a slot is free; returns queue time"""
+        if self._shared_sync_due():
+            # Blocking Redis round trip - keep it off the event loop
+            await asyncio.to_thread(self._fetch_shared_state)
+        started = time.monotonic()
+        with self._lock:
+            self._check_breaker(operation)
+            if self._try_admit():
+                return 0.0
+            waiter = _Waiter(asyncio.get_running_loop())
+            self._waiters.append(waiter)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter.granted:
+                    # Slot was handed over just as we were cancelled - give it back
+                    self._inflight -= 1
+                    self._grant_waiters()
+                else:
+                    self._waiters.remove(waiter)
+            raise
+        return time.monotonic() - started
+
+    # ---- feedback --------------------------------------------------------
+
+    def _on_complete(
+        self,
+        operation: str,
+        latency: float,
+        error: Optional[BaseException],
+        cancelled: bool = False
+    ) -> bool:
+        """Feed one call's outcome to the limiter and breaker; True if other workers should hear of it"""
+        overloaded = error is not None and is_retryable_error(error)
+        with self._lock:
+            baseline = self._baselines.get(operation)
+            slow = baseline is not None and latency > baseline * LATENCY_TOLERANCE
+
+            if cancelled:
+                # Cancelled by our own timeout or by the caller: only the
+                # latency it reached says anything about upstream health
+                if slow:
+                    self.limit = max(self.min_limit, self.limit * settings.LLM_GATE_BACKOFF_RATIO)
+                    self._counters["decreases"] += 1
+                if self.breaker.probe_in_flight:
+                    self.breaker.probe_in_flight = False
+                self._grant_waiters()
+                return False
+
+            if error is None:
+                self._counters["succeeded"] += 1
+                self._baselines[operation] = (
+                    latency if baseline is None
+                    else (1 - BASELINE_ALPHA) * baseline + BASELINE_ALPHA * latency
+                )
+            else:
+                self._counters["failed"] += 1
+
+            if overloaded or slow:
+                # Multiplicative decrease
+                self.limit = max(self.min_limit, self.limit * settings.LLM_GATE_BACKOFF_RATIO)
+                self._counters["decreases"] += 1
+                decreased = True
+            else:
+                # Additive increase: roughly +1 per `limit` successful calls
+                if error is None:
+                    self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+                decreased = False
+
+            # Only upstream/overload failures count against the breaker;
+            # a malformed response says nothing about upstream health
+            opened = self.breaker.record(not overloaded)
+            self._grant_waiters()
+
+        return self.shared_state and (decreased or opened)
+
+    # ---- public API ------------------------------------------------------
+
+    @contextmanager
+    def slot(self, operation: str):
+        """Hold a gate slot around a blocking LLM call"""
+        queue_time = self._acquire(operation)
+        self._record_admission(queue_time)
+        started = time.monotonic()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._release()
+            if self._on_complete(operation, time.monotonic() - started, error):
+                self._publish_shared_state()
+
+    @asynccontextmanager
+    async def slot_async(self, operation: str):
+        """Hold a gate slot around an async LLM call"""
+        queue_time = await self._acquire_async(operation)
+        self._record_admission(queue_time)
+        started = time.monotonic()
+        error = None
+        cancelled = False
+        try:
+            yield
+        except (asyncio.CancelledError, GeneratorExit):
+            # GeneratorExit: a streaming caller closed early (client went away) - not an upstream failure
+            cancelled = True
+            raise
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._release()
+            if self._on_complete(operation, time.monotonic() - started, error, cancelled):
+                # Blocking Redis write: fire and forget on a worker thread, off the event loop
+                asyncio.get_running_loop().run_in_executor(None, self._publish_shared_state)
+
+    def _record_admission(self, queue_time: float):
+        with self._lock:
+            self._counters["admitted"] += 1
+            self._queue_times.append(queue_time)
+        if queue_time > 1.0:
+            print(f"⏳ LLM call queued for {queue_time:.2f}s (limit={int(self.limit)})")
+
+    def has_headroom(self, share: float) -> bool:
+        """True while nobody is queued and in-flight calls are below share of the limit (background work)"""
+        with self._lock:
+            return not self._waiters and self._inflight < max(1, int(self.limit * share))
+
+    def stats(self) -> dict:
+        """Snapshot of limiter, breaker and queue-time metrics"""
+        with self._lock:
+            samples = sorted(self._queue_times)
+            return {
+                "limit": int(self.limit),
+                "inflight": self._inflight,
+                "queued": len(self._waiters),
+                "breaker_state": self.breaker.state,
+                "queue_time_p50": _percentile(samples, 0.50),
+                "queue_time_p95": _percentile(samples, 0.95),
+                "queue_time_max": samples[-1] if samples else 0.0,
+                "latency_baselines": {op: round(v, 3) for op, v in self._baselines.items()},
+                **self._counters
+            }
+
+    # ---- cross-worker state (optional) -----------------------------------
+
+    def _publish_shared_state(self):
+        """Broadcast a limit decrease / breaker opening to other workers"""
+        if not self.shared_state:
+            return
+        try:
+            from app.services.cache_service import get_redis_client
+            now = time.time()
+            self._last_shared_decrease = now
+            get_redis_client().hset(SHARED_STATE_KEY, mapping={
+                "limit": self.limit,
+                "decreased_at": now,
+                "open_until": self.breaker.open_until
+            })
+        except Exception as e:
+            print(f"⚠️  LLM gate shared state publish failed: {e}")
+
+    def _shared_sync_due(self) -> bool:
+        """True (and restarts the interval) when it is time to sync with other workers"""
+        if not self.shared_state:
+            return False
+        now = time.time()
+        with self._lock:
+            if now - self._last_shared_sync < SHARED_SYNC_INTERVAL:
+                return False
+            self._last_shared_sync = now
+        return True
+
+    def _sync_shared_state(self):
+        """Adopt decreases and breaker openings published by other workers"""
+        if self._shared_sync_due():
+            self._fetch_shared_state()
+
+    def _fetch_shared_state(self):
+        try:
+            from app.services.cache_service import get_redis_client
+            state = get_redis_client().hgetall(SHARED_STATE_KEY)
+        except Exception as e:
+            print(f"⚠️  LLM gate shared state sync failed: {e}")
+            return
+        if not state:
+            return
+        with self._lock:
+            decreased_at = float(state.get("decreased_at", 0))
+            if decreased_at > self._last_shared_decrease:
+                self._last_shared_decrease = decreased_at
+                self.limit = max(self.min_limit, min(self.limit, float(state.get("limit", self.limit))))
+            open_until = float(state.get("open_until", 0))
+            if open_until > self.breaker.open_until:
+                self.breaker.open_until = open_until
+
+
+def _percentile(sorted_samples: list, q: float) -> float:
+    if not sorted_samples:
+        return 0.0
+    index = min(int(len(sorted_samples) * q), len(sorted_samples) - 1)
+    return round(sorted_samples[index], 3)
+
+
+# Process-wide gate used by every service module
+llm_gate = LLMGate(
+    initial_limit=settings.LLM_GATE_INITIAL_LIMIT,
+    min_limit=settings.LLM_GATE_MIN_LIMIT,
+    max_limit=settings.LLM_GATE_MAX_LIMIT,
+    breaker=CircuitBreaker(
+        error_rate=settings.LLM_BREAKER_ERROR_RATE,
+        min_calls=settings.LLM_BREAKER_MIN_CALLS,
+        window_seconds=settings.LLM_BREAKER_WINDOW_SECONDS,
+        cooldown_seconds=settings.LLM_BREAKER_COOLDOWN_SECONDS
+    ),
+    shared_state=settings.LLM_GATE_SHARED_STATE
+)
@@ -0,0 +1,492 @@
+"""
+Analysis pipeline behind /api/upload-cv
+A small DAG: every stage declares the state keys it reads and writes and
+how it runs (async on the event loop, in a thread, or in a process pool).
+A stage starts as soon as the stages producing its inputs are done, so
+independent work overlaps - parse_jd runs alongside extract + parse_cv,
+and embedding + Qdrant writes run alongside scoring and questions. The
+analysis row is written once, by persist, when everything is ready.
+
+State is one plain dict, so a run can be checkpointed after any stage
+(background jobs keep it on AnalysisJob) and resumed later by skipping the
+stages that already completed. A stored CVProfile starts the same way, with
+extract and parse_cv already done (new_profile_pipeline_state).
+
+Usage:
+    state = new_pipeline_state(file.filename, file_path, jd_text, scoring_mode)
+    await run_pipeline(state, db, RequestDeadline())
+    return pipeline_response(state)
+"""
+
+import json
+import time
+import uuid
+import asyncio
+import hashlib
+import threading
+import multiprocessing
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models import CVAnalysis, CVProfile
+from app.services.cv_parser import parse_cv_with_gemini_async
+from app.services.text_extract import extract_cv_file
+from app.services.jd_analyzer import analyze_jd_with_gemini_async
+from app.services.scorer import calculate_compatibility_score, refine_score_narrative
+from app.services.question_gen import (
+    generate_smart_questions,
+    score_and_questions_speculative,
+    score_and_questions_fused
+)
+from app.services.qdrant_service import store_cv_embedding, store_jd_embedding
+from app.services.embeddings import generate_cv_jd_embeddings_batch, generate_embedding, jd_embedding_text
+from app.services.deadline import RequestDeadline
+
+settings = get_settings()
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.txt')
+
+# Bump when a change to the stages or prompts should stop uploads from reusing older analyses
+PIPELINE_VERSION = 1
+
+EXECUTORS = ("async", "thread", "process")
+
+# Progress events for streaming clients: (event name, payload)
+EventCallback = Callable[[str, dict], None]
+
+# Hybrid-scoring refinements still running (referenced so they are not collected)
+_refinement_tasks: set = set()
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+class StageContext(NamedTuple):
+    """What async and thread stages get besides their inputs (process stages get only inputs)"""
+    db: Session
+    deadline: RequestDeadline
+    emit: EventCallback
+
+
+class Stage(NamedTuple):
+    name: str
+    reads: Tuple[str, ...]
+    writes: Tuple[str, ...]
+    executor: str
+    run: Callable
+
+
+class StageFailed(Exception):
+    """A stage raised; .stage names it so job checkpoints can mark it failed"""
+
+    def __init__(self, stage: str, error: Exception):
+        super().__init__(f"{stage}: {error}")
+        self.stage = stage
+
+
+def new_pipeline_state(filename: str, file_path: str, jd_text: str, scoring_mode: Optional[str] = None) -> dict:
+    """Initial state: the pipeline inputs (must stay JSON-serializable for checkpoints)"""
+    return {
+        "filename": filename,
+        "file_path": file_path,
+        "jd_text": jd_text,
+        "scoring_mode": scoring_mode,
+        # Assigned up front so vectors, RAG lookups and the row all share it before persist
+        "analysis_id": str(uuid.uuid4()),
+        "cv_profile": None,
+        "content_hash": None,
+        "degraded_stages": []
+    }
+
+
+def analysis_content_hash(cv_text: str, jd_text: str, scoring_mode: Optional[str] = None) -> str:
+    """Identity of an analysis' inputs: identical CV and JD text under the same pipeline give the same hash"""
+    key = [PIPELINE_VERSION, settings.PIPELINE_MODE, scoring_mode or settings.SCORING_MODE, cv_text, jd_text]
+    return hashlib.sha256(json.dumps(key).encode()).hexdigest()
+
+
+# A stored profile already carries these stages' outputs
+PROFILE_COMPLETED_STAGES = ("extract", "parse_cv")
+
+
+def new_profile_pipeline_state(profile: CVProfile, jd_text: str, scoring_mode: Optional[str] = None) -> dict:
+    """Initial state for analyzing a stored CVProfile: run with completed=PROFILE_COMPLETED_STAGES"""
+    state = new_pipeline_state(profile.cv_filename, None, jd_text, scoring_mode)
+    state.update({
+        "cv_text": profile.cv_text,
+        "cv_parsed": profile.cv_parsed,
+        # The CV's vectors are stored with the profile; only the JD gets embedded
+        "cv_profile": {"id": profile.id, "cv_embedding_id": profile.cv_embedding_id}
+    })
+    return state
+
+
+async def _refine_score_in_background(analysis_id: str, cv_parsed: dict, jd_parsed: dict, fast_score: dict):
+    """Hybrid scoring: store the LLM's narrative once it arrives"""
+    try:
+        refined = await refine_score_narrative(cv_parsed, jd_parsed, fast_score, analysis_id)
+        if not refined.get('refined'):
+            return
+        db = SessionLocal()
+        try:
+            analysis = db.query(CVAnalysis).filter(CVAnalysis.id == analysis_id).first()
+            if analysis:
+                analysis.score_breakdown = refined.get('breakdown')
+                analysis.strengths = refined.get('strengths', [])
+                db.commit()
+        finally:
+            db.close()
+        print(f"✅ Refined score narrative for {analysis_id}")
+    except Exception as e:
+        print(f"⚠️  Score refinement for {analysis_id} failed: {e}")
+
+
+async def _parse_cv(ctx: StageContext, cv_text: str) -> dict:
+    cv_parsed = await parse_cv_with_gemini_async(cv_text, deadline=ctx.deadline)
+    ctx.emit("cv_parsed", {"cv_parsed": cv_parsed})
+    return {"cv_parsed": cv_parsed}
+
+
+async def _parse_jd(ctx: StageContext, jd_text: str) -> dict:
+    # Needs only the request body, so it runs alongside extract + parse_cv
+    jd_parsed = await analyze_jd_with_gemini_async(jd_text, deadline=ctx.deadline)
+    ctx.emit("jd_parsed", {"jd_parsed": jd_parsed})
+    return {"jd_parsed": jd_parsed}
+
+
+def _embed(ctx: StageContext, cv_parsed: dict, jd_parsed: dict, cv_profile: Optional[dict]) -> dict:
+    # Vectors only feed RAG for later requests - skip them when out of budget
+    if ctx.deadline.expired:
+        ctx.deadline.mark_cut("store_vectors")
+        return {"embeddings": None}
+
+    if cv_profile:
+        jd_text = jd_embedding_text(jd_parsed)
+        return {"embeddings": {"jd_full": {"text": jd_text, "embedding": generate_embedding(jd_text)}}}
+
+    # OPTIMIZATION: Generate all embeddings in batch (saves ~1.7 seconds)
+    print("⚡ Generating embeddings in batch...")
+    batch = generate_cv_jd_embeddings_batch(cv_parsed, jd_parsed)
+    return {"embeddings": {key: batch[key] for key in ("cv_full", "jd_full")}}
+
+
+def _store_vectors(ctx: StageContext, analysis_id: str, cv_parsed: dict, jd_parsed: dict,
+                   embeddings: Optional[dict], cv_profile: Optional[dict]) -> dict:
+    profile_embedding_id = cv_profile["cv_embedding_id"] if cv_profile else None
+    if not embeddings or ctx.deadline.expired:
+        ctx.deadline.mark_cut("store_vectors")
+        return {"cv_embedding_id": profile_embedding_id, "jd_embedding_id": None}
+
+    # Store CV embedding in Qdrant (a profile's is stored already)
+    cv_embedding_id = profile_embedding_id
+    if not cv_profile:
+        cv_embedding_id = store_cv_embedding(
+            cv_id=analysis_id,
+            text=embeddings['cv_full']['text'],
+            embedding=embeddings['cv_full']['embedding'],
+            metadata={
+                "section": "full",
+                "name": cv_parsed.get('personal_info', {}).get('name', 'Unknown'),
+                "years_of_experience": cv_parsed.get('years_of_experience', 0)
+            }
+        )
+
+    # Store JD embedding in Qdrant
+    jd_embedding_id = store_jd_embedding(
+        jd_id=analysis_id,
+        text=embeddings['jd_full']['text'],
+        embedding=embeddings['jd_full']['embedding'],
+        metadata={
+            "requirement_type": "full",
+            "position": jd_parsed.get('position_title', 'Unknown'),
+            "company": jd_parsed.get('company_name', 'Unknown')
+        }
+    )
+    return {"cv_embedding_id": cv_embedding_id, "jd_embedding_id": jd_embedding_id}
+
+
+async def _score(ctx: StageContext, analysis_id: str, cv_parsed: dict, jd_parsed: dict, scoring_mode: Optional[str]) -> dict:
+    effective_scoring_mode = scoring_mode or settings.SCORING_MODE
+    prefetched_questions = None
+
+    if settings.PIPELINE_MODE == "fused" and effective_scoring_mode == "llm":
+        # One Gemini call returns both the breakdown and the gap questions
+        print("⚡ Running fused scoring + question generation (async)...")
+        score_data, prefetched_questions = await score_and_questions_fused(
+            cv_parsed, jd_parsed, analysis_id, deadline=ctx.deadline
+        )
+    elif settings.PIPELINE_MODE == "speculative" and effective_scoring_mode == "llm":
+        # Questions start from locally estimated gaps, in parallel with scoring
+        print("⚡ Running scoring and question generation speculatively in parallel...")
+        score_data, prefetched_questions = await score_and_questions_speculative(
+            cv_parsed, jd_parsed, analysis_id, deadline=ctx.deadline, scoring_mode=scoring_mode
+        )
+    else:
+        # Calculate compatibility score (fast/llm/hybrid, see SCORING_MODE)
+        print("⚡ Running compatibility scoring (async)...")
+        score_data = await calculate_compatibility_score(
+            cv_parsed, jd_parsed, analysis_id, deadline=ctx.deadline, scoring_mode=scoring_mode
+        )
+
+    top_gaps = score_data.get('top_gaps', [])
+    ctx.emit("score", {
+        "score": score_data.get('overall_score'),
+        "breakdown": score_data.get('breakdown'),
+        "strengths": score_data.get('strengths'),
+        "scoring_mode": score_data.get('scoring_mode', 'llm')
+    })
+    ctx.emit("gaps", {"gaps": top_gaps})
+    return {"score_data": score_data, "top_gaps": top_gaps, "prefetched_questions": prefetched_questions}
+
+
+async def _questions(ctx: StageContext, analysis_id: str, cv_parsed: dict, jd_parsed: dict,
+                     top_gaps: list, prefetched_questions: Optional[list]) -> dict:
+    # Fused and speculative scoring already produced them
+    questions = prefetched_questions
+    if questions is None:
+        # Generate smart questions with RAG (ASYNC)
+        print("⚡ Running question generation (async)...")
+        questions = await generate_smart_questions(cv_parsed, jd_parsed, top_gaps, analysis_id, deadline=ctx.deadline)
+    ctx.emit("questions", {"questions": questions})
+    return {"questions": questions}
+
+
+async def _persist(ctx: StageContext, analysis_id: str, filename: str, cv_text: str, cv_parsed: dict,
+                   jd_text: str, jd_parsed: dict, score_data: dict, top_gaps: list, questions: list,
+                   cv_embedding_id: Optional[str], jd_embedding_id: Optional[str], cv_profile: Optional[dict],
+                   content_hash: Optional[str]) -> dict:
+    # A degraded or failed-over analysis is not worth reusing - a retry should get the full one
+    reusable = not ctx.deadline.cut_stages and not any(part.get('error') for part in (cv_parsed, jd_parsed, score_data))
+
+    # One write for the whole analysis; merge keeps it idempotent when a job retries
+    ctx.db.merge(CVAnalysis(
+        id=analysis_id,
+        cv_filename=filename,
+        cv_text=cv_text,
+        cv_parsed=cv_parsed,
+        jd_text=jd_text,
+        jd_parsed=jd_parsed,
+        cv_embedding_id=cv_embedding_id,
+        jd_embedding_id=jd_embedding_id,
+        compatibility_score=score_data.get('overall_score'),
+        score_breakdown=score_data.get('breakdown'),
+        gaps=top_gaps,
+        strengths=score_data.get('strengths', []),
+        questions=questions,
+        answers={},
+        cv_profile_id=cv_profile["id"] if cv_profile else None,
+        content_hash=content_hash if reusable else None
+    ))
+    ctx.db.commit()
+    ctx.emit("analysis", {"id": analysis_id})
+
+    # Hybrid: the fast score is already saved; the LLM wording lands later
+    if score_data.get('scoring_mode') == "hybrid":
+        task = asyncio.create_task(_refine_score_in_background(analysis_id, cv_parsed, jd_parsed, score_data))
+        _refinement_tasks.add(task)
+        task.add_done_callback(_refinement_tasks.discard)
+    return {"persisted": True}
+
+
+# Declaration order doubles as the display order of job stages
+PIPELINE_STAGES = (
+    Stage("extract", ("filename", "file_path"), ("cv_text",), "process", extract_cv_file),
+    Stage("parse_cv", ("cv_text",), ("cv_parsed",), "async", _parse_cv),
+    Stage("parse_jd", ("jd_text",), ("jd_parsed",), "async", _parse_jd),
+    Stage("embed", ("cv_parsed", "jd_parsed", "cv_profile"), ("embeddings",), "thread", _embed),
+    Stage("store_vectors", ("analysis_id", "cv_parsed", "jd_parsed", "embeddings", "cv_profile"),
+          ("cv_embedding_id", "jd_embedding_id"), "thread", _store_vectors),
+    Stage("score", ("analysis_id", "cv_parsed", "jd_parsed", "scoring_mode"),
+          ("score_data", "top_gaps", "prefetched_questions"), "async", _score),
+    Stage("questions", ("analysis_id", "cv_parsed", "jd_parsed", "top_gaps", "prefetched_questions"),
+          ("questions",), "async", _questions),
+    Stage("persist", ("analysis_id", "filename", "cv_text", "cv_parsed", "jd_text", "jd_parsed", "score_data",
+                      "top_gaps", "questions", "cv_embedding_id", "jd_embedding_id", "cv_profile", "content_hash"),
+          ("persisted",), "async", _persist),
+)
+
+STAGES = tuple(stage.name for stage in PIPELINE_STAGES)
+
+
+def stage_dependencies(stages: Iterable[Stage] = PIPELINE_STAGES) -> Dict[str, List[str]]:
+    """Stage name -> the stages producing its inputs (inputs nobody writes come from the initial state)"""
+    stages = list(stages)
+    producers = {key: stage.name for stage in stages for key in stage.writes}
+    dependencies = {}
+    for stage in stages:
+        if stage.executor not in EXECUTORS:
+            raise ValueError(f"Stage {stage.name}: unknown executor {stage.executor}")
+        dependencies[stage.name] = list(dict.fromkeys(producers[key] for key in stage.reads if key in producers))
+    return dependencies
+
+
+DEPENDENCIES = stage_dependencies()
+
+
+def critical_path(timings: Dict[str, dict], dependencies: Dict[str, List[str]] = DEPENDENCIES) -> List[str]:
+    """The chain of stages that determined the run's duration: from the last stage to finish, back through
+    whichever input finished last"""
+    if not timings:
+        return []
+    path = [max(timings, key=lambda name: timings[name]["end"])]
+    while True:
+        inputs = [name for name in dependencies[path[-1]] if name in timings]
+        if not inputs:
+            break
+        path.append(max(inputs, key=lambda name: timings[name]["end"]))
+    return path[::-1]
+
+
+class _PipelineStats:
+    """Per-stage latency and how often each chain was the critical path"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._runs = 0
+        self._stages: Dict[str, dict] = {}
+        self._critical_paths: Dict[str, int] = {}
+
+    def record(self, timings: Dict[str, dict], path: List[str]):
+        with self._lock:
+            self._runs += 1
+            for name, timing in timings.items():
+                stage = self._stages.setdefault(name, {"runs": 0, "seconds_total": 0.0})
+                stage["runs"] += 1
+                stage["seconds_total"] += timing["end"] - timing["start"]
+            key = " → ".join(path)
+            self._critical_paths[key] = self._critical_paths.get(key, 0) + 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "runs": self._runs,
+                "dependencies": DEPENDENCIES,
+                "stages": {
+                    name: {"runs": stage["runs"], "avg_seconds": round(stage["seconds_total"] / stage["runs"], 3)}
+                    for name, stage in self._stages.items()
+                },
+                "critical_paths": dict(self._critical_paths)
+            }
+
+
+pipeline_stats = _PipelineStats()
+
+
+def _get_process_pool() -> Optional[ProcessPoolExecutor]:
+    global _process_pool
+    if _process_pool is None and settings.PIPELINE_PROCESS_WORKERS > 0:
+        # Spawned, not forked: a fork of this threaded server can deadlock on a lock held at fork time
+        _process_pool = ProcessPoolExecutor(
+            max_workers=settings.PIPELINE_PROCESS_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _process_pool
+
+
+def shutdown_process_pool():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(cancel_futures=True)
+        _process_pool = None
+
+
+async def extract_cv_text(filename: str, file_path: str) -> str:
+    """The extract stage on its own, in the process pool (bulk ranking extracts many CVs at once)"""
+    pool = _get_process_pool()
+    if pool is None:
+        return (await asyncio.to_thread(extract_cv_file, filename, file_path))["cv_text"]
+    return (await asyncio.get_running_loop().run_in_executor(pool, extract_cv_file, filename, file_path))["cv_text"]
+
+
+async def _run_stage(stage: Stage, state: dict, ctx: StageContext) -> dict:
+    inputs = {key: state.get(key) for key in stage.reads}
+    if stage.executor == "async":
+        return await stage.run(ctx, **inputs)
+    if stage.executor == "thread":
+        return await asyncio.to_thread(stage.run, ctx, **inputs)
+    pool = _get_process_pool()
+    if pool is None:
+        return await asyncio.to_thread(stage.run, **inputs)
+    # Pickled by reference: a spawned worker imports only the stage function's module
+    return await asyncio.get_running_loop().run_in_executor(pool, partial(stage.run, **inputs))
+
+
+async def run_pipeline(
+    state: dict,
+    db: Session,
+    deadline: RequestDeadline,
+    completed: Iterable[str] = (),
+    on_stage_start: Optional[Callable[[str], None]] = None,
+    on_stage_done: Optional[Callable[[str, dict], None]] = None,
+    on_event: Optional[EventCallback] = None
+) -> dict:
+    """
+    Run the stages not in completed, each as soon as its inputs exist, extending state
+
+    on_stage_start/on_stage_done fire around each stage (job checkpoints);
+    on_event gets results as soon as they exist - cv_parsed, jd_parsed,
+    score, gaps, questions, analysis - for streaming responses. A failing
+    stage cancels the ones still running and raises StageFailed.
+    """
+    done = {stage for stage in completed if stage in DEPENDENCIES}
+    ctx = StageContext(db, deadline, on_event or (lambda event, payload: None))
+    started = time.monotonic()
+    timings: Dict[str, dict] = {}
+    running: Dict[asyncio.Task, Stage] = {}
+
+    def start_ready():
+        busy = set(done) | {stage.name for stage in running.values()}
+        for stage in PIPELINE_STAGES:
+            if stage.name not in busy and all(name in done for name in DEPENDENCIES[stage.name]):
+                if on_stage_start:
+                    on_stage_start(stage.name)
+                timings[stage.name] = {"start": time.monotonic() - started}
+                running[asyncio.create_task(_run_stage(stage, state, ctx))] = stage
+
+    try:
+        start_ready()
+        while running:
+            finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                stage = running.pop(task)
+                try:
+                    outputs = task.result()
+                except Exception as e:
+                    raise StageFailed(stage.name, e) from e
+                timings[stage.name]["end"] = time.monotonic() - started
+                state.update(outputs)
+                state["degraded_stages"] = list(dict.fromkeys(state.get("degraded_stages", []) + deadline.cut_stages))
+                done.add(stage.name)
+                if on_stage_done:
+                    on_stage_done(stage.name, state)
+            start_ready()
+    finally:
+        for task in running:
+            task.cancel()
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+
+    finished_timings = {name: timing for name, timing in timings.items() if "end" in timing}
+    path = critical_path(finished_timings)
+    pipeline_stats.record(finished_timings, path)
+    if path:
+        steps = " → ".join(f"{name} {finished_timings[name]['end'] - finished_timings[name]['start']:.2f}s" for name in path)
+        print(f"🧭 Critical path ({time.monotonic() - started:.2f}s): {steps}")
+    return state
+
+
+def pipeline_response(state: dict) -> Dict:
+    """The /api/upload-cv response for a (possibly partial) pipeline state"""
+    score_data = state.get("score_data") or {}
+    return {
+        "id": state.get("analysis_id"),
+        "score": score_data.get('overall_score'),
+        "breakdown": score_data.get('breakdown'),
+        "gaps": state.get("top_gaps"),
+        "strengths": score_data.get('strengths'),
+        "questions": state.get("questions"),
+        "scoring_mode": score_data.get('scoring_mode', 'llm'),
+        "degraded_stages": state.get("degraded_stages", [])
+    }
@@ -0,0 +1,246 @@
+"""
+Background precomputation of downstream artifacts
+After submit-answers succeeds, the cover letter, learning path and interview
+prep (PRECOMPUTE_ARTIFACTS) are queued for generation so the tabs are ready
+when the user opens them. Background generations:
+    - run on PRECOMPUTE_WORKERS workers at PRIORITY_BACKGROUND in the rate limiter
+    - only start while the LLM gate has headroom (PRECOMPUTE_GATE_SHARE)
+    - are dropped if the answers change again before they finish
+    - skip artifacts still stored (new answers only clear those built from them)
+
+Every generation, background or on request, goes through one in-flight
+registry, so a GET arriving while an artifact is being generated waits for
+that run instead of starting a duplicate; one still queued is promoted and
+run at once. Results go to the existing CVAnalysis columns. The registry is
+per process.
+
+Usage:
+    precomputer.schedule(analysis_id)                          # after submit-answers
+    guide = await precomputer.generate(analysis_id, "interview_prep")
+"""
+
+import asyncio
+from contextlib import nullcontext
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models import CVAnalysis
+from app.services.llm_gate import llm_gate
+from app.services.rate_limiter import priority_scope, PRIORITY_BACKGROUND
+from app.services.cover_letter_gen import generate_cover_letter_async
+from app.services.learning_recommender import generate_learning_recommendations_async
+from app.services.interview_prep import generate_interview_prep_async
+
+settings = get_settings()
+
+# How often a background worker re-checks the LLM gate for headroom
+HEADROOM_POLL_SECONDS = 0.25
+
+
+def _cover_letter(analysis: CVAnalysis, fragments: dict) -> Awaitable[dict]:
+    return generate_cover_letter_async(
+        analysis.cv_parsed, analysis.jd_parsed, analysis.answers or {}, analysis.optimized_cv,
+        analysis.id, fragments=fragments
+    )
+
+
+def _learning_path(analysis: CVAnalysis, fragments: dict) -> Awaitable[dict]:
+    score_data = {"overall_score": analysis.compatibility_score, "breakdown": analysis.score_breakdown}
+    return generate_learning_recommendations_async(
+        analysis.cv_parsed, analysis.jd_parsed, analysis.gaps or [], score_data, analysis.id, fragments=fragments
+    )
+
+
+def _interview_prep(analysis: CVAnalysis, fragments: dict) -> Awaitable[dict]:
+    return generate_interview_prep_async(
+        analysis.cv_parsed, analysis.jd_parsed, analysis.optimized_cv, analysis.answers or {},
+        analysis.id, fragments=fragments
+    )
+
+
+class Artifact(NamedTuple):
+    column: str                                            # CVAnalysis column the result is stored in
+    generator: Callable[[CVAnalysis, dict], Awaitable[dict]]
+    needs_optimized_cv: bool                               # only generated once submit-answers ran
+
+
+ARTIFACTS: Dict[str, Artifact] = {
+    "cover_letter": Artifact("cover_letter", _cover_letter, needs_optimized_cv=True),
+    "learning_path": Artifact("learning_recommendations", _learning_path, needs_optimized_cv=False),
+    "interview_prep": Artifact("interview_prep", _interview_prep, needs_optimized_cv=True),
+}
+
+
+class ArtifactNotReady(Exception):
+    """The analysis lacks what the artifact is generated from (endpoints answer 409)"""
+
+
+def precompute_policy() -> List[str]:
+    """Artifacts generated in the background after submit-answers"""
+    names = [name.strip() for name in settings.PRECOMPUTE_ARTIFACTS.split(",") if name.strip()]
+    unknown = [name for name in names if name not in ARTIFACTS]
+    if unknown:
+        raise ValueError(f"Unknown PRECOMPUTE_ARTIFACTS: {', '.join(unknown)}")
+    return names
+
+
+POLICY = precompute_policy()
+
+
+class _InFlight:
+    """One generation of one artifact; requests for it wait on the future"""
+
+    def __init__(self, version: int):
+        self.version = version
+        self.started = False
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        # Nobody may be waiting when a background run fails - don't warn about it
+        self.future.add_done_callback(lambda future: future.cancelled() or future.exception())
+
+
+class Precomputer:
+    """Background workers plus the in-flight registry for downstream artifacts"""
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._runs: set = set()
+        self._in_flight: Dict[Tuple[str, str], _InFlight] = {}
+        # Bumped per submit-answers; background results for an older version are dropped
+        self._versions: Dict[str, int] = {}
+        self._stats = {"scheduled": 0, "completed": 0, "attached": 0, "promoted": 0, "stale": 0, "failed": 0}
+
+    def start(self, count: int):
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(count)]
+        if POLICY:
+            print(f"   🔮 Precomputing {', '.join(POLICY)} ({count} workers)")
+
+    async def stop(self):
+        for task in self._tasks + list(self._runs):
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._runs, return_exceptions=True)
+        self._tasks = []
+
+    def schedule(self, analysis_id: str):
+        """Queue the policy's artifacts for an analysis whose answers just changed"""
+        if not POLICY or self._queue is None:
+            return
+        version = self._versions.get(analysis_id, 0) + 1
+        self._versions[analysis_id] = version
+        for artifact in POLICY:
+            # Replaces any older entry; a run already going for it finishes but is not stored
+            self._in_flight[(analysis_id, artifact)] = _InFlight(version)
+            self._queue.put_nowait((analysis_id, artifact, version))
+            self._stats["scheduled"] += 1
+
+    async def generate(self, analysis_id: str, artifact: str) -> dict:
+        """Generate an artifact now and store it - or wait for the run already in flight"""
+        key = (analysis_id, artifact)
+        while True:
+            entry = self._in_flight.get(key)
+            if entry and entry.started:
+                self._stats["attached"] += 1
+                print(f"🔗 Attaching to in-flight {artifact} for {analysis_id}")
+            else:
+                if entry:
+                    self._stats["promoted"] += 1
+                else:
+                    entry = _InFlight(self._versions.get(analysis_id, 0))
+                    self._in_flight[key] = entry
+                self._start(analysis_id, artifact, entry, background=False)
+            # Shielded: a client going away must not cancel a run others may be waiting on
+            result = await asyncio.shield(entry.future)
+            if entry.version == self._versions.get(analysis_id, 0):
+                return result
+            # Answers changed while it ran, so it was not stored - generate from the new ones
+
+    def _start(self, analysis_id: str, artifact: str, entry: _InFlight, background: bool) -> asyncio.Task:
+        entry.started = True
+        task = asyncio.create_task(self._run(analysis_id, artifact, entry, background))
+        self._runs.add(task)
+        task.add_done_callback(self._runs.discard)
+        return task
+
+    async def _run(self, analysis_id: str, artifact: str, entry: _InFlight, background: bool):
+        key = (analysis_id, artifact)
+        try:
+            with priority_scope(PRIORITY_BACKGROUND) if background else nullcontext():
+                result = await self._generate_and_store(analysis_id, artifact, entry, background)
+            entry.future.set_result(result)
+        except asyncio.CancelledError:
+            entry.future.cancel()
+            raise
+        except ArtifactNotReady as e:
+            entry.future.set_exception(e)
+        except Exception as e:
+            self._stats["failed"] += 1
+            print(f"⚠️  Generating {artifact} for {analysis_id} failed: {e}")
+            entry.future.set_exception(e)
+        finally:
+            if self._in_flight.get(key) is entry:
+                del self._in_flight[key]
+
+    async def _generate_and_store(self, analysis_id: str, artifact: str, entry: _InFlight, background: bool) -> dict:
+        spec = ARTIFACTS[artifact]
+        db = SessionLocal()
+        try:
+            analysis = db.query(CVAnalysis).filter(CVAnalysis.id == analysis_id).first()
+            if not analysis:
+                raise ArtifactNotReady(f"Analysis {analysis_id} not found")
+            if spec.needs_optimized_cv and not analysis.optimized_cv:
+                raise ArtifactNotReady("CV not optimized yet. Please answer questions first.")
+            if background and getattr(analysis, spec.column):
+                # Still stored: new answers only clear the artifacts built from them
+                return getattr(analysis, spec.column)
+
+            # Encoded prompt fragments memoised across this analysis' generators
+            fragments = dict(analysis.prompt_fragments or {})
+            result = await spec.generator(analysis, fragments)
+
+            if self._versions.get(analysis_id, 0) != entry.version or (background and result.get("error")):
+                # Made from answers that changed since, or failed in the background (a GET retries it)
+                self._stats["stale"] += 1
+                return result
+
+            db.refresh(analysis)
+            setattr(analysis, spec.column, result)
+            analysis.prompt_fragments = {**(analysis.prompt_fragments or {}), **fragments}
+            db.commit()
+            self._stats["completed"] += 1
+            if background:
+                print(f"🔮 Precomputed {artifact} for {analysis_id}")
+            return result
+        finally:
+            db.close()
+
+    async def _worker(self):
+        while True:
+            analysis_id, artifact, version = await self._queue.get()
+            entry = self._in_flight.get((analysis_id, artifact))
+            if not entry or entry.version != version or entry.started:
+                continue  # Superseded, or a request already started it
+            # Leave the LLM gate to interactive requests while it is busy
+            while not llm_gate.has_headroom(settings.PRECOMPUTE_GATE_SHARE):
+                await asyncio.sleep(HEADROOM_POLL_SECONDS)
+            if entry.started or self._in_flight.get((analysis_id, artifact)) is not entry:
+                continue
+            # Awaited, so each worker runs one background generation at a time
+            await self._start(analysis_id, artifact, entry, background=True)
+
+    def is_running(self, analysis_id: str, artifact: str) -> bool:
+        """True while a generation of the artifact is under way (not merely queued)"""
+        entry = self._in_flight.get((analysis_id, artifact))
+        return bool(entry and entry.started)
+
+    def stats(self) -> dict:
+        return {
+            "policy": POLICY,
+            "workers": len(self._tasks),
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "in_flight": sum(1 for entry in self._in_flight.values() if entry.started),
+            **self._stats
+        }
+
+
+precomputer = Precomputer()
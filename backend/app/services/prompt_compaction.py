@@ -0,0 +1,239 @@
+"""
+Prompt compaction: per-generator projection profiles and token budgets
+Each generator declares which CV/JD fields it actually uses. Inputs are
+projected onto that profile (unused fields, unused sub-fields and empty
+values dropped, long lists capped), then trimmed to the profile's token
+budget by dropping the lowest-priority items first.
+
+Usage:
+    inputs = compact_inputs("cover_letter", cv=optimized_cv, jd=jd_data, answers=answers)
+    prompt = f"...{to_toon_string(inputs['cv'])}..."
+
+Sections without a spec in the profile (answers, gaps) pass through as-is
+but still count towards the budget. Token counts are estimated on compact
+JSON, which is never smaller than the TOON actually sent, so budgets err
+on the generous side.
+"""
+
+import json
+import threading
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+from app.config import get_settings
+from app.services.rate_limiter import estimate_tokens
+
+settings = get_settings()
+
+
+class Field(NamedTuple):
+    priority: Optional[int] = None  # Budget trimming drops the lowest first; None = never trimmed
+    keep: Optional[Tuple[str, ...]] = None  # Sub-fields kept from a dict / list of dicts
+    max_items: Optional[int] = None  # Lists capped to this many items before budgeting
+
+
+PROFILES: Dict[str, dict] = {
+    # The CV is also the output shape here, so it is sent whole; only the JD is projected
+    "cv_optimize": {
+        "budget_tokens": 4000,
+        "sections": {
+            "jd": {
+                "position_title": Field(),
+                "company_name": Field(),
+                "hard_skills_required": Field(),
+                "ats_keywords": Field(4),
+                "tech_stack": Field(4),
+                "responsibilities": Field(3, max_items=8),
+                "soft_skills_required": Field(3),
+                "experience_level": Field(2),
+                "experience_years_required": Field(2),
+                "implicit_requirements": Field(1),
+                "domain_expertise": Field(1),
+            },
+        },
+    },
+    "cover_letter": {
+        "budget_tokens": 2500,
+        "sections": {
+            "cv": {
+                "personal_info": Field(keep=("name", "email", "phone", "location")),
+                "experience": Field(5, keep=("company", "role", "duration", "achievements"), max_items=4),
+                "professional_summary": Field(4),
+                "skills": Field(3),
+                "projects": Field(2, keep=("name", "description", "technologies"), max_items=3),
+                "certifications": Field(1),
+                "education": Field(1, keep=("degree", "institution")),
+            },
+            "jd": {
+                "company_name": Field(),
+                "position_title": Field(),
+                "hard_skills_required": Field(4),
+                "responsibilities": Field(4, max_items=6),
+                "company_culture_signals": Field(3),
+                "domain_expertise": Field(2),
+                "ats_keywords": Field(2),
+                "location": Field(1),
+                "work_mode": Field(1),
+            },
+        },
+    },
+    "learning_path": {
+        "budget_tokens": 2000,
+        "sections": {
+            "cv": {
+                "skills": Field(),
+                "years_of_experience": Field(),
+                "certifications": Field(3),
+                "experience": Field(2, keep=("role", "duration"), max_items=3),
+                "projects": Field(1, keep=("name", "technologies"), max_items=3),
+                "education": Field(1, keep=("degree",)),
+            },
+            "jd": {
+                "position_title": Field(),
+                "hard_skills_required": Field(),
+                "soft_skills_required": Field(3),
+                "tech_stack": Field(3),
+                "experience_level": Field(2),
+                "domain_expertise": Field(2),
+            },
+        },
+    },
+    "interview_prep": {
+        "budget_tokens": 3500,
+        "sections": {
+            "cv": {
+                "personal_info": Field(keep=("name",)),
+                "experience": Field(5, keep=("company", "role", "duration", "achievements"), max_items=4),
+                "professional_summary": Field(4),
+                "skills": Field(4),
+                "projects": Field(3, keep=("name", "description", "technologies"), max_items=4),
+                "certifications": Field(1),
+                "education": Field(1, keep=("degree", "institution")),
+            },
+            "jd": {
+                "company_name": Field(),
+                "position_title": Field(),
+                "hard_skills_required": Field(5),
+                "responsibilities": Field(5),
+                "soft_skills_required": Field(3),
+                "tech_stack": Field(3),
+                "experience_level": Field(3),
+                "company_culture_signals": Field(3),
+                "domain_expertise": Field(2),
+                "implicit_requirements": Field(2),
+            },
+        },
+    },
+}
+
+
+def count_tokens(data: Any) -> int:
+    """Estimated prompt tokens for a structure (compact JSON, ~4 chars/token)"""
+    return estimate_tokens(json.dumps(data, separators=(",", ":"), default=str))
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+def _project_value(value: Any, field: Field) -> Any:
+    if field.keep:
+        if isinstance(value, dict):
+            value = {k: value[k] for k in field.keep if not _is_empty(value.get(k))}
+        elif isinstance(value, list):
+            value = [
+                {k: item[k] for k in field.keep if not _is_empty(item.get(k))} if isinstance(item, dict) else item
+                for item in value
+            ]
+    if field.max_items is not None and isinstance(value, list):
+        value = value[:field.max_items]
+    return value
+
+
+def project(data: dict, spec: Dict[str, Field]) -> dict:
+    """Keep only the fields (and sub-fields) named in spec, dropping empty values"""
+    return {
+        name: _project_value(data[name], field)
+        for name, field in spec.items()
+        if not _is_empty(data.get(name))
+    }
+
+
+def _trim_to_budget(sections: Dict[str, Any], specs: Dict[str, Dict[str, Field]], budget: int) -> bool:
+    """Drop lowest-priority items until sections fit budget; True if anything was dropped"""
+    tokens = count_tokens(sections)
+    if tokens <= budget:
+        return False
+
+    # Lowest priority first; among equals, fields declared later go first.
+    # Lists lose items from the end before the field itself is dropped.
+    candidates = sorted(
+        (
+            (field.priority, -order, section, name)
+            for section, spec in specs.items()
+            if isinstance(sections.get(section), dict)
+            for order, (name, field) in enumerate(spec.items())
+            if field.priority is not None
+        ),
+        key=lambda c: (c[0], c[1])
+    )
+    for _, _, section, name in candidates:
+        target = sections[section]
+        while tokens > budget and name in target:
+            value = target[name]
+            if isinstance(value, list) and len(value) > 1:
+                target[name] = value[:-1]
+            else:
+                del target[name]
+            tokens = count_tokens(sections)
+        if tokens <= budget:
+            break
+    return True
+
+
+class _CompactionStats:
+    """Per-prompt-type token report: raw vs sent input tokens"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profiles: Dict[str, dict] = {}
+
+    def record(self, profile: str, raw_tokens: int, sent_tokens: int, trimmed: bool):
+        with self._lock:
+            entry = self._profiles.setdefault(profile, {"calls": 0, "raw_tokens": 0, "sent_tokens": 0, "budget_trims": 0})
+            entry["calls"] += 1
+            entry["raw_tokens"] += raw_tokens
+            entry["sent_tokens"] += sent_tokens
+            entry["budget_trims"] += int(trimmed)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                name: {
+                    "calls": entry["calls"],
+                    "avg_raw_tokens": round(entry["raw_tokens"] / entry["calls"]),
+                    "avg_sent_tokens": round(entry["sent_tokens"] / entry["calls"]),
+                    "saved_pct": round((1 - entry["sent_tokens"] / max(entry["raw_tokens"], 1)) * 100, 1),
+                    "budget_trims": entry["budget_trims"],
+                }
+                for name, entry in self._profiles.items()
+            }
+
+
+compaction_stats = _CompactionStats()
+
+
+def compact_inputs(profile_name: str, **sections: Any) -> Dict[str, Any]:
+    """Project and budget-trim a generator's prompt inputs (see PROFILES)"""
+    profile = PROFILES[profile_name]
+    raw_tokens = count_tokens(sections)
+    if not settings.PROMPT_COMPACTION_ENABLED:
+        compaction_stats.record(profile_name, raw_tokens, raw_tokens, False)
+        return sections
+
+    specs = profile["sections"]
+    compacted = {
+        name: project(value, specs[name]) if name in specs and isinstance(value, dict) else value
+        for name, value in sections.items()
+    }
+    trimmed = _trim_to_budget(compacted, specs, profile["budget_tokens"])
+    compaction_stats.record(profile_name, raw_tokens, count_tokens(compacted), trimmed)
+    return compacted
@@ -12,10 +12,14 @@ _client = None
 def get_qdrant_client() -> QdrantClient:
     global _client
     if _client is None:
-        _client = QdrantClient(
-            host=settings.QDRANT_HOST,
-            port=settings.QDRANT_PORT
-        )
+        if settings.QDRANT_HOST == ":memory:":
+            # In-process local mode for offline benchmarks (LLM_BACKEND=fake)
+            _client = QdrantClient(location=":memory:")
+        else:
+            _client = QdrantClient(
+                host=settings.QDRANT_HOST,
+                port=settings.QDRANT_PORT
+            )
     return _client
 
 # Collection names
@@ -23,6 +27,9 @@ CV_COLLECTION = "cv_embeddings"
 JD_COLLECTION = "jd_embeddings"
 SKILLS_COLLECTION = "skills_embeddings"
 
+# RAG hits at least this similar are the same CV, not a similar one
+SELF_MATCH_SCORE = 0.98
+
 def init_collections():
     """Initialize Qdrant collections if they don't exist"""
     client = get_qdrant_client()
@@ -79,6 +86,31 @@ def store_cv_embedding(
 
     return point_id
 
+def store_cv_sections(
+    cv_id: str,
+    sections: List[Dict],
+    metadata: Dict
+) -> Dict[str, str]:
+    """Store one CV's section embeddings ({"section", "text", "embedding"}) in a single upsert; section -> point ID"""
+    client = get_qdrant_client()
+
+    points = [
+        PointStruct(
+            id=str(uuid.uuid4()),
+            vector=section["embedding"],
+            payload={
+                "cv_id": cv_id,
+                "text": section["text"],
+                **metadata,
+                "section": section["section"]
+            }
+        )
+        for section in sections
+    ]
+    client.upsert(collection_name=CV_COLLECTION, points=points)
+
+    return {section["section"]: point.id for section, point in zip(sections, points)}
+
 def store_jd_embedding(
     jd_id: str,
     text: str,
@@ -108,18 +140,31 @@ def store_jd_embedding(
 
     return point_id
 
+def _payload_filter(filters: Optional[Dict], exclude: Optional[Dict]) -> Optional[Filter]:
+    """Payload field -> value conditions that must match / must not match"""
+    if not filters and not exclude:
+        return None
+    return Filter(
+        must=[FieldCondition(key=key, match=MatchValue(value=value)) for key, value in (filters or {}).items()],
+        must_not=[FieldCondition(key=key, match=MatchValue(value=value)) for key, value in (exclude or {}).items()]
+    )
+
 def search_similar_cvs(
     query_embedding: List[float],
     limit: int = 5,
-    filters: Optional[Dict] = None
+    filters: Optional[Dict] = None,
+    timeout: Optional[int] = None,
+    exclude: Optional[Dict] = None
 ) -> List[Dict]:
-    """Search for similar CVs"""
+    """Search for similar CVs (filters / exclude: payload field -> value)"""
     client = get_qdrant_client()
 
     search_result = client.search(
         collection_name=CV_COLLECTION,
         query_vector=query_embedding,
-        limit=limit
+        query_filter=_payload_filter(filters, exclude),
+        limit=limit,
+        timeout=timeout
     )
 
     return [
@@ -133,7 +178,8 @@ def search_similar_cvs(
 
 def search_similar_jds(
     query_embedding: List[float],
-    limit: int = 5
+    limit: int = 5,
+    timeout: Optional[int] = None
 ) -> List[Dict]:
     """Search for similar job descriptions"""
     client = get_qdrant_client()
@@ -141,7 +187,8 @@ def search_similar_jds(
     search_result = client.search(
         collection_name=JD_COLLECTION,
         query_vector=query_embedding,
-        limit=limit
+        limit=limit,
+        timeout=timeout
     )
 
     return [
@@ -153,20 +200,29 @@ def search_similar_jds(
         for hit in search_result
     ]
 
-def get_rag_context_for_cv(cv_id: str, query_text: str, query_embedding: List[float]) -> str:
+def get_rag_context_for_cv(
+    cv_id: str,
+    query_text: str,
+    query_embedding: List[float],
+    timeout: Optional[int] = None
+) -> str:
     """Get relevant context from similar CVs for RAG"""
-    similar = search_similar_cvs(query_embedding, limit=3)
+    # Whole CVs only (profiles also store section vectors), never the candidate's own
+    similar = search_similar_cvs(
+        query_embedding, limit=3, filters={"section": "full"}, timeout=timeout, exclude={"cv_id": cv_id}
+    )
 
     context_parts = []
     for item in similar:
-        if item["score"] > 0.7:  # Relevance threshold
+        # Relevance threshold; a near-exact match is this CV stored under another ID (its profile, a re-upload)
+        if 0.7 < item["score"] < SELF_MATCH_SCORE:
             context_parts.append(f"Similar CV experience: {item['payload'].get('text', '')[:200]}")
 
     return "\n\n".join(context_parts) if context_parts else ""
 
-def get_rag_context_for_jd(jd_id: str, query_embedding: List[float]) -> str:
+def get_rag_context_for_jd(jd_id: str, query_embedding: List[float], timeout: Optional[int] = None) -> str:
     """Get relevant context from similar JDs for RAG"""
-    similar = search_similar_jds(query_embedding, limit=3)
+    similar = search_similar_jds(query_embedding, limit=3, timeout=timeout)
 
     context_parts = []
     for item in similar:
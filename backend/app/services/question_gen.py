@@ -1,27 +1,90 @@
 import os
-import google.generativeai as genai
 import json
+import asyncio
+from typing import Optional, Tuple
 from app.config import get_settings
 from app.services.embeddings import generate_embedding
 from app.services.qdrant_service import get_rag_context_for_cv
 from app.services.toon_serializer import to_toon_string
 from app.services.cache_service import cached
-from app.services.timeout_handler import with_timeout_and_retry
+from app.services.deadline import RequestDeadline, bind_deadline
+from app.services.llm_client import generate_json_async
+from app.services.fast_scorer import estimate_gaps, normalize_skill
+from app.services.scorer import (
+    calculate_compatibility_score,
+    build_match_context,
+    get_score_rag_context,
+    SCORE_RESPONSE_SCHEMA
+)
 
 settings = get_settings()
-genai.configure(api_key=settings.GEMINI_API_KEY)
 
-async def generate_smart_questions(cv_data: dict, jd_data: dict, gaps: list, cv_id: str = None) -> list:
-    """Generate smart questions to uncover hidden experience using RAG (ASYNC)"""
+QUESTIONS_GENERATION_CONFIG = {
+    "temperature": 0.4,
+    "response_mime_type": "application/json"
+}
 
-    model = genai.GenerativeModel('gemini-2.0-flash-exp')
+# Shared by the questions prompt and the fused score-and-questions prompt
+QUESTION_GUIDELINES = """For EACH question, also provide 3-4 suggested answer options that users can select from. These should:
+- Be realistic and varied (from beginner to expert level)
+- Cover different levels of experience (e.g., "Yes, extensively", "Some experience", "Learning/exploring", "Not yet")
+- Be written in first person, ready to use
+- Let users customize them further
+- Contextually include negative/"not yet" options when appropriate"""
+
+QUESTIONS_RESPONSE_SCHEMA = """[
+    {
+        "question": "string - the actual question",
+        "category": "technical/domain/experience/soft_skills",
+        "priority": "critical/high/medium/low",
+        "potential_impact": "string (e.g., '+10% score if yes')",
+        "why_asking": "string - explain what gap this addresses",
+        "suggested_answers": [
+            "string - first person answer option 1",
+            "string - first person answer option 2",
+            "string - first person answer option 3",
+            "string - optional 4th answer"
+        ]
+    }
+]"""
+
+def _questions_rag_context(gaps: list, cv_id: str = None, deadline: Optional[RequestDeadline] = None) -> str:
+    """Similar past questions; empty when skipped, out of budget or failing"""
+    if not cv_id:
+        return ""
+    if deadline and deadline.expired:
+        deadline.mark_cut("questions_rag")
+        return ""
+
+    query_text = f"Questions about: {', '.join([g.get('gap', '') for g in gaps])}"
+    query_embedding = generate_embedding(query_text)
+    try:
+        return get_rag_context_for_cv(
+            cv_id, query_text, query_embedding,
+            timeout=deadline.qdrant_timeout() if deadline else None
+        )
+    except Exception as e:
+        print(f"⚠️  RAG lookup for questions failed: {e}")
+        if deadline and deadline.expired:
+            deadline.mark_cut("questions_rag")
+        return ""
 
-    # Get RAG context
-    rag_context = ""
-    if cv_id:
-        query_text = f"Questions about: {', '.join([g.get('gap', '') for g in gaps])}"
-        query_embedding = generate_embedding(query_text)
-        rag_context = get_rag_context_for_cv(cv_id, query_text, query_embedding)
+async def generate_smart_questions(
+    cv_data: dict,
+    jd_data: dict,
+    gaps: list,
+    cv_id: str = None,
+    deadline: Optional[RequestDeadline] = None
+) -> list:
+    """
+    Generate smart questions to uncover hidden experience using RAG (ASYNC)
+
+    With a deadline, RAG is skipped once the budget is spent and an empty
+    list is returned if the Gemini call cannot finish in time.
+    """
+
+    # Get RAG context (embedding + Qdrant search block, so in a worker thread)
+    rag_context = await asyncio.to_thread(_questions_rag_context, gaps, cv_id, deadline)
 
     rag_section = ""
     if rag_context:
@@ -55,50 +118,146 @@ IDENTIFIED GAPS:
 
 {rag_section}Generate 5-8 smart questions to uncover hidden experience that could close these gaps.
 
-For EACH question, also provide 3-4 suggested answer options that users can select from. These should:
-- Be realistic and varied (from beginner to expert level)
-- Cover different levels of experience (e.g., "Yes, extensively", "Some experience", "Learning/exploring", "Not yet")
-- Be written in first person, ready to use
-- Let users customize them further
-- Contextually include negative/"not yet" options when appropriate
+{QUESTION_GUIDELINES}
 
 Return ONLY valid JSON array (no markdown):
-""" + """[
-    {
-        "question": "string - the actual question",
-        "category": "technical/domain/experience/soft_skills",
-        "priority": "critical/high/medium/low",
-        "potential_impact": "string (e.g., '+10% score if yes')",
-        "why_asking": "string - explain what gap this addresses",
-        "suggested_answers": [
-            "string - first person answer option 1",
-            "string - first person answer option 2",
-            "string - first person answer option 3",
-            "string - optional 4th answer"
-        ]
-    }
-]
+{QUESTIONS_RESPONSE_SCHEMA}
 
 Make questions specific, actionable, and easy to answer. Suggested answers should be ready to use but editable."""
 
-    generation_config = {
-        "temperature": 0.4,
-        "response_mime_type": "application/json"
-    }
-
     try:
-        response = await model.generate_content_async(prompt, generation_config=generation_config)
-        response_text = response.text.strip()
-
-        if response_text.startswith("```"):
-            response_text = response_text.split("```")[1]
-            if response_text.startswith("json"):
-                response_text = response_text[4:]
-            response_text = response_text.strip()
-
-        questions = json.loads(response_text)
-        return questions
+        with bind_deadline(deadline):
+            return await generate_json_async(
+                "questions", prompt, QUESTIONS_GENERATION_CONFIG,
+                timeout_seconds=settings.GEMINI_TIMEOUT, max_retries=1, hedge=True
+            )
 
     except Exception as e:
         print(f"Error generating questions with Gemini: {e}")
+        if deadline and deadline.expired:
+            deadline.mark_cut("questions")
         return []
+
+# Speculation is reconciled when a critical gap was missed or more than this
+# share of the LLM's gaps were not in the local estimate
+MATERIAL_NEW_GAP_SHARE = 0.34
+
+speculation_stats = {"runs": 0, "reconciled": 0}
+
+def _gap_covered(gap: dict, estimated_gaps: list) -> bool:
+    """Does a locally estimated gap name the same skill as this LLM gap?"""
+    name = normalize_skill(gap.get('gap', ''))
+    for estimated in estimated_gaps:
+        other = normalize_skill(estimated.get('gap', ''))
+        if other and (other in name or name in other):
+            return True
+    return False
+
+def _names_gap(question: dict, gaps: list) -> bool:
+    """Does the question (or its why_asking) name one of these gaps' skills?"""
+    asked = f"{question.get('question') or ''} {question.get('why_asking') or ''}"
+    text = f" {normalize_skill(asked)} "
+    return any(
+        name and f" {name} " in text
+        for name in (normalize_skill(gap.get('gap', '')) for gap in gaps)
+    )
+
+async def score_and_questions_speculative(
+    cv_data: dict,
+    jd_data: dict,
+    cv_id: str = None,
+    deadline: Optional[RequestDeadline] = None,
+    scoring_mode: Optional[str] = None
+) -> Tuple[dict, list]:
+    """
+    Score and generate questions in parallel (PIPELINE_MODE=speculative)
+
+    Questions start from locally estimated gaps instead of waiting for the
+    score's top_gaps. If the LLM's gaps differ materially, questions are
+    generated for the new gaps only and appended.
+    """
+    # Fast scorer: embedding matches are CPU work - keep them off the event loop
+    estimated_gaps = await asyncio.to_thread(estimate_gaps, cv_data, jd_data)
+    scoring = calculate_compatibility_score(cv_data, jd_data, cv_id, deadline=deadline, scoring_mode=scoring_mode)
+    if estimated_gaps:
+        score_data, questions = await asyncio.gather(
+            scoring, generate_smart_questions(cv_data, jd_data, estimated_gaps, cv_id, deadline=deadline)
+        )
+    else:
+        # Nothing to speculate on - the questions wait for the score's gaps
+        score_data, questions = await scoring, []
+    speculation_stats["runs"] += 1
+
+    actual_gaps = score_data.get('top_gaps', [])
+    new_gaps = [gap for gap in actual_gaps if not _gap_covered(gap, estimated_gaps)]
+    material = new_gaps and (
+        any(gap.get('priority') == 'critical' for gap in new_gaps)
+        or len(new_gaps) / len(actual_gaps) > MATERIAL_NEW_GAP_SHARE
+    )
+    if material and not (deadline and deadline.expired):
+        print(f"🔁 Speculative gaps missed {len(new_gaps)} of {len(actual_gaps)} - generating questions for them")
+        speculation_stats["reconciled"] += 1
+        # Drop questions about estimated gaps the score did not confirm
+        refuted = [gap for gap in estimated_gaps if not _gap_covered(gap, actual_gaps)]
+        questions = [
+            q for q in questions
+            if not (_names_gap(q, refuted) and not _names_gap(q, actual_gaps))
+        ]
+        questions = questions + await generate_smart_questions(cv_data, jd_data, new_gaps, cv_id, deadline=deadline)
+
+    return score_data, questions
+
+FUSED_GENERATION_CONFIG = {
+    "temperature": 0.3,
+    "response_mime_type": "application/json"
+}
+
+async def score_and_questions_fused(
+    cv_data: dict,
+    jd_data: dict,
+    cv_id: str = None,
+    deadline: Optional[RequestDeadline] = None
+) -> Tuple[dict, list]:
+    """
+    Score and generate questions in ONE Gemini call (PIPELINE_MODE=fused)
+
+    Reuses the scorer's compacted CV/JD context and RAG lookup, so the
+    input is sent once and Qdrant is queried once. Returns the same
+    (score_data, questions) pair as the two-call flow.
+    """
+    rag_context = await asyncio.to_thread(get_score_rag_context, jd_data, cv_id, deadline)
+    rag_section = ""
+    if rag_context:
+        rag_section = f"ADDITIONAL CONTEXT FROM SIMILAR CASES:\n{rag_context}\n\n"
+
+    prompt = f"""Analyze the match between this CV and Job Description, then ask about the gaps:
+
+{build_match_context(cv_data, jd_data)}
+
+{rag_section}1. Calculate a detailed compatibility score (overall score 0-100, be realistic and detailed).
+2. Generate 5-8 smart questions to uncover hidden experience that could close the top_gaps you identified.
+
+{QUESTION_GUIDELINES}
+
+Return ONLY valid JSON (no markdown) with this structure:
+{{
+"score": {SCORE_RESPONSE_SCHEMA},
+"questions": {QUESTIONS_RESPONSE_SCHEMA}
+}}"""
+
+    try:
+        with bind_deadline(deadline):
+            # One larger response than either call alone - allow for it
+            result = await generate_json_async(
+                "score_questions", prompt, FUSED_GENERATION_CONFIG,
+                timeout_seconds=settings.GEMINI_TIMEOUT * 2, max_retries=1, hedge=True
+            )
+        return result.get('score') or {"error": "missing score", "overall_score": 0}, result.get('questions') or []
+
+    except Exception as e:
+        print(f"Error scoring and generating questions with Gemini: {e}")
+        if deadline and deadline.expired:
+            deadline.mark_cut("score")
+            deadline.mark_cut("questions")
+            return {"error": "deadline exceeded", "overall_score": 0, "degraded": True}, []
+        return {"error": str(e), "overall_score": 0}, []
@@ -0,0 +1,290 @@
+"""
+Distributed token-bucket rate limiter for the Gemini quota
+Two buckets - requests per minute and (estimated) tokens per minute - live
+in Redis on the cache_service connection, so every worker and replica
+draws from the same quota. If Redis is unreachable each process falls
+back to a local bucket with the same limits.
+
+Callers wait instead of failing. Within a process, waiters are served in
+priority order (interactive before normal before background), FIFO within
+a priority; only the head of the queue polls the bucket.
+
+Usage:
+    await rate_limiter.acquire_async("score", prompt)
+    async with llm_gate.slot_async("score"):
+        response = await model.generate_content_async(prompt, ...)
+"""
+
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+from app.config import get_settings
+from app.services.timeout_handler import TimeoutError, get_remaining_timeout
+
+settings = get_settings()
+
+# Lower value = served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BACKGROUND = 2
+
+OPERATION_PRIORITIES = {
+    "cv_parse": PRIORITY_INTERACTIVE,
+    "jd_analyze": PRIORITY_INTERACTIVE,
+    "score": PRIORITY_INTERACTIVE,
+    "questions": PRIORITY_INTERACTIVE,
+    "score_questions": PRIORITY_INTERACTIVE,
+}
+
+# Typical response sizes, added to the prompt estimate when charging tokens
+OUTPUT_TOKEN_ESTIMATES = {
+    "cv_parse": 1500,
+    "jd_analyze": 800,
+    "score": 800,
+    "questions": 1200,
+    "score_questions": 2000,
+    "cv_optimize": 2000,
+    "cv_optimize_patch": 600,
+    "cover_letter": 700,
+    "learning_path": 1500,
+    "interview_prep": 3000,
+}
+DEFAULT_OUTPUT_TOKENS = 1000
+
+RPM_KEY = "hirehub:ratelimit:rpm"
+TPM_KEY = "hirehub:ratelimit:tpm"
+# How often queued (non-head) callers check whether it is their turn
+POLL_INTERVAL = 0.025
+# Longest single sleep between bucket checks
+MAX_SLEEP = 1.0
+# After a Redis failure, use the local bucket for this long before retrying Redis
+REDIS_RETRY_SECONDS = 30
+# Longest a blocking caller outside any timeout scope waits for quota
+UNSCOPED_WAIT_TIMEOUT = 120
+
+# Optional per-context priority override (e.g. background precompute jobs)
+_priority_override: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar(
+    "llm_priority", default=None
+)
+
+# Atomically refill and take from both buckets. Returns 0 when the call may
+# proceed, otherwise the milliseconds until enough quota has refilled.
+_TAKE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local function refill(key, capacity, rate)
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    return math.min(capacity, tokens + math.max(0, now - ts) * rate)
+end
+local rpm_capacity, rpm_rate, rpm_cost = tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local tpm_capacity, tpm_rate, tpm_cost = tonumber(ARGV[5]), tonumber(ARGV[6]), tonumber(ARGV[7])
+local rpm_tokens = refill(KEYS[1], rpm_capacity, rpm_rate)
+local tpm_tokens = refill(KEYS[2], tpm_capacity, tpm_rate)
+if rpm_tokens >= rpm_cost and tpm_tokens >= tpm_cost then
+    redis.call('HSET', KEYS[1], 'tokens', rpm_tokens - rpm_cost, 'ts', now)
+    redis.call('HSET', KEYS[2], 'tokens', tpm_tokens - tpm_cost, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], 120)
+    redis.call('EXPIRE', KEYS[2], 120)
+    return 0
+end
+local wait = math.max((rpm_cost - rpm_tokens) / rpm_rate, (tpm_cost - tpm_tokens) / tpm_rate)
+return math.ceil(wait * 1000)
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap prompt size estimate (~4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+@contextmanager
+def priority_scope(priority: int):
+    """Run every LLM call in this block at the given priority"""
+    token = _priority_override.set(priority)
+    try:
+        yield
+    finally:
+        _priority_override.reset(token)
+
+
+class _LocalBucket:
+    """In-process fallback with the same semantics as the Redis script"""
+
+    def __init__(self, capacity: float, per_second: float):
+        self.capacity = capacity
+        self.per_second = per_second
+        self.tokens = capacity
+        self.ts = time.time()
+
+    def refill(self, now: float) -> float:
+        self.tokens = min(self.capacity, self.tokens + max(0.0, now - self.ts) * self.per_second)
+        self.ts = now
+        return self.tokens
+
+
+class RateLimiter:
+    """Requests/tokens-per-minute limiter with priority-ordered waiting"""
+
+    def __init__(self, rpm: int, tpm: int, enabled: bool = True):
+        self.enabled = enabled
+        self.rpm = rpm
+        self.tpm = tpm
+        self._lock = threading.Lock()
+        self._queue: List[Tuple[int, int]] = []  # heap of (priority, seq)
+        self._seq = itertools.count()
+        self._script = None
+        self._redis_retry_at = 0.0
+        self._local = {
+            "rpm": _LocalBucket(rpm, rpm / 60.0),
+            "tpm": _LocalBucket(tpm, tpm / 60.0),
+        }
+        self._stats = {"acquired": 0, "waited": 0, "wait_seconds": 0.0, "redis_fallbacks": 0}
+
+    # ---- bucket access ---------------------------------------------------
+
+    def _try_take(self, cost_tokens: int) -> float:
+        """Try to take 1 request + cost_tokens; returns 0 or seconds to wait"""
+        cost_tokens = min(cost_tokens, self.tpm)  # an oversized call must still fit eventually
+        if time.time() < self._redis_retry_at:
+            return self._try_take_local(cost_tokens)
+        try:
+            from app.services.cache_service import get_redis_client
+            client = get_redis_client()
+            if self._script is None:
+                self._script = client.register_script(_TAKE_SCRIPT)
+            wait_ms = self._script(
+                keys=[RPM_KEY, TPM_KEY],
+                args=[time.time(), self.rpm, self.rpm / 60.0, 1, self.tpm, self.tpm / 60.0, cost_tokens]
+            )
+            return int(wait_ms) / 1000.0
+        except Exception as e:
+            # Redis down: keep limiting per process rather than not at all
+            print(f"⚠️  Rate limiter falling back to local bucket: {e}")
+            with self._lock:
+                self._stats["redis_fallbacks"] += 1
+            self._redis_retry_at = time.time() + REDIS_RETRY_SECONDS
+            return self._try_take_local(cost_tokens)
+
+    def _try_take_local(self, cost_tokens: int) -> float:
+        with self._lock:
+            now = time.time()
+            rpm_tokens = self._local["rpm"].refill(now)
+            tpm_tokens = self._local["tpm"].refill(now)
+            if rpm_tokens >= 1 and tpm_tokens >= cost_tokens:
+                self._local["rpm"].tokens -= 1
+                self._local["tpm"].tokens -= cost_tokens
+                return 0.0
+            return max(
+                (1 - rpm_tokens) / self._local["rpm"].per_second,
+                (cost_tokens - tpm_tokens) / self._local["tpm"].per_second
+            )
+
+    # ---- queueing --------------------------------------------------------
+
+    def _cost_and_priority(self, operation: str, prompt: str, priority: Optional[int]) -> Tuple[int, int]:
+        cost = estimate_tokens(prompt) + OUTPUT_TOKEN_ESTIMATES.get(operation, DEFAULT_OUTPUT_TOKENS)
+        if priority is None:
+            priority = _priority_override.get()
+        if priority is None:
+            priority = OPERATION_PRIORITIES.get(operation, PRIORITY_NORMAL)
+        return cost, priority
+
+    def _enqueue(self, priority: int) -> Tuple[int, int]:
+        ticket = (priority, next(self._seq))
+        with self._lock:
+            heapq.heappush(self._queue, ticket)
+        return ticket
+
+    def _is_head(self, ticket: Tuple[int, int]) -> bool:
+        with self._lock:
+            return bool(self._queue) and self._queue[0] == ticket
+
+    def _dequeue(self, ticket: Tuple[int, int]):
+        with self._lock:
+            if self._queue and self._queue[0] == ticket:
+                heapq.heappop(self._queue)
+            elif ticket in self._queue:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+
+    def _record(self, waited: float):
+        with self._lock:
+            self._stats["acquired"] += 1
+            if waited > 0.001:
+                self._stats["waited"] += 1
+                self._stats["wait_seconds"] += waited
+
+    def acquire(self, operation: str, prompt: str = "", priority: Optional[int] = None):
+        """Block the calling thread until quota is available for this call"""
+        if not self.enabled:
+            return
+        cost, priority = self._cost_and_priority(operation, prompt, priority)
+        ticket = self._enqueue(priority)
+        started = time.monotonic()
+        # A full bucket must not hold this thread past the request's budget
+        deadline = started + get_remaining_timeout(default=UNSCOPED_WAIT_TIMEOUT)
+        try:
+            while True:
+                if self._is_head(ticket):
+                    wait = self._try_take(cost)
+                    if wait <= 0:
+                        break
+                else:
+                    wait = POLL_INTERVAL
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"{operation} timed out waiting for rate limit quota")
+                time.sleep(min(wait, MAX_SLEEP, remaining))
+        finally:
+            self._dequeue(ticket)
+        self._record(time.monotonic() - started)
+
+    async def acquire_async(self, operation: str, prompt: str = "", priority: Optional[int] = None):
+        """Wait (without blocking the loop) until quota is available for this call"""
+        if not self.enabled:
+            return
+        cost, priority = self._cost_and_priority(operation, prompt, priority)
+        ticket = self._enqueue(priority)
+        started = time.monotonic()
+        try:
+            while True:
+                if self._is_head(ticket):
+                    # The Redis round trip (and a reconnect when it is down) blocks - keep it off the loop
+                    wait = await asyncio.to_thread(self._try_take, cost)
+                    if wait <= 0:
+                        break
+                    await asyncio.sleep(min(wait, MAX_SLEEP))
+                else:
+                    await asyncio.sleep(POLL_INTERVAL)
+        finally:
+            # Also runs on cancellation, so a timed-out caller leaves the queue
+            self._dequeue(ticket)
+        self._record(time.monotonic() - started)
+
+    def stats(self) -> dict:
+        with self._lock:
+            by_priority: Dict[int, int] = {}
+            for priority, _ in self._queue:
+                by_priority[priority] = by_priority.get(priority, 0) + 1
+            return {
+                "enabled": self.enabled,
+                "rpm_limit": self.rpm,
+                "tpm_limit": self.tpm,
+                "queued": len(self._queue),
+                "queued_by_priority": by_priority,
+                **{k: round(v, 3) if isinstance(v, float) else v for k, v in self._stats.items()}
+            }
+
+
+# Process-wide limiter used by every service module
+rate_limiter = RateLimiter(
+    rpm=settings.GEMINI_RPM_LIMIT,
+    tpm=settings.GEMINI_TPM_LIMIT,
+    enabled=settings.RATE_LIMIT_ENABLED
+)
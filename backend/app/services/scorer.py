@@ -1,81 +1,25 @@
 import os
-import google.generativeai as genai
 import json
+import asyncio
+from typing import Optional
 from app.config import get_settings
 from app.services.embeddings import generate_embedding
 from app.services.qdrant_service import get_rag_context_for_cv, get_rag_context_for_jd
 from app.services.toon_serializer import to_toon_string
 from app.services.cache_service import cached
-from app.services.timeout_handler import with_timeout_and_retry
+from app.services.deadline import RequestDeadline, bind_deadline
+from app.services.llm_client import generate_json_async
+from app.services.fast_scorer import calculate_fast_score
 
 settings = get_settings()
-genai.configure(api_key=settings.GEMINI_API_KEY)
 
-async def calculate_compatibility_score(cv_data: dict, jd_data: dict, cv_id: str = None) -> dict:
-    """Calculate detailed compatibility score using AI with RAG context (ASYNC)"""
-
-    model = genai.GenerativeModel('gemini-2.0-flash-exp')
-
-    # Generate query embedding for RAG
-    query_text = f"Skills needed: {', '.join([s['skill'] for s in jd_data.get('hard_skills_required', [])])}"
-    query_embedding = generate_embedding(query_text)
-
-    # Get RAG context from similar CVs/JDs
-    rag_context = ""
-    if cv_id:
-        rag_context = get_rag_context_for_cv(cv_id, query_text, query_embedding)
-
-    rag_section = ""
-    if rag_context:
-        rag_section = f"ADDITIONAL CONTEXT FROM SIMILAR CASES:\n{rag_context}\n\n"
-
-    # Compress CV data - only send relevant fields
-    cv_summary = {
-        "name": cv_data.get('personal_info', {}).get('name', 'Unknown'),
-        "years_experience": cv_data.get('years_of_experience', 0),
-        "skills": cv_data.get('skills', {}),
-        "experience": [
-            {
-                "role": exp.get('role', ''),
-                "company": exp.get('company', ''),
-                "duration": exp.get('duration', ''),
-                "key_achievements": exp.get('achievements', [])[:3]  # Top 3 only
-            }
-            for exp in (cv_data.get('experience', [])[:3])  # Top 3 roles only
-        ],
-        "education": cv_data.get('education', []),
-        "certifications": cv_data.get('certifications', [])
-    }
-
-    # Compress JD data - only send requirements
-    jd_summary = {
-        "position": jd_data.get('position_title', ''),
-        "company": jd_data.get('company_name', ''),
-        "hard_skills": [s.get('skill', '') for s in jd_data.get('hard_skills_required', [])],
-        "soft_skills": jd_data.get('soft_skills_required', []),
-        "experience_required": jd_data.get('experience_required', {}),
-        "responsibilities": jd_data.get('responsibilities', [])[:5],  # Top 5 only
-        "nice_to_have": jd_data.get('nice_to_have_skills', [])
-    }
-
-    prompt = f"""Analyze the match between this CV and Job Description:
-
-CANDIDATE:
-- Name: {cv_summary['name']}
-- Experience: {cv_summary['years_experience']} years
-- Skills: {json.dumps(cv_summary['skills'])}
-- Recent Roles: {json.dumps(cv_summary['experience'])}
-- Education: {json.dumps(cv_summary['education'])}
-
-JOB REQUIREMENTS:
-- Position: {jd_summary['position']} at {jd_summary['company']}
-- Required Skills: {', '.join(jd_summary['hard_skills'])}
-- Soft Skills: {', '.join(jd_summary['soft_skills'])}
-- Experience: {json.dumps(jd_summary['experience_required'])}
-- Responsibilities: {json.dumps(jd_summary['responsibilities'])}
+SCORE_GENERATION_CONFIG = {
+    "temperature": 0.3,
+    "response_mime_type": "application/json"
+}
 
-{rag_section}Calculate a detailed compatibility score. Return ONLY valid JSON (no markdown):
-""" + """{
+# Response shape requested from Gemini (also embedded in the fused prompt)
+SCORE_RESPONSE_SCHEMA = """{
     "overall_score": 0,
     "breakdown": {
         "hard_skills": {
@@ -122,28 +66,161 @@ JOB REQUIREMENTS:
     ],
     "strengths": ["array of candidate strengths"],
     "recommendations": ["array of actionable recommendations"]
-}
+}"""
 
-Overall score should be 0-100. Be realistic and detailed."""
+def get_score_rag_context(jd_data: dict, cv_id: str = None, deadline: Optional[RequestDeadline] = None) -> str:
+    """RAG context from similar CVs/JDs; empty when skipped, out of budget or failing"""
+    if not cv_id:
+        return ""
+    if deadline and deadline.expired:
+        deadline.mark_cut("score_rag")
+        return ""
 
-    generation_config = {
-        "temperature": 0.3,
-        "response_mime_type": "application/json"
+    # Generate query embedding for RAG
+    query_text = f"Skills needed: {', '.join([s['skill'] for s in jd_data.get('hard_skills_required', [])])}"
+    query_embedding = generate_embedding(query_text)
+    try:
+        return get_rag_context_for_cv(
+            cv_id, query_text, query_embedding,
+            timeout=deadline.qdrant_timeout() if deadline else None
+        )
+    except Exception as e:
+        # RAG is an enrichment - score without it rather than fail
+        print(f"⚠️  RAG lookup for scoring failed: {e}")
+        if deadline and deadline.expired:
+            deadline.mark_cut("score_rag")
+        return ""
+
+def build_match_context(cv_data: dict, jd_data: dict) -> str:
+    """Compacted CANDIDATE / JOB REQUIREMENTS block shared by the score and fused prompts"""
+    # Compress CV data - only send relevant fields
+    cv_summary = {
+        "name": cv_data.get('personal_info', {}).get('name', 'Unknown'),
+        "years_experience": cv_data.get('years_of_experience', 0),
+        "skills": cv_data.get('skills', {}),
+        "experience": [
+            {
+                "role": exp.get('role', ''),
+                "company": exp.get('company', ''),
+                "duration": exp.get('duration', ''),
+                "key_achievements": exp.get('achievements', [])[:3]  # Top 3 only
+            }
+            for exp in (cv_data.get('experience', [])[:3])  # Top 3 roles only
+        ],
+        "education": cv_data.get('education', []),
+        "certifications": cv_data.get('certifications', [])
     }
 
-    try:
-        response = await model.generate_content_async(prompt, generation_config=generation_config)
-        response_text = response.text.strip()
+    # Compress JD data - only send requirements
+    jd_summary = {
+        "position": jd_data.get('position_title', ''),
+        "company": jd_data.get('company_name', ''),
+        "hard_skills": [s.get('skill', '') for s in jd_data.get('hard_skills_required', [])],
+        "soft_skills": jd_data.get('soft_skills_required', []),
+        "experience_required": jd_data.get('experience_required', {}),
+        "responsibilities": jd_data.get('responsibilities', [])[:5],  # Top 5 only
+        "nice_to_have": jd_data.get('nice_to_have_skills', [])
+    }
 
-        if response_text.startswith("```"):
-            response_text = response_text.split("```")[1]
-            if response_text.startswith("json"):
-                response_text = response_text[4:]
-            response_text = response_text.strip()
+    return f"""CANDIDATE:
+- Name: {cv_summary['name']}
+- Experience: {cv_summary['years_experience']} years
+- Skills: {json.dumps(cv_summary['skills'])}
+- Recent Roles: {json.dumps(cv_summary['experience'])}
+- Education: {json.dumps(cv_summary['education'])}
 
-        score_data = json.loads(response_text)
+JOB REQUIREMENTS:
+- Position: {jd_summary['position']} at {jd_summary['company']}
+- Required Skills: {', '.join(jd_summary['hard_skills'])}
+- Soft Skills: {', '.join(jd_summary['soft_skills'])}
+- Experience: {json.dumps(jd_summary['experience_required'])}
+- Responsibilities: {json.dumps(jd_summary['responsibilities'])}"""
+
+SCORING_MODES = ("fast", "llm", "hybrid")
+
+# Narrative breakdown fields the LLM may rewrite in hybrid mode (numbers stay local)
+REFINABLE_BREAKDOWN_FIELDS = ("experience", "domain", "portfolio", "logistics")
+
+async def calculate_compatibility_score(
+    cv_data: dict,
+    jd_data: dict,
+    cv_id: str = None,
+    deadline: Optional[RequestDeadline] = None,
+    scoring_mode: Optional[str] = None
+) -> dict:
+    """
+    Calculate the compatibility score (ASYNC)
+
+    scoring_mode (default settings.SCORING_MODE):
+    - fast:   local deterministic score, no Gemini call
+    - llm:    Gemini with RAG context
+    - hybrid: the fast score now; refine_score_narrative() adds LLM wording later
+    """
+    mode = scoring_mode or settings.SCORING_MODE
+    if mode in ("fast", "hybrid"):
+        # Skill matching embeds every skill - CPU work, kept off the event loop
+        score_data = await asyncio.to_thread(calculate_fast_score, cv_data, jd_data)
+        score_data["scoring_mode"] = mode
         return score_data
+    return await _calculate_llm_score(cv_data, jd_data, cv_id, deadline)
+
+async def refine_score_narrative(cv_data: dict, jd_data: dict, fast_score: dict, cv_id: str = None) -> dict:
+    """
+    Hybrid mode: keep the fast scores, take strengths, recommendations and
+    assessments from the LLM. Returns fast_score unchanged if the LLM fails.
+    """
+    llm_score = await _calculate_llm_score(cv_data, jd_data, cv_id)
+    if llm_score.get("error"):
+        return fast_score
+
+    refined = {**fast_score, "scoring_mode": "hybrid", "refined": True}
+    refined["strengths"] = llm_score.get("strengths") or fast_score.get("strengths", [])
+    refined["recommendations"] = llm_score.get("recommendations") or fast_score.get("recommendations", [])
+    breakdown = {name: dict(part) for name, part in fast_score.get("breakdown", {}).items()}
+    for name in REFINABLE_BREAKDOWN_FIELDS:
+        assessment = (llm_score.get("breakdown", {}).get(name) or {}).get("assessment")
+        if assessment and name in breakdown:
+            breakdown[name]["assessment"] = assessment
+    refined["breakdown"] = breakdown
+    return refined
+
+async def _calculate_llm_score(
+    cv_data: dict,
+    jd_data: dict,
+    cv_id: str = None,
+    deadline: Optional[RequestDeadline] = None
+) -> dict:
+    """
+    Calculate detailed compatibility score using AI with RAG context (ASYNC)
+
+    With a deadline, the RAG lookup is skipped once the budget is spent and
+    the Gemini call is cut at the remaining budget (degraded score returned).
+    """
+
+    rag_context = await asyncio.to_thread(get_score_rag_context, jd_data, cv_id, deadline)
+    rag_section = ""
+    if rag_context:
+        rag_section = f"ADDITIONAL CONTEXT FROM SIMILAR CASES:\n{rag_context}\n\n"
+
+    prompt = f"""Analyze the match between this CV and Job Description:
+
+{build_match_context(cv_data, jd_data)}
+
+{rag_section}Calculate a detailed compatibility score. Return ONLY valid JSON (no markdown):
+{SCORE_RESPONSE_SCHEMA}
+
+Overall score should be 0-100. Be realistic and detailed."""
+
+    try:
+        with bind_deadline(deadline):
+            return await generate_json_async(
+                "score", prompt, SCORE_GENERATION_CONFIG,
+                timeout_seconds=settings.GEMINI_TIMEOUT, max_retries=1, hedge=True
+            )
 
     except Exception as e:
         print(f"Error calculating score with Gemini: {e}")
+        if deadline and deadline.expired:
+            deadline.mark_cut("score")
+            return {"error": "deadline exceeded", "overall_score": 0, "degraded": True}
         return {"error": str(e), "overall_score": 0}
@@ -0,0 +1,40 @@
+"""
+CV file text extraction
+Runs in the pipeline's process pool, whose workers are spawned (not forked
+from a server holding threads, sockets and the embedding model) and import
+only this module - keep its imports to the file parsers.
+"""
+
+import fitz  # PyMuPDF
+from docx import Document
+
+
+def extract_text_from_pdf(file_path: str) -> str:
+    """Extract text from PDF"""
+    doc = fitz.open(file_path)
+    text = ""
+    for page in doc:
+        text += page.get_text()
+    return text
+
+
+def extract_text_from_docx(file_path: str) -> str:
+    """Extract text from DOCX"""
+    doc = Document(file_path)
+    text = "\n".join([para.text for para in doc.paragraphs])
+    return text
+
+
+def extract_cv_file(filename: str, file_path: str) -> dict:
+    """The pipeline's extract stage: module-level and picklable for the process pool"""
+    if filename.endswith('.pdf'):
+        cv_text = extract_text_from_pdf(file_path)
+    elif filename.endswith('.docx'):
+        cv_text = extract_text_from_docx(file_path)
+    elif filename.endswith('.txt'):
+        # Support .txt files for testing
+        with open(file_path, 'r', encoding='utf-8') as f:
+            cv_text = f.read()
+    else:
+        raise ValueError("Only PDF, DOCX, and TXT files supported")
+    return {"cv_text": cv_text}
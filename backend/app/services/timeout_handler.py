@@ -1,19 +1,33 @@
 """
 Timeout and retry logic for external API calls
 Prevents indefinite hangs and provides retry mechanism
+
+Sync decorators run the call inline on the caller's thread (no hidden pool)
+and publish a deadline that the wrapped call hands to the Gemini client as
+its request timeout. Async decorators use asyncio.timeout, so a timed-out
+call is actually cancelled instead of lingering in a worker thread.
 """
 
 import time
+import json
+import random
 import asyncio
+import builtins
+import contextvars
+from contextlib import contextmanager
 from typing import Callable, Any, Optional
 from functools import wraps
-from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 from app.config import get_settings
 
 settings = get_settings()
 
-# Thread pool for running synchronous functions with timeout
-_executor = ThreadPoolExecutor(max_workers=10)
+# Absolute deadline (time.monotonic()) of the innermost timeout scope
+_call_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "call_deadline", default=None
+)
+
+# Upper bound for a single backoff sleep
+MAX_BACKOFF_SECONDS = 10.0
 
 
 class TimeoutError(Exception):
@@ -26,32 +40,115 @@ class RetryExhaustedError(Exception):
     pass
 
 
+def get_remaining_timeout(default: Optional[float] = None) -> float:
+    """
+    Seconds left before the innermost timeout scope expires
+
+    Pass the result to the Gemini client as request_options={"timeout": ...}
+    so the HTTP call itself is aborted when the scope runs out.
+    """
+    deadline = _call_deadline.get()
+    if deadline is None:
+        return default or settings.GEMINI_TIMEOUT
+    return max(deadline - time.monotonic(), 0.01)
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[float]):
+    """
+    Bound every timeout scope opened inside this block by an absolute
+    deadline (time.monotonic()). Used to propagate a request-level budget.
+    """
+    if deadline is None:
+        yield
+        return
+    outer = _call_deadline.get()
+    token = _call_deadline.set(deadline if outer is None else min(deadline, outer))
+    try:
+        yield
+    finally:
+        _call_deadline.reset(token)
+
+
+def _retry_fits_deadline(wait_time: float) -> bool:
+    """False if sleeping wait_time would overrun the enclosing deadline"""
+    deadline = _call_deadline.get()
+    return deadline is None or time.monotonic() + wait_time < deadline
+
+
+def is_retryable_error(exc: BaseException) -> bool:
+    """
+    Classify an error as transient (worth retrying) or permanent
+
+    Timeouts, rate limits (429), upstream 5xx and connection errors are
+    retried. Bad requests and malformed model output (JSON parse errors)
+    are not - sending the same prompt again rarely fixes them.
+    """
+    if isinstance(exc, (TimeoutError, builtins.TimeoutError, asyncio.TimeoutError)):
+        return True
+    if isinstance(exc, (json.JSONDecodeError, ValueError, TypeError, KeyError)):
+        return False
+    if isinstance(exc, ConnectionError):
+        return True
+
+    # google.api_core exceptions carry the HTTP status in .code
+    code = getattr(exc, "code", None)
+    if callable(code):
+        # grpc errors expose code() returning a StatusCode enum
+        try:
+            code = code().name
+        except Exception:
+            code = None
+    if isinstance(code, int):
+        return code in (408, 429) or code >= 500
+    if isinstance(code, str):
+        return code in ("RESOURCE_EXHAUSTED", "UNAVAILABLE", "DEADLINE_EXCEEDED", "INTERNAL")
+
+    message = str(exc).lower()
+    return any(marker in message for marker in (
+        "429", "resource exhausted", "quota", "503", "unavailable", "500", "deadline exceeded"
+    ))
+
+
+def compute_backoff(attempt: int, backoff_factor: float = 2.0) -> float:
+    """Exponential backoff with jitter: half fixed, half random"""
+    base = min(backoff_factor ** attempt, MAX_BACKOFF_SECONDS)
+    return base / 2 + random.uniform(0, base / 2)
+
+
 def with_timeout(timeout_seconds: Optional[int] = None):
     """
     Decorator to add timeout protection to synchronous functions
 
+    The function runs on the caller's thread. It should pass
+    get_remaining_timeout() to its network call; errors raised after the
+    deadline has passed are reported as TimeoutError.
+
     Usage:
         @with_timeout(30)
         def slow_function():
-            # Long-running operation
-            pass
+            model.generate_content(..., request_options={"timeout": get_remaining_timeout()})
     """
     timeout = timeout_seconds or settings.GEMINI_TIMEOUT
 
     def decorator(func: Callable) -> Callable:
         @wraps(func)
         def wrapper(*args, **kwargs):
-            future = _executor.submit(func, *args, **kwargs)
+            deadline = time.monotonic() + timeout
+            outer = _call_deadline.get()
+            if outer is not None:
+                deadline = min(deadline, outer)
+            token = _call_deadline.set(deadline)
             try:
-                result = future.result(timeout=timeout)
-                return result
-            except FuturesTimeoutError:
-                raise TimeoutError(
-                    f"{func.__name__} exceeded timeout of {timeout} seconds"
-                )
+                return func(*args, **kwargs)
             except Exception as e:
-                # Re-raise original exception
-                raise e
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(
+                        f"{func.__name__} exceeded timeout of {timeout} seconds"
+                    ) from e
+                raise
+            finally:
+                _call_deadline.reset(token)
 
         return wrapper
     return decorator
@@ -63,7 +160,10 @@ def with_retry(
     exceptions: tuple = (Exception,)
 ):
     """
-    Decorator to add retry logic with exponential backoff
+    Decorator to add retry logic with exponential backoff and jitter
+
+    Only errors classified as transient by is_retryable_error are retried;
+    anything else is raised immediately.
 
     Usage:
         @with_retry(max_retries=3, backoff_factor=2.0)
@@ -71,7 +171,7 @@ def with_retry(
             # Function that might fail
             pass
     """
-    retries = max_retries or settings.GEMINI_MAX_RETRIES
+    retries = settings.GEMINI_MAX_RETRIES if max_retries is None else max_retries
 
     def decorator(func: Callable) -> Callable:
         @wraps(func)
@@ -85,9 +185,11 @@ def with_retry(
                         print(f"✅ {func.__name__} succeeded on retry #{attempt}")
                     return result
                 except exceptions as e:
+                    if not is_retryable_error(e):
+                        raise
                     last_exception = e
-                    if attempt < retries:
-                        wait_time = backoff_factor ** attempt
+                    wait_time = compute_backoff(attempt, backoff_factor)
+                    if attempt < retries and _retry_fits_deadline(wait_time):
                         print(
                             f"⚠️  {func.__name__} failed (attempt {attempt + 1}/{retries + 1}): {e}"
                         )
@@ -95,11 +197,12 @@ def with_retry(
                         time.sleep(wait_time)
                     else:
                         print(
-                            f"❌ {func.__name__} failed after {retries + 1} attempts"
+                            f"❌ {func.__name__} failed after {attempt + 1} attempts"
                         )
+                        break
 
             raise RetryExhaustedError(
-                f"{func.__name__} failed after {retries + 1} attempts. "
+                f"{func.__name__} failed after {attempt + 1} attempts. "
                 f"Last error: {last_exception}"
             )
 
@@ -134,6 +237,127 @@ def with_timeout_and_retry(
     return decorator
 
 
+def _to_loop_time(deadline: float) -> float:
+    """Convert a time.monotonic() deadline to the running loop's clock"""
+    loop = asyncio.get_running_loop()
+    return loop.time() + (deadline - time.monotonic())
+
+
+def with_timeout_async(timeout_seconds: Optional[int] = None):
+    """
+    Decorator to add timeout protection to coroutine functions
+
+    The coroutine is cancelled when the timeout expires, or earlier if an
+    enclosing deadline_scope runs out first.
+
+    Usage:
+        @with_timeout_async(30)
+        async def slow_call():
+            return await model.generate_content_async(...)
+    """
+    timeout = timeout_seconds or settings.GEMINI_TIMEOUT
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.monotonic()
+            deadline = started + timeout
+            outer = _call_deadline.get()
+            if outer is not None:
+                deadline = min(deadline, outer)
+            token = _call_deadline.set(deadline)
+            try:
+                async with asyncio.timeout_at(_to_loop_time(deadline)):
+                    return await func(*args, **kwargs)
+            except builtins.TimeoutError:
+                raise TimeoutError(
+                    f"{func.__name__} exceeded timeout of {deadline - started:.1f} seconds"
+                )
+            finally:
+                _call_deadline.reset(token)
+
+        return wrapper
+    return decorator
+
+
+def with_retry_async(
+    max_retries: Optional[int] = None,
+    backoff_factor: float = 2.0,
+    exceptions: tuple = (Exception,)
+):
+    """
+    Async counterpart of with_retry
+
+    Usage:
+        @with_retry_async(max_retries=2)
+        async def unreliable_call():
+            pass
+    """
+    retries = settings.GEMINI_MAX_RETRIES if max_retries is None else max_retries
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            last_exception = None
+
+            for attempt in range(retries + 1):
+                try:
+                    result = await func(*args, **kwargs)
+                    if attempt > 0:
+                        print(f"✅ {func.__name__} succeeded on retry #{attempt}")
+                    return result
+                except exceptions as e:
+                    if not is_retryable_error(e):
+                        raise
+                    last_exception = e
+                    wait_time = compute_backoff(attempt, backoff_factor)
+                    if attempt < retries and _retry_fits_deadline(wait_time):
+                        print(
+                            f"⚠️  {func.__name__} failed (attempt {attempt + 1}/{retries + 1}): {e}"
+                        )
+                        print(f"   Retrying in {wait_time:.1f}s...")
+                        await asyncio.sleep(wait_time)
+                    else:
+                        print(
+                            f"❌ {func.__name__} failed after {attempt + 1} attempts"
+                        )
+                        break
+
+            raise RetryExhaustedError(
+                f"{func.__name__} failed after {attempt + 1} attempts. "
+                f"Last error: {last_exception}"
+            )
+
+        return wrapper
+    return decorator
+
+
+def with_timeout_and_retry_async(
+    timeout_seconds: Optional[int] = None,
+    max_retries: Optional[int] = None,
+    backoff_factor: float = 2.0
+):
+    """
+    Combined async decorator for timeout + retry logic
+
+    Each attempt gets its own timeout.
+
+    Usage:
+        @with_timeout_and_retry_async(timeout_seconds=30, max_retries=2)
+        async def api_call():
+            pass
+    """
+    def decorator(func: Callable) -> Callable:
+        func_with_timeout = with_timeout_async(timeout_seconds)(func)
+        return with_retry_async(
+            max_retries=max_retries,
+            backoff_factor=backoff_factor,
+            exceptions=(TimeoutError, Exception)
+        )(func_with_timeout)
+
+    return decorator
+
+
 async def run_with_timeout_async(
     coro,
     timeout_seconds: Optional[int] = None
@@ -146,9 +370,9 @@ async def run_with_timeout_async(
     """
     timeout = timeout_seconds or settings.GEMINI_TIMEOUT
     try:
-        result = await asyncio.wait_for(coro, timeout=timeout)
-        return result
-    except asyncio.TimeoutError:
+        async with asyncio.timeout(timeout):
+            return await coro
+    except builtins.TimeoutError:
         raise TimeoutError(f"Operation exceeded timeout of {timeout} seconds")
 
 
@@ -167,8 +391,11 @@ async def run_in_parallel(*tasks, timeout_seconds: Optional[int] = None):
     timeout = timeout_seconds or settings.GEMINI_TIMEOUT * 2  # Double timeout for parallel
 
     try:
-        results = await asyncio.gather(*tasks)
-        return results
+        async with asyncio.timeout(timeout):
+            return await asyncio.gather(*tasks)
+    except builtins.TimeoutError:
+        print(f"❌ Parallel execution exceeded timeout of {timeout} seconds")
+        raise TimeoutError(f"Parallel execution exceeded timeout of {timeout} seconds")
     except Exception as e:
         print(f"❌ Parallel execution failed: {e}")
         raise
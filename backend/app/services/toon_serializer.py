@@ -1,33 +1,207 @@
+import re
 import json
 import os
-from typing import Any
+import hashlib
+from typing import Any, List, Optional
 
-def to_toon_string(data: Any) -> str:
+
+def should_use_toon() -> bool:
+    """
+    Check if TOON format should be used based on environment configuration.
+
+    Returns:
+        True if TOON should be used, False otherwise
+    """
+    return os.getenv("USE_TOON_FORMAT", "true").lower() == "true"
+
+
+STRATEGIES = ("adaptive", "toon", "json")
+
+
+def encoding_strategy() -> str:
+    """
+    Encoder for prompt fragments, from TOON_STRATEGY (USE_TOON_FORMAT=false forces json).
+
+    adaptive: TOON tables/inline arrays or compact JSON, whichever is cheaper per subtree
+    toon:     the toon_format library for the whole value
+    json:     compact JSON
+    """
+    if not should_use_toon():
+        return "json"
+    strategy = os.getenv("TOON_STRATEGY", "adaptive").lower()
+    return strategy if strategy in STRATEGIES else "adaptive"
+
+
+# Resolved once at import instead of on every call
+STRATEGY = encoding_strategy()
+try:
+    from toon_format import encode as _toon_encode, decode as _toon_decode
+except ImportError:
+    _toon_encode = _toon_decode = None
+    if STRATEGY == "toon":
+        print("WARNING: toon_format package not installed, using the adaptive encoder")
+        STRATEGY = "adaptive"
+
+# Max encoded fragments kept in one analysis' memo (oldest dropped first)
+MAX_MEMO_FRAGMENTS = 32
+
+# Rough BPE-like split: short words / number chunks / whitespace runs / single symbols.
+# Only used to compare encodings of the same data, so relative accuracy is what matters.
+_TOKEN_PATTERN = re.compile(r" ?[A-Za-z]{1,10}| ?\d{1,3}|\s+|[^\sA-Za-z\d]")
+_SAFE_KEY = re.compile(r"^[A-Za-z_][A-Za-z0-9_.]*$")
+_NUMBER_LIKE = re.compile(r"^-?\d+(\.\d+)?([eE][+-]?\d+)?$")
+
+
+def count_text_tokens(text: str) -> int:
+    """Fast local estimate of LLM tokens in text"""
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+def _compact_json(data: Any) -> str:
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def _is_primitive(value: Any) -> bool:
+    return value is None or isinstance(value, (str, int, float, bool))
+
+
+def _scalar(value: Any) -> str:
+    """TOON scalar: bare unless the string would be ambiguous"""
+    if not isinstance(value, str):
+        return _compact_json(value)
+    if (not value or value != value.strip() or value in ("true", "false", "null")
+            or _NUMBER_LIKE.match(value) or value.startswith("- ")
+            or any(c in value for c in ',:"[]{}\n\\')):
+        return _compact_json(value)
+    return value
+
+
+def _key(key: Any) -> str:
+    key = str(key)
+    return key if _SAFE_KEY.match(key) else _compact_json(key)
+
+
+def _cheapest(candidates: List[List[str]]) -> List[str]:
+    return min(candidates, key=lambda lines: count_text_tokens("\n".join(lines)))
+
+
+def _tabular_fields(items: list) -> Optional[List[str]]:
+    """Shared field order if items are same-keyed dicts of primitives (TOON table rows)"""
+    if not items or not all(isinstance(item, dict) and item for item in items):
+        return None
+    fields = list(items[0])
+    for item in items:
+        if set(item) != set(fields):
+            return None
+        if not all(_is_primitive(v) for v in item.values()):
+            return None
+    return fields
+
+
+def _array_lines(key: str, items: list, indent: int) -> List[str]:
+    pad = "  " * indent
+    if all(_is_primitive(item) for item in items):
+        return [f"{pad}{key}[{len(items)}]: {','.join(_scalar(item) for item in items)}".rstrip()]
+
+    fields = _tabular_fields(items)
+    if fields:
+        rows = [f"{pad}  {','.join(_scalar(item[f]) for f in fields)}" for item in items]
+        return [f"{pad}{key}[{len(items)}]{{{','.join(_key(f) for f in fields)}}}:"] + rows
+
+    lines = [f"{pad}{key}[{len(items)}]:"]
+    for item in items:
+        if isinstance(item, dict) and item:
+            item_lines = _object_lines(item, indent + 2)
+            lines.append(f"{pad}  - {item_lines[0].lstrip()}")
+            lines.extend(item_lines[1:])
+        else:
+            lines.append(f"{pad}  - {_scalar(item) if _is_primitive(item) else _compact_json(item)}")
+    return lines
+
+
+def _field_lines(key: Any, value: Any, indent: int) -> List[str]:
+    """Cheapest encoding of one key/value pair"""
+    pad = "  " * indent
+    name = _key(key)
+    if _is_primitive(value):
+        return [f"{pad}{name}: {_scalar(value)}"]
+
+    candidates = [[f"{pad}{name}: {_compact_json(value)}"]]
+    if isinstance(value, dict) and value:
+        candidates.append([f"{pad}{name}:"] + _object_lines(value, indent + 1))
+    elif isinstance(value, list) and value:
+        candidates.append(_array_lines(name, value, indent))
+    return _cheapest(candidates)
+
+
+def _object_lines(data: dict, indent: int) -> List[str]:
+    lines = []
+    for key, value in data.items():
+        lines.extend(_field_lines(key, value, indent))
+    return lines
+
+
+def encode_adaptive(data: Any) -> str:
+    """TOON tables/inline arrays or compact JSON, whichever is cheaper for each subtree"""
+    if isinstance(data, dict) and data:
+        candidates = [_object_lines(data, 0)]
+    elif isinstance(data, list) and data:
+        candidates = [_array_lines("", data, 0)]
+    else:
+        return _scalar(data) if _is_primitive(data) else _compact_json(data)
+    candidates.append([_compact_json(data)])
+    return "\n".join(_cheapest(candidates))
+
+
+def fragment_key(data: Any) -> str:
+    """Content hash of data plus the encoder in use, for memoising encoded fragments"""
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return f"{STRATEGY}:{hashlib.sha1(canonical.encode()).hexdigest()}"
+
+
+def _encode(data: Any) -> str:
+    if STRATEGY == "json":
+        return _compact_json(data)
+    if STRATEGY == "adaptive":
+        return encode_adaptive(data)
+
+    try:
+        return _toon_encode(data)
+    except Exception as e:
+        print(f"WARNING: TOON encoding failed: {e}, falling back to JSON")
+        return _compact_json(data)
+
+
+def to_toon_string(data: Any, memo: Optional[dict] = None) -> str:
     """
     Convert Python object to TOON format string with fallback to JSON.
 
     TOON (Token-Oriented Object Notation) is a compact data encoding format
     designed for LLM inputs that reduces token usage by 30-60% compared to JSON.
+    It only wins on uniform arrays, so by default (TOON_STRATEGY=adaptive)
+    each subtree uses TOON or compact JSON, whichever is estimated cheaper.
 
     Args:
         data: Python object (dict, list, etc.) to serialize
+        memo: Optional content-hash -> encoded string dict (e.g. an analysis'
+              prompt_fragments); hits skip encoding, misses are added to it
 
     Returns:
-        String representation in TOON format, or JSON if TOON encoding fails
+        String representation in TOON format, or compact JSON where that is cheaper
     """
-    if not should_use_toon():
-        return json.dumps(data, indent=2)
+    if memo is None:
+        return _encode(data)
 
-    try:
-        from toon_format import encode
-        result = encode(data)
-        return result
-    except ImportError:
-        print("WARNING: toon_format package not installed, falling back to JSON")
-        return json.dumps(data, indent=2)
-    except Exception as e:
-        print(f"WARNING: TOON encoding failed: {e}, falling back to JSON")
-        return json.dumps(data, indent=2)
+    key = fragment_key(data)
+    cached = memo.get(key)
+    if cached is not None:
+        return cached
+
+    result = _encode(data)
+    memo[key] = result
+    while len(memo) > MAX_MEMO_FRAGMENTS:
+        del memo[next(iter(memo))]
+    return result
 
 
 def from_toon_string(toon_str: str) -> Any:
@@ -40,22 +214,12 @@ def from_toon_string(toon_str: str) -> Any:
     Returns:
         Python object (dict, list, etc.)
     """
-    try:
-        from toon_format import decode
-        return decode(toon_str)
-    except ImportError:
-        print("WARNING: toon_format package not installed, trying JSON parsing")
+    if _toon_decode is None:
         return json.loads(toon_str)
+
+    try:
+        return _toon_decode(toon_str)
     except Exception as e:
         print(f"WARNING: TOON decoding failed: {e}, trying JSON parsing")
         return json.loads(toon_str)
 
-
-def should_use_toon() -> bool:
-    """
-    Check if TOON format should be used based on environment configuration.
-
-    Returns:
-        True if TOON should be used, False otherwise
-    """
-    return os.getenv("USE_TOON_FORMAT", "true").lower() == "true"
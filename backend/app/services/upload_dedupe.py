@@ -0,0 +1,158 @@
+"""
+Idempotent /api/upload-cv
+Double clicks, client retries and browser refreshes resubmit the same CV and
+JD. Instead of a new analysis row, new Qdrant points and another round of
+scoring and questions, an upload is matched to an earlier analysis by:
+    - its Idempotency-Key header, if sent (replays the first result)
+    - the content hash of (CV text, JD text, pipeline version and mode),
+      once the CV text is extracted
+
+A duplicate of an upload still running waits for it and returns its
+result. That in-flight registry is per process; the stored hashes and keys
+are shared through the database. Degraded analyses carry no hash, so a
+retry after a timeout runs the full pipeline again.
+
+Usage:
+    response = await upload_deduplicator.run(state, db, deadline, request.headers.get("Idempotency-Key"))
+"""
+
+import asyncio
+from typing import Awaitable, Dict, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.models import CVAnalysis, IdempotencyKey
+from app.services.deadline import RequestDeadline
+from app.services.pipeline import (
+    run_pipeline,
+    pipeline_response,
+    analysis_content_hash,
+    extract_cv_text,
+    EventCallback
+)
+
+settings = get_settings()
+
+
+def _stored_response(analysis: CVAnalysis, scoring_mode: Optional[str]) -> dict:
+    """The upload-cv response for an existing analysis row"""
+    response = pipeline_response({
+        "analysis_id": analysis.id,
+        "score_data": {
+            "overall_score": analysis.compatibility_score,
+            "breakdown": analysis.score_breakdown,
+            "strengths": analysis.strengths,
+            "scoring_mode": scoring_mode or settings.SCORING_MODE
+        },
+        "top_gaps": analysis.gaps,
+        "questions": analysis.questions
+    })
+    response["deduplicated"] = True
+    return response
+
+
+class UploadDeduplicator:
+    """Finds the analysis an upload duplicates - stored or still running - before running the pipeline"""
+
+    def __init__(self):
+        # ("key", Idempotency-Key) / ("hash", content hash) -> the running upload's response
+        self._in_flight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._stats = {"uploads": 0, "key_hits": 0, "hash_hits": 0, "attached": 0}
+
+    async def run(
+        self,
+        state: dict,
+        db: Session,
+        deadline: RequestDeadline,
+        idempotency_key: Optional[str] = None,
+        on_event: Optional[EventCallback] = None
+    ) -> dict:
+        """The upload-cv response for state: an existing analysis', or a new run's"""
+        self._stats["uploads"] += 1
+        if not settings.UPLOAD_DEDUPE_ENABLED:
+            await run_pipeline(state, db, deadline, on_event=on_event)
+            return pipeline_response(state)
+        if not idempotency_key:
+            return await self._run_by_hash(state, db, deadline, on_event)
+
+        key = ("key", idempotency_key)
+        response = await self._existing(key, db, state)
+        if response:
+            self._stats["key_hits"] += 1
+            return response
+
+        async def run() -> dict:
+            response = await self._run_by_hash(state, db, deadline, on_event)
+            # Also when it matched an earlier upload by hash: the key replays that one from now on
+            db.merge(IdempotencyKey(key=idempotency_key, analysis_id=response["id"]))
+            db.commit()
+            return response
+        return await self._lead(key, run())
+
+    async def _run_by_hash(self, state: dict, db: Session, deadline: RequestDeadline,
+                           on_event: Optional[EventCallback]) -> dict:
+        # Extraction is local and cheap next to the LLM stages, and the hash needs the text
+        state["cv_text"] = await extract_cv_text(state["filename"], state["file_path"])
+        state["content_hash"] = analysis_content_hash(state["cv_text"], state["jd_text"], state.get("scoring_mode"))
+        key = ("hash", state["content_hash"])
+
+        response = await self._existing(key, db, state)
+        if response:
+            self._stats["hash_hits"] += 1
+            print(f"♻️  Upload duplicates analysis {response['id']}")
+            return response
+
+        async def run() -> dict:
+            await run_pipeline(state, db, deadline, completed=("extract",), on_event=on_event)
+            return pipeline_response(state)
+        return await self._lead(key, run())
+
+    def _stored(self, key: Tuple[str, str], db: Session) -> Optional[CVAnalysis]:
+        kind, value = key
+        if kind == "key":
+            row = db.query(IdempotencyKey).filter(IdempotencyKey.key == value).first()
+            return db.query(CVAnalysis).filter(CVAnalysis.id == row.analysis_id).first() if row else None
+        return db.query(CVAnalysis).filter(CVAnalysis.content_hash == value).order_by(CVAnalysis.created_at.desc()).first()
+
+    async def _existing(self, key: Tuple[str, str], db: Session, state: dict) -> Optional[dict]:
+        """A stored analysis for key, or the response of the upload running for it"""
+        while True:
+            analysis = self._stored(key, db)
+            if analysis:
+                return _stored_response(analysis, state.get("scoring_mode"))
+
+            running = self._in_flight.get(key)
+            if running is None:
+                return None
+            self._stats["attached"] += 1
+            try:
+                # Shielded: this request going away must not cancel the one it waits on
+                return {**await asyncio.shield(running), "deduplicated": True}
+            except (Exception, asyncio.CancelledError):
+                if not running.done():
+                    raise  # This request was cancelled
+                # The upload we waited on failed or was cancelled - look again, else run it ourselves
+
+    async def _lead(self, key: Tuple[str, str], work: Awaitable[dict]) -> dict:
+        """Run work as the upload for key; duplicates arriving meanwhile wait on its response"""
+        future = asyncio.get_running_loop().create_future()
+        # Nobody may be waiting when it fails - don't warn about it
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._in_flight[key] = future
+        try:
+            response = await work
+            future.set_result(response)
+            return response
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            del self._in_flight[key]
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._in_flight), **self._stats}
+
+
+upload_deduplicator = UploadDeduplicator()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Benchmark: screening many CVs against one JD
+Compares one /api/upload-cv call per CV (what a recruiter tool does today,
+UPLOAD_CONCURRENCY at a time) with a single /api/rank-cvs/stream request:
+wall time, arrival of the first ranked candidate and Gemini calls spent.
+
+By default starts the API in-process on the offline Gemini stand-in and
+in-memory Qdrant; set API_BASE=http://localhost:8000 to measure a running
+server instead.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import threading
+import contextlib
+from typing import Dict
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("QDRANT_HOST", ":memory:")
+os.environ.setdefault("FAKE_LLM_SEED", "42")
+os.environ.setdefault("FAKE_LLM_LATENCY_MEDIAN", "2.0")
+os.environ.setdefault("FAKE_LLM_LATENCY_SIGMA", "0.3")
+os.environ.setdefault("FAKE_LLM_TIME_SCALE", "0.05")  # run 20x faster than real time
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("PRECOMPUTE_ARTIFACTS", "")
+sys.path.insert(0, os.path.dirname(__file__))
+
+import httpx
+
+CVS = 40
+TOP_K = 5
+UPLOAD_CONCURRENCY = 4
+TEST_DIR = os.path.join(os.path.dirname(__file__), "test")
+
+
+def start_local_server() -> str:
+    """Run the app with uvicorn in a background thread; returns its base URL"""
+    import uvicorn
+    from app.main import app
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+def load_inputs():
+    with open(os.path.join(TEST_DIR, "resume.txt"), "rb") as f:
+        cv = f.read()
+    with open(os.path.join(TEST_DIR, "job_description.txt")) as f:
+        jd = f.read()
+    # Distinct texts, so no CV is served from the parse cache
+    cvs = [(f"candidate_{i}.txt", cv + f"\nReference: candidate {i}\n".encode()) for i in range(CVS)]
+    return cvs, jd
+
+
+async def llm_calls(client: httpx.AsyncClient) -> int:
+    llm = (await client.get("/api/metrics")).json()["llm"]
+    return sum(op["calls"] for op in llm.values())
+
+
+async def run_one_by_one(client: httpx.AsyncClient, cvs: list, jd: str) -> Dict[str, float]:
+    """Today: every CV through /api/upload-cv, JD parsed again each time"""
+    slots = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+    started = time.monotonic()
+
+    async def upload(filename: str, content: bytes):
+        async with slots:
+            response = await client.post(
+                "/api/upload-cv", files={"file": (filename, content, "text/plain")}, data={"jd_text": jd}
+            )
+            response.raise_for_status()
+
+    await asyncio.gather(*(upload(filename, content) for filename, content in cvs))
+    # A ranking exists only once every CV is scored
+    total = time.monotonic() - started
+    return {"total": total, "first_ranked": total}
+
+
+async def run_bulk(client: httpx.AsyncClient, cvs: list, jd: str) -> Dict[str, float]:
+    started = time.monotonic()
+    arrivals = {}
+    files = [("files", (filename, content, "text/plain")) for filename, content in cvs]
+    async with client.stream("POST", "/api/rank-cvs/stream", files=files,
+                             data={"jd_text": jd, "top_k": str(TOP_K)}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            event = json.loads(line)["event"]
+            arrivals.setdefault(event, time.monotonic() - started)
+            if event == "error":
+                raise RuntimeError(line)
+    return {"total": arrivals["complete"], "first_ranked": arrivals["candidate"]}
+
+
+async def run(api_base: str):
+    cvs, jd = load_inputs()
+    results = []
+    async with httpx.AsyncClient(base_url=api_base, timeout=600) as client:
+        for name, runner in (("upload-cv per CV", run_one_by_one), ("rank-cvs (bulk)", run_bulk)):
+            before = await llm_calls(client)
+            with contextlib.redirect_stdout(open(os.devnull, "w")):
+                timings = await runner(client, cvs, jd)
+            timings["llm_calls"] = await llm_calls(client) - before
+            results.append((name, timings))
+    return results
+
+
+def main():
+    print("\n" + "="*60)
+    print("   Bulk Ranking - One JD Against Many CVs")
+    print("="*60 + "\n")
+
+    api_base = os.environ.get("API_BASE")
+    if not api_base:
+        # Silence per-request pipeline logs so the report stays readable
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            api_base = start_local_server()
+    print(f"   Server: {api_base}, {CVS} CVs, top {TOP_K} re-scored by the LLM\n")
+
+    results = asyncio.run(run(api_base))
+
+    print(f"   {'Approach':<22}{'total':>10}{'first ranked':>15}{'LLM calls':>12}")
+    for name, timings in results:
+        print(f"   {name:<22}{timings['total']:>9.2f}s{timings['first_ranked']:>14.2f}s{timings['llm_calls']:>12}")
+
+    print("\n" + "="*60 + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
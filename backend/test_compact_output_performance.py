@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark: compact-key structured output vs verbose JSON
+For each large generator, compares output tokens and latency with
+LLM_COMPACT_OUTPUT off and on, and checks the locally expanded result
+matches the verbose one. Uses the offline Gemini stand-in by default
+(latency driven by output tokens); export LLM_BACKEND=gemini to measure live.
+"""
+
+import os
+import sys
+import time
+import contextlib
+from typing import List
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("FAKE_LLM_SEED", "42")
+os.environ.setdefault("FAKE_LLM_LATENCY_MEDIAN", "0.8")  # time to first token
+os.environ.setdefault("FAKE_LLM_LATENCY_SIGMA", "0.1")
+os.environ.setdefault("FAKE_LLM_SECONDS_PER_OUTPUT_TOKEN", "0.004")  # ~250 tokens/s
+os.environ.setdefault("FAKE_LLM_TIME_SCALE", "0.05")  # run 20x faster than real time
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.config import get_settings
+from app.services.llm_client import generate_json, llm_stats
+from app.services.compact_output import COMPACT_SPECS
+
+CALLS_PER_GENERATOR = 20
+
+GENERATION_CONFIG = {
+    "temperature": 0.4,
+    "response_mime_type": "application/json"
+}
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+def run_scenario(operation: str, compact: bool) -> dict:
+    settings = get_settings()
+    settings.LLM_COMPACT_OUTPUT = compact
+    llm_stats.reset()
+    latencies: List[float] = []
+    result = None
+    for i in range(CALLS_PER_GENERATOR):
+        started = time.monotonic()
+        result = generate_json(operation, f"Benchmark prompt {i}", GENERATION_CONFIG,
+                               compact_spec=COMPACT_SPECS[operation])
+        latencies.append(time.monotonic() - started)
+
+    stats = llm_stats.snapshot()[operation]
+    scale = settings.FAKE_LLM_TIME_SCALE if settings.LLM_BACKEND == "fake" else 1.0
+    return {
+        "p50": percentile(latencies, 0.50) / scale,
+        "output_tokens": stats["output_tokens"] / stats["calls"],
+        "result": result,
+    }
+
+
+def main():
+    print("\n" + "="*60)
+    print("   Compact-Key Structured Output - Benchmark")
+    print("="*60 + "\n")
+    print(f"   Backend: {get_settings().LLM_BACKEND}, {CALLS_PER_GENERATOR} calls per generator\n")
+    print(f"   {'Generator':<16} {'out tok':>14} {'saved':>7} {'p50 latency':>18} {'saved':>7}  expands")
+
+    for operation in COMPACT_SPECS:
+        # Silence per-call log lines so the report stays readable
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            verbose = run_scenario(operation, compact=False)
+            compact = run_scenario(operation, compact=True)
+
+        token_saving = (1 - compact["output_tokens"] / verbose["output_tokens"]) * 100
+        latency_saving = (1 - compact["p50"] / verbose["p50"]) * 100
+        expands = "✅" if compact["result"] == verbose["result"] else "❌"
+        print(
+            f"   {operation:<16} {verbose['output_tokens']:>6.0f} → {compact['output_tokens']:<5.0f} "
+            f"{token_saving:>6.1f}% {verbose['p50']:>7.2f}s → {compact['p50']:.2f}s {latency_saving:>8.1f}%  {expands}"
+        )
+
+    print("\n" + "="*60 + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
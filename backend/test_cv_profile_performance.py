@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark: one candidate applying to many jobs
+Compares /api/upload-cv per application (the CV is re-extracted and
+re-parsed every time) with a CV profile created once and analyzed against
+each JD via /api/cv-profiles/{id}/analyze: latency per application and
+Gemini calls spent.
+
+By default starts the API in-process on the offline Gemini stand-in and
+in-memory Qdrant; set API_BASE=http://localhost:8000 to measure a running
+server instead.
+"""
+
+import os
+import sys
+import time
+import socket
+import threading
+import statistics
+import contextlib
+from typing import List
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("QDRANT_HOST", ":memory:")
+os.environ.setdefault("FAKE_LLM_SEED", "42")
+os.environ.setdefault("FAKE_LLM_LATENCY_MEDIAN", "2.0")
+os.environ.setdefault("FAKE_LLM_LATENCY_SIGMA", "0.3")
+os.environ.setdefault("FAKE_LLM_TIME_SCALE", "0.05")  # run 20x faster than real time
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("PRECOMPUTE_ARTIFACTS", "")
+sys.path.insert(0, os.path.dirname(__file__))
+
+import httpx
+
+APPLICATIONS = 8
+TEST_DIR = os.path.join(os.path.dirname(__file__), "test")
+
+
+def start_local_server() -> str:
+    """Run the app with uvicorn in a background thread; returns its base URL"""
+    import uvicorn
+    from app.main import app
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+def load_inputs(variant: str):
+    with open(os.path.join(TEST_DIR, "resume.txt"), "rb") as f:
+        cv = f.read() + f"\nReference: {variant}\n".encode()
+    with open(os.path.join(TEST_DIR, "job_description.txt")) as f:
+        jd = f.read()
+    # Distinct JDs, so none is served from the analysis cache
+    jds = [jd + f"\nRequisition: {variant}-{i}\n" for i in range(APPLICATIONS)]
+    return cv, jds
+
+
+def llm_calls(client: httpx.Client) -> int:
+    llm = client.get("/api/metrics").json()["llm"]
+    return sum(op["calls"] for op in llm.values())
+
+
+def run_upload_per_job(client: httpx.Client) -> List[float]:
+    """Today: the same CV uploaded again with every JD"""
+    cv, jds = load_inputs("upload")
+    latencies = []
+    for jd in jds:
+        started = time.monotonic()
+        response = client.post("/api/upload-cv", files={"file": ("resume.txt", cv, "text/plain")}, data={"jd_text": jd})
+        response.raise_for_status()
+        latencies.append(time.monotonic() - started)
+    return latencies
+
+
+def run_profile(client: httpx.Client) -> List[float]:
+    """Profile created once (counted in the first application), then analyzed per JD"""
+    cv, jds = load_inputs("profile")
+    started = time.monotonic()
+    response = client.post("/api/cv-profiles", files={"file": ("resume.txt", cv, "text/plain")})
+    response.raise_for_status()
+    profile_id = response.json()["id"]
+    setup = time.monotonic() - started
+
+    latencies = []
+    for jd in jds:
+        started = time.monotonic()
+        client.post(f"/api/cv-profiles/{profile_id}/analyze", data={"jd_text": jd}).raise_for_status()
+        latencies.append(time.monotonic() - started)
+    latencies[0] += setup
+    return latencies
+
+
+def main():
+    print("\n" + "="*60)
+    print("   CV Profiles - One Candidate, Many Job Descriptions")
+    print("="*60 + "\n")
+
+    api_base = os.environ.get("API_BASE")
+    if not api_base:
+        # Silence per-request pipeline logs so the report stays readable
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            api_base = start_local_server()
+    print(f"   Server: {api_base}, {APPLICATIONS} applications per approach\n")
+
+    results = []
+    with httpx.Client(base_url=api_base, timeout=180) as client:
+        for name, runner in (("upload-cv per job", run_upload_per_job), ("profile + analyze", run_profile)):
+            before = llm_calls(client)
+            with contextlib.redirect_stdout(open(os.devnull, "w")):
+                latencies = runner(client)
+            results.append((name, latencies, llm_calls(client) - before))
+
+    print(f"   {'Approach':<22}{'p50':>10}{'total':>10}{'LLM calls':>12}{'per job':>10}")
+    for name, latencies, calls in results:
+        print(f"   {name:<22}{statistics.median(latencies):>9.2f}s{sum(latencies):>9.2f}s"
+              f"{calls:>12}{calls / APPLICATIONS:>10.1f}")
+
+    print("\n" + "="*60 + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Benchmark: event-loop responsiveness while post-analysis generators run
+A probe hits /health every few milliseconds while concurrent clients call
+submit-answers, generate-cover-letter, learning-recommendations and
+interview-prep. With async-native generators /health p99 should stay close
+to its idle value; the "blocking reference" phase swaps the old synchronous
+generators back in to show what one blocking call does to every request.
+
+Starts the API in-process on the offline Gemini stand-in and in-memory
+Qdrant (the reference phase needs to patch the app, so no API_BASE here).
+"""
+
+import os
+import sys
+import time
+import socket
+import asyncio
+import threading
+import statistics
+import contextlib
+from typing import Dict, List
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("QDRANT_HOST", ":memory:")
+os.environ.setdefault("FAKE_LLM_SEED", "42")
+os.environ.setdefault("FAKE_LLM_LATENCY_MEDIAN", "8.0")  # long-form generators take 5-15s
+os.environ.setdefault("FAKE_LLM_LATENCY_SIGMA", "0.3")
+os.environ.setdefault("FAKE_LLM_TIME_SCALE", "0.05")  # run 20x faster than real time
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("PRECOMPUTE_ARTIFACTS", "")  # every generation comes from the load clients
+sys.path.insert(0, os.path.dirname(__file__))
+
+import httpx
+
+ANALYSES = 4
+CLIENTS = 8
+LOAD_SECONDS = 5.0
+PROBE_INTERVAL = 0.01
+TEST_DIR = os.path.join(os.path.dirname(__file__), "test")
+ANSWERS = {"q1": "I have run Kubernetes in production for two years"}
+
+
+def start_local_server() -> str:
+    """Run the app with uvicorn in a background thread; returns its base URL"""
+    import uvicorn
+    from app.main import app
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+def use_blocking_generators():
+    """Reference: the synchronous generators called straight from the async endpoints, as before"""
+    import app.main as main
+    from app.services import precompute
+    from app.services.cv_optimizer import optimize_cv
+    from app.services.cover_letter_gen import generate_cover_letter
+    from app.services.learning_recommender import generate_learning_recommendations
+    from app.services.interview_prep import generate_interview_prep
+
+    def blocking(generator):
+        async def call(*args, **kwargs):
+            return generator(*args, **kwargs)
+        return call
+
+    main.optimize_cv_async = blocking(optimize_cv)
+    precompute.generate_cover_letter_async = blocking(generate_cover_letter)
+    precompute.generate_learning_recommendations_async = blocking(generate_learning_recommendations)
+    precompute.generate_interview_prep_async = blocking(generate_interview_prep)
+
+
+def clear_cached_results(analysis_ids: List[str]):
+    """Learning paths and interview guides are cached per analysis; drop them so every call generates"""
+    from app.database import SessionLocal
+    from app.models import CVAnalysis
+
+    db = SessionLocal()
+    try:
+        db.query(CVAnalysis).filter(CVAnalysis.id.in_(analysis_ids)).update(
+            {"learning_recommendations": None, "interview_prep": None}, synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+async def create_analysis(client: httpx.AsyncClient) -> str:
+    with open(os.path.join(TEST_DIR, "resume.txt"), "rb") as f:
+        cv = f.read()
+    with open(os.path.join(TEST_DIR, "job_description.txt")) as f:
+        jd = f.read()
+    response = await client.post("/api/upload-cv", files={"file": ("resume.txt", cv, "text/plain")}, data={"jd_text": jd})
+    response.raise_for_status()
+    analysis_id = response.json()["id"]
+    (await client.post(f"/api/submit-answers/{analysis_id}", json=ANSWERS)).raise_for_status()
+    return analysis_id
+
+
+async def generator_client(client: httpx.AsyncClient, analysis_ids: List[str], index: int, until: float) -> int:
+    """Cycle through the four generator endpoints; returns completed calls"""
+    calls = [
+        ("POST", "/api/submit-answers/{id}", {"json": ANSWERS}),
+        ("POST", "/api/generate-cover-letter/{id}", {}),
+        ("GET", "/api/learning-recommendations/{id}", {}),
+        ("GET", "/api/interview-prep/{id}", {}),
+    ]
+    completed = 0
+    while time.monotonic() < until:
+        method, path, kwargs = calls[(index + completed) % len(calls)]
+        analysis_id = analysis_ids[(index + completed) % len(analysis_ids)]
+        response = await client.request(method, path.format(id=analysis_id), **kwargs)
+        response.raise_for_status()
+        completed += 1
+    return completed
+
+
+async def probe_health(client: httpx.AsyncClient, until: float) -> List[float]:
+    latencies = []
+    while time.monotonic() < until:
+        started = time.monotonic()
+        (await client.get("/health")).raise_for_status()
+        latencies.append(time.monotonic() - started)
+        await asyncio.sleep(PROBE_INTERVAL)
+    return latencies
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run_phase(api_base: str, analysis_ids: List[str], load: bool) -> Dict[str, float]:
+    clear_cached_results(analysis_ids)
+    limits = httpx.Limits(max_connections=CLIENTS + 2)
+    async with httpx.AsyncClient(base_url=api_base, timeout=300, limits=limits) as client:
+        until = time.monotonic() + LOAD_SECONDS
+        clients = [generator_client(client, analysis_ids, i, until) for i in range(CLIENTS)] if load else []
+        latencies, *completed = await asyncio.gather(probe_health(client, until), *clients)
+    return {
+        "p50": statistics.median(latencies) * 1000,
+        "p99": percentile(latencies, 99) * 1000,
+        "max": max(latencies) * 1000,
+        "probes": len(latencies),
+        "generations": sum(completed)
+    }
+
+
+async def run() -> List[tuple]:
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        api_base = start_local_server()
+        async with httpx.AsyncClient(base_url=api_base, timeout=300) as client:
+            analysis_ids = [await create_analysis(client) for _ in range(ANALYSES)]
+
+        results = [("idle", await run_phase(api_base, analysis_ids, load=False))]
+        results.append(("async generators", await run_phase(api_base, analysis_ids, load=True)))
+        use_blocking_generators()
+        results.append(("blocking reference", await run_phase(api_base, analysis_ids, load=True)))
+    return results
+
+
+def main():
+    print("\n" + "="*60)
+    print("   Event Loop Responsiveness - /health Under Generator Load")
+    print("="*60 + "\n")
+    print(f"   {CLIENTS} concurrent generator clients, {LOAD_SECONDS:.0f}s per phase, "
+          f"/health probed every {PROBE_INTERVAL * 1000:.0f}ms\n")
+
+    results = asyncio.run(run())
+
+    print(f"   {'Phase':<22}{'p50':>10}{'p99':>10}{'max':>10}{'probes':>9}{'generations':>13}")
+    for phase, stats in results:
+        print(f"   {phase:<22}{stats['p50']:>8.1f}ms{stats['p99']:>8.1f}ms{stats['max']:>8.1f}ms"
+              f"{stats['probes']:>9}{stats['generations']:>13}")
+
+    print("\n" + "="*60 + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark: fused score-and-questions call vs the two-call flow
+Runs both flows against the offline Gemini stand-in (LLM_BACKEND=fake by
+default) and compares end-to-end latency and token usage per analysis.
+Export LLM_BACKEND=gemini and a real GEMINI_API_KEY to measure live.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import contextlib
+from typing import List
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("FAKE_LLM_SEED", "42")
+os.environ.setdefault("FAKE_LLM_LATENCY_MEDIAN", "1.5")  # time to first token
+os.environ.setdefault("FAKE_LLM_SECONDS_PER_OUTPUT_TOKEN", "0.004")  # ~250 tokens/s
+os.environ.setdefault("FAKE_LLM_TIME_SCALE", "0.05")  # run 20x faster than real time
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.config import get_settings
+from app.services.fake_llm import RESPONSE_BUILDERS
+from app.services.llm_client import llm_stats
+from app.services.scorer import calculate_compatibility_score
+from app.services.question_gen import generate_smart_questions, score_and_questions_fused
+
+ANALYSES = 40
+CONCURRENCY = 8
+
+CV_DATA = RESPONSE_BUILDERS["cv_parse"]("")
+JD_DATA = RESPONSE_BUILDERS["jd_analyze"]("")
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+async def two_call_flow():
+    score_data = await calculate_compatibility_score(CV_DATA, JD_DATA, scoring_mode="llm")
+    await generate_smart_questions(CV_DATA, JD_DATA, score_data.get('top_gaps', []))
+
+
+async def fused_flow():
+    await score_and_questions_fused(CV_DATA, JD_DATA)
+
+
+async def run_scenario(flow) -> dict:
+    llm_stats.reset()
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def one_analysis():
+        async with semaphore:
+            started = time.monotonic()
+            await flow()
+            latencies.append(time.monotonic() - started)
+
+    await asyncio.gather(*[one_analysis() for _ in range(ANALYSES)])
+
+    ops = llm_stats.snapshot().values()
+    # Report in simulated seconds so results read like real Gemini timings
+    scale = get_settings().FAKE_LLM_TIME_SCALE if get_settings().LLM_BACKEND == "fake" else 1.0
+    return {
+        "p50": percentile(latencies, 0.50) / scale,
+        "p90": percentile(latencies, 0.90) / scale,
+        "calls": sum(op["calls"] for op in ops) / ANALYSES,
+        "prompt_tokens": sum(op["prompt_tokens"] for op in ops) / ANALYSES,
+        "output_tokens": sum(op["output_tokens"] for op in ops) / ANALYSES,
+    }
+
+
+def main():
+    settings = get_settings()
+    print("\n" + "="*60)
+    print("   Fused Score + Questions - Benchmark")
+    print("="*60 + "\n")
+    print(f"   Backend: {settings.LLM_BACKEND}, {ANALYSES} analyses, concurrency {CONCURRENCY}\n")
+
+    # Silence per-call log lines so the report stays readable
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        two_call = asyncio.run(run_scenario(two_call_flow))
+        fused = asyncio.run(run_scenario(fused_flow))
+
+    print(f"   {'':<10} {'p50':>8} {'p90':>8} {'calls':>6} {'in tok':>8} {'out tok':>8}")
+    for name, result in (("Two calls", two_call), ("Fused", fused)):
+        print(
+            f"   {name:<10} {result['p50']:>7.2f}s {result['p90']:>7.2f}s {result['calls']:>6.1f} "
+            f"{result['prompt_tokens']:>8.0f} {result['output_tokens']:>8.0f}"
+        )
+
+    latency_saving = (1 - fused["p50"] / two_call["p50"]) * 100
+    token_saving = (1 - fused["prompt_tokens"] / two_call["prompt_tokens"]) * 100
+    print("\n" + "="*60)
+    print(f"📉 p50 latency: {two_call['p50']:.2f}s → {fused['p50']:.2f}s ({latency_saving:.1f}% faster)")
+    print(f"🧮 Input tokens per analysis: {two_call['prompt_tokens']:.0f} → {fused['prompt_tokens']:.0f} "
+          f"({token_saving:.1f}% fewer)")
+    print("="*60 + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Simulated-latency benchmark for hedged LLM requests
+Compares p50/p90/p99 with and without hedging on a long-tailed latency
+distribution - no Gemini key, Redis or Qdrant needed
+"""
+
+import os
+import sys
+import math
+import time
+import random
+import asyncio
+import contextlib
+from typing import List
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.services.hedging import Hedger
+
+# 1 simulated second = 10 ms of wall clock
+TIME_SCALE = 0.01
+TOTAL_CALLS = 2000
+CONCURRENCY = 50
+
+# Log-normal body (median ~4s) with a 3% slow tail (5x)
+MEDIAN_SECONDS = 4.0
+SIGMA = 0.35
+TAIL_PROBABILITY = 0.03
+TAIL_MULTIPLIER = 5.0
+
+
+def sample_latency(rng: random.Random) -> float:
+    latency = rng.lognormvariate(math.log(MEDIAN_SECONDS), SIGMA)
+    if rng.random() < TAIL_PROBABILITY:
+        latency *= TAIL_MULTIPLIER
+    return latency
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+async def run_scenario(hedging_enabled: bool, seed: int = 42) -> dict:
+    rng = random.Random(seed)
+    hedger = Hedger(enabled=hedging_enabled, percentile=0.9, budget_ratio=0.05, min_samples=20)
+    upstream_calls = 0
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def fake_gemini_call() -> dict:
+        nonlocal upstream_calls
+        upstream_calls += 1
+        await asyncio.sleep(sample_latency(rng) * TIME_SCALE)
+        return {"overall_score": 80}
+
+    async def one_request():
+        async with semaphore:
+            started = time.monotonic()
+            await hedger.run("score", fake_gemini_call)
+            latencies.append((time.monotonic() - started) / TIME_SCALE)
+
+    await asyncio.gather(*[one_request() for _ in range(TOTAL_CALLS)])
+
+    return {
+        "p50": percentile(latencies, 0.50),
+        "p90": percentile(latencies, 0.90),
+        "p99": percentile(latencies, 0.99),
+        "max": max(latencies),
+        "extra_calls_pct": (upstream_calls - TOTAL_CALLS) / TOTAL_CALLS * 100,
+        "stats": hedger.stats()
+    }
+
+
+def main():
+    print("\n" + "="*60)
+    print("   Hedged LLM Requests - Simulated Latency Benchmark")
+    print("="*60 + "\n")
+    print(f"   {TOTAL_CALLS} calls, concurrency {CONCURRENCY}")
+    print(f"   Latency: log-normal median {MEDIAN_SECONDS}s, sigma {SIGMA}, "
+          f"{TAIL_PROBABILITY*100:.0f}% tail x{TAIL_MULTIPLIER}\n")
+
+    # Silence per-hedge log lines so the report stays readable
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        baseline = asyncio.run(run_scenario(hedging_enabled=False))
+        hedged = asyncio.run(run_scenario(hedging_enabled=True))
+
+    print(f"   {'':<12} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8} {'extra calls':>12}")
+    for name, result in (("No hedging", baseline), ("Hedged p90", hedged)):
+        print(
+            f"   {name:<12} {result['p50']:>7.2f}s {result['p90']:>7.2f}s "
+            f"{result['p99']:>7.2f}s {result['max']:>7.2f}s {result['extra_calls_pct']:>11.1f}%"
+        )
+
+    improvement = (1 - hedged["p99"] / baseline["p99"]) * 100
+    print("\n" + "="*60)
+    print(f"📉 p99 improvement: {improvement:.1f}% "
+          f"({baseline['p99']:.2f}s → {hedged['p99']:.2f}s)")
+    print(f"🪁 Hedges: {hedged['stats']['hedges']} "
+          f"(wins: {hedged['stats']['hedge_wins']}, denied by budget: {hedged['stats']['budget_denied']})")
+    print("="*60 + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
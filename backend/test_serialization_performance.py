@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark: prompt serialization strategies on parsed CVs and JDs
+For every document in test/corpus, reports estimated tokens and encode time
+for indented JSON (the old fallback), compact JSON, the toon_format library
+(if installed) and the adaptive encoder, plus the same for each generator's
+compacted inputs. Token counts come from the local estimator the adaptive
+encoder uses; they are for comparing strategies, not billing.
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import statistics
+from typing import Callable, Dict
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.services.toon_serializer import count_text_tokens, encode_adaptive, _toon_encode
+from app.services.prompt_compaction import compact_inputs
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "test", "corpus")
+ENCODE_REPEATS = 200
+
+STRATEGIES: Dict[str, Callable] = {
+    "json indent=2": lambda data: json.dumps(data, indent=2),
+    "json compact": lambda data: json.dumps(data, separators=(",", ":"), ensure_ascii=False),
+    "adaptive": encode_adaptive,
+}
+if _toon_encode is not None:
+    STRATEGIES["toon_format"] = _toon_encode
+
+
+def load_corpus() -> Dict[str, dict]:
+    corpus = {}
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, "*.json"))):
+        with open(path) as f:
+            corpus[os.path.splitext(os.path.basename(path))[0]] = json.load(f)
+    return corpus
+
+
+def measure(data, encode: Callable) -> dict:
+    text = encode(data)
+    timings = []
+    for _ in range(ENCODE_REPEATS):
+        started = time.perf_counter()
+        encode(data)
+        timings.append(time.perf_counter() - started)
+    return {"tokens": count_text_tokens(text), "micros": statistics.median(timings) * 1e6}
+
+
+def report(title: str, documents: Dict[str, object]) -> Dict[str, int]:
+    print(f"   {title}")
+    print(f"   {'Document':<32}" + "".join(f"{name:>22}" for name in STRATEGIES))
+    totals = {name: 0 for name in STRATEGIES}
+    for doc_name, data in documents.items():
+        cells = []
+        for name, encode in STRATEGIES.items():
+            result = measure(data, encode)
+            totals[name] += result["tokens"]
+            cells.append(f"{result['tokens']:>7} tok {result['micros']:>7.0f}µs")
+        print(f"   {doc_name:<32}" + "".join(f"{cell:>22}" for cell in cells))
+
+    baseline = totals["json indent=2"]
+    cells = [f"{total} tok ({(total / baseline - 1) * 100:.0f}%)" for total in totals.values()]
+    print(f"   {'TOTAL vs indented JSON':<32}" + "".join(f"{cell:>22}" for cell in cells))
+    print()
+    return totals
+
+
+def main():
+    print("\n" + "="*60)
+    print("   Prompt Serialization - Benchmark")
+    print("="*60 + "\n")
+
+    corpus = load_corpus()
+    if not corpus:
+        print(f"   ❌ No corpus documents found in {CORPUS_DIR}")
+        return 1
+    print(f"   {len(corpus)} documents, median of {ENCODE_REPEATS} encodes, "
+          f"toon_format {'installed' if _toon_encode else 'not installed'}\n")
+
+    report("Whole documents", corpus)
+
+    # What the generators actually send after prompt compaction
+    cvs = {name: doc for name, doc in corpus.items() if name.startswith("cv_")}
+    jds = {name: doc for name, doc in corpus.items() if name.startswith("jd_")}
+    projected = {}
+    for (cv_name, cv), (jd_name, jd) in zip(cvs.items(), jds.items()):
+        for profile in ("cover_letter", "learning_path", "interview_prep"):
+            inputs = compact_inputs(profile, cv=cv, jd=jd)
+            projected[f"{profile}/{cv_name[3:]}"] = inputs["cv"]
+    report("Compacted generator inputs (CV section)", projected)
+
+    print("="*60 + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
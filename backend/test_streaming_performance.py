@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark: time-to-first-useful-byte of /api/upload-cv/stream vs the
+blocking /api/upload-cv
+Reports when each streamed event arrives (the score is the first thing the
+UI can render) against the end-to-end latency of the blocking endpoint.
+
+By default starts the API in-process on the offline Gemini stand-in and
+in-memory Qdrant; set API_BASE=http://localhost:8000 to measure a running
+server instead.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import threading
+import statistics
+import contextlib
+from typing import Dict, List
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("QDRANT_HOST", ":memory:")
+os.environ.setdefault("FAKE_LLM_SEED", "42")
+os.environ.setdefault("FAKE_LLM_LATENCY_MEDIAN", "2.0")
+os.environ.setdefault("FAKE_LLM_LATENCY_SIGMA", "0.2")
+os.environ.setdefault("FAKE_LLM_TIME_SCALE", "0.1")  # run 10x faster than real time
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+sys.path.insert(0, os.path.dirname(__file__))
+
+import httpx
+
+RUNS = 10
+TEST_DIR = os.path.join(os.path.dirname(__file__), "test")
+
+
+def start_local_server() -> str:
+    """Run the app with uvicorn in a background thread; returns its base URL"""
+    import uvicorn
+    from app.main import app
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+def upload_args() -> dict:
+    with open(os.path.join(TEST_DIR, "resume.txt"), "rb") as f:
+        cv = f.read()
+    with open(os.path.join(TEST_DIR, "job_description.txt")) as f:
+        jd = f.read()
+    return {"files": {"file": ("resume.txt", cv, "text/plain")}, "data": {"jd_text": jd}}
+
+
+def run_blocking(client: httpx.Client) -> float:
+    started = time.monotonic()
+    response = client.post("/api/upload-cv", **upload_args())
+    response.raise_for_status()
+    return time.monotonic() - started
+
+
+def run_streaming(client: httpx.Client) -> Dict[str, float]:
+    """Arrival time of every event in one streamed run"""
+    arrivals = {}
+    started = time.monotonic()
+    with client.stream("POST", "/api/upload-cv/stream", **upload_args()) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if line:
+                arrivals[json.loads(line)["event"]] = time.monotonic() - started
+    return arrivals
+
+
+def main():
+    print("\n" + "="*60)
+    print("   Streaming Pipeline - Time to First Useful Byte")
+    print("="*60 + "\n")
+
+    api_base = os.environ.get("API_BASE")
+    if not api_base:
+        # Silence per-request pipeline logs so the report stays readable
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            api_base = start_local_server()
+    print(f"   Server: {api_base}, {RUNS} runs per endpoint\n")
+
+    blocking: List[float] = []
+    streamed: List[Dict[str, float]] = []
+    with httpx.Client(base_url=api_base, timeout=180) as client:
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            for _ in range(RUNS):
+                blocking.append(run_blocking(client))
+                streamed.append(run_streaming(client))
+
+    blocking_p50 = statistics.median(blocking)
+    print(f"   {'Blocking /api/upload-cv (full response)':<44} p50 {blocking_p50:>6.2f}s\n")
+    print(f"   {'Streamed event':<44} p50 arrival   vs blocking")
+    for event in ("cv_parsed", "jd_parsed", "analysis", "score", "gaps", "questions", "complete"):
+        times = [run[event] for run in streamed if event in run]
+        if not times:
+            continue
+        arrival = statistics.median(times)
+        marker = "  ← first useful result" if event == "score" else ""
+        print(f"   {event:<44} {arrival:>9.2f}s {(arrival / blocking_p50 - 1) * 100:>+10.0f}%{marker}")
+
+    print("\n" + "="*60 + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
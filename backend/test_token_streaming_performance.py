@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark: perceived latency of the streamed long-form generators
+For CV optimization, cover letter and interview prep, compares the blocking
+endpoint's end-to-end latency with the SSE stream's first chunk, first
+complete field and completion.
+
+By default starts the API in-process on the offline Gemini stand-in and
+in-memory Qdrant; set API_BASE=http://localhost:8000 to measure a running
+server instead.
+"""
+
+import os
+import sys
+import time
+import socket
+import threading
+import statistics
+import contextlib
+from typing import Dict, List
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("QDRANT_HOST", ":memory:")
+os.environ.setdefault("FAKE_LLM_SEED", "42")
+os.environ.setdefault("FAKE_LLM_LATENCY_MEDIAN", "2.0")
+os.environ.setdefault("FAKE_LLM_LATENCY_SIGMA", "0.2")
+os.environ.setdefault("FAKE_LLM_SECONDS_PER_OUTPUT_TOKEN", "0.01")  # ~100 tokens/s generation
+os.environ.setdefault("FAKE_LLM_TIME_SCALE", "0.1")  # run 10x faster than real time
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+sys.path.insert(0, os.path.dirname(__file__))
+
+import httpx
+
+RUNS = 5
+TEST_DIR = os.path.join(os.path.dirname(__file__), "test")
+ANSWERS = {"q1": "I have run Kubernetes in production for two years"}
+
+# (name, blocking request, streamed request)
+GENERATORS = [
+    ("optimize_cv", ("POST", "/api/submit-answers/{id}", {"json": ANSWERS}),
+     ("POST", "/api/submit-answers/{id}/stream", {"json": ANSWERS})),
+    ("cover_letter", ("POST", "/api/generate-cover-letter/{id}", {}),
+     ("POST", "/api/generate-cover-letter/{id}/stream", {})),
+    ("interview_prep", ("GET", "/api/interview-prep/{id}", {}),
+     ("GET", "/api/interview-prep/{id}/stream", {})),
+]
+
+
+def start_local_server() -> str:
+    """Run the app with uvicorn in a background thread; returns its base URL"""
+    import uvicorn
+    from app.main import app
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+def create_analysis(client: httpx.Client) -> str:
+    with open(os.path.join(TEST_DIR, "resume.txt"), "rb") as f:
+        cv = f.read()
+    with open(os.path.join(TEST_DIR, "job_description.txt")) as f:
+        jd = f.read()
+    response = client.post("/api/upload-cv", files={"file": ("resume.txt", cv, "text/plain")}, data={"jd_text": jd})
+    response.raise_for_status()
+    return response.json()["id"]
+
+
+def run_blocking(client: httpx.Client, analysis_id: str, request: tuple) -> float:
+    method, path, kwargs = request
+    started = time.monotonic()
+    response = client.request(method, path.format(id=analysis_id), **kwargs)
+    response.raise_for_status()
+    return time.monotonic() - started
+
+
+def run_streaming(client: httpx.Client, analysis_id: str, request: tuple) -> Dict[str, float]:
+    """Arrival of the first delta, the first field and completion"""
+    method, path, kwargs = request
+    arrivals = {}
+    started = time.monotonic()
+    with client.stream(method, path.format(id=analysis_id), **kwargs) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+                arrivals.setdefault(event, time.monotonic() - started)
+                if event == "error":
+                    raise RuntimeError(f"{path} streamed an error")
+    return arrivals
+
+
+def main():
+    print("\n" + "="*60)
+    print("   Token Streaming - Perceived Latency of Long Outputs")
+    print("="*60 + "\n")
+
+    api_base = os.environ.get("API_BASE")
+    if not api_base:
+        # Silence per-request pipeline logs so the report stays readable
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            api_base = start_local_server()
+    print(f"   Server: {api_base}, {RUNS} runs per generator\n")
+
+    blocking: Dict[str, List[float]] = {name: [] for name, _, _ in GENERATORS}
+    streamed: Dict[str, List[Dict[str, float]]] = {name: [] for name, _, _ in GENERATORS}
+    with httpx.Client(base_url=api_base, timeout=180) as client:
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            for _ in range(RUNS):
+                # Separate analyses: interview prep is cached once generated
+                blocking_id, streamed_id = create_analysis(client), create_analysis(client)
+                for name, blocking_request, streamed_request in GENERATORS:
+                    blocking[name].append(run_blocking(client, blocking_id, blocking_request))
+                    streamed[name].append(run_streaming(client, streamed_id, streamed_request))
+
+    print(f"   {'Generator':<16}{'blocking p50':>14}{'first delta':>14}{'first field':>14}{'complete':>14}{'vs blocking':>14}")
+    for name, _, _ in GENERATORS:
+        blocking_p50 = statistics.median(blocking[name])
+        cells = []
+        for event in ("delta", "field", "complete"):
+            times = [run[event] for run in streamed[name] if event in run]
+            cells.append(f"{statistics.median(times):.2f}s" if times else "-")
+        first_delta = statistics.median(run["delta"] for run in streamed[name])
+        cells.append(f"{(first_delta / blocking_p50 - 1) * 100:+.0f}%")
+        print(f"   {name:<16}{blocking_p50:>13.2f}s" + "".join(f"{cell:>14}" for cell in cells))
+
+    print("\n" + "="*60 + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark: repeated uploads (double clicks, retries, refreshes)
+Each of UPLOADS distinct CV/JD pairs is submitted as a burst of CLICKS
+concurrent requests, then once more afterwards (a refresh). Reports
+analyses created, Gemini calls and latency with upload deduplication on
+and - as the reference - off.
+
+Starts the API in-process on the offline Gemini stand-in and in-memory
+Qdrant (the reference phase toggles the setting in the app, so no
+API_BASE here).
+"""
+
+import os
+import sys
+import time
+import socket
+import asyncio
+import threading
+import statistics
+import contextlib
+from typing import List
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("QDRANT_HOST", ":memory:")
+os.environ.setdefault("FAKE_LLM_SEED", "42")
+os.environ.setdefault("FAKE_LLM_LATENCY_MEDIAN", "2.0")
+os.environ.setdefault("FAKE_LLM_LATENCY_SIGMA", "0.3")
+os.environ.setdefault("FAKE_LLM_TIME_SCALE", "0.05")  # run 20x faster than real time
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("PRECOMPUTE_ARTIFACTS", "")
+sys.path.insert(0, os.path.dirname(__file__))
+
+import httpx
+
+UPLOADS = 6
+CLICKS = 3
+TEST_DIR = os.path.join(os.path.dirname(__file__), "test")
+
+
+def start_local_server() -> str:
+    """Run the app with uvicorn in a background thread; returns its base URL"""
+    import uvicorn
+    from app.main import app
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+def set_dedupe(enabled: bool):
+    from app.services import upload_dedupe
+    upload_dedupe.settings.UPLOAD_DEDUPE_ENABLED = enabled
+
+
+async def llm_calls(client: httpx.AsyncClient) -> int:
+    llm = (await client.get("/api/metrics")).json()["llm"]
+    return sum(op["calls"] for op in llm.values())
+
+
+async def upload(client: httpx.AsyncClient, cv: bytes, jd: str, latencies: List[float]) -> str:
+    started = time.monotonic()
+    response = await client.post("/api/upload-cv", files={"file": ("resume.txt", cv, "text/plain")}, data={"jd_text": jd})
+    response.raise_for_status()
+    latencies.append(time.monotonic() - started)
+    return response.json()["id"]
+
+
+async def run_phase(client: httpx.AsyncClient, phase: str) -> dict:
+    with open(os.path.join(TEST_DIR, "resume.txt"), "rb") as f:
+        cv = f.read()
+    with open(os.path.join(TEST_DIR, "job_description.txt")) as f:
+        jd = f.read()
+
+    before = await llm_calls(client)
+    latencies: List[float] = []
+    analysis_ids = set()
+    for i in range(UPLOADS):
+        # Distinct per phase and upload, so neither phase reuses the other's analyses
+        upload_jd = jd + f"\nRequisition: {phase}-{i}\n"
+        burst = await asyncio.gather(*(upload(client, cv, upload_jd, latencies) for _ in range(CLICKS)))
+        refresh = await upload(client, cv, upload_jd, latencies)
+        analysis_ids.update(burst + [refresh])
+    return {
+        "requests": UPLOADS * (CLICKS + 1),
+        "analyses": len(analysis_ids),
+        "llm_calls": await llm_calls(client) - before,
+        "p50": statistics.median(latencies)
+    }
+
+
+async def run() -> List[tuple]:
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        api_base = start_local_server()
+        async with httpx.AsyncClient(base_url=api_base, timeout=180) as client:
+            set_dedupe(True)
+            results = [("dedupe on", await run_phase(client, "on"))]
+            set_dedupe(False)
+            results.append(("dedupe off (reference)", await run_phase(client, "off")))
+    return results
+
+
+def main():
+    print("\n" + "="*60)
+    print("   Upload Deduplication - Double Clicks and Refreshes")
+    print("="*60 + "\n")
+    print(f"   {UPLOADS} uploads, each as {CLICKS} concurrent clicks plus one refresh\n")
+
+    results = asyncio.run(run())
+
+    print(f"   {'Phase':<24}{'requests':>10}{'analyses':>10}{'LLM calls':>11}{'p50':>9}")
+    for phase, stats in results:
+        print(f"   {phase:<24}{stats['requests']:>10}{stats['analyses']:>10}{stats['llm_calls']:>11}{stats['p50']:>8.2f}s")
+
+    print("\n" + "="*60 + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
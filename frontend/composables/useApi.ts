@@ -1,10 +1,17 @@
 import type {
   UploadCVResponse,
+  CVProfileResponse,
+  AnalysisJobResponse,
+  AnalysisStreamEvent,
+  RankStreamEvent,
+  GenerationStreamEvent,
   AnalysisResponse,
   SubmitAnswersResponse,
   CoverLetterResponse,
+  CoverLetterData,
   LearningRecommendationsResponse,
-  InterviewPrepResponse
+  InterviewPrepResponse,
+  InterviewPrepData
 } from '~/types/api'
 
 export const useApi = () => {
@@ -41,6 +48,121 @@ export const useApi = () => {
     }
   }
 
+  // Streaming variant: onEvent gets each result (score, gaps, questions...) as soon as it is ready
+  const uploadCVStream = async (
+    file: File,
+    jdText: string,
+    onEvent: (event: AnalysisStreamEvent) => void
+  ): Promise<UploadCVResponse> => {
+    const formData = new FormData()
+    formData.append('file', file)
+    formData.append('jd_text', jdText)
+
+    const response = await fetch(`${apiBase}/api/upload-cv/stream`, { method: 'POST', body: formData })
+    if (!response.ok || !response.body) {
+      throw new Error(`CV upload failed: ${response.status}`)
+    }
+
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+    while (true) {
+      const { done, value } = await reader.read()
+      if (done) break
+      buffer += decoder.decode(value, { stream: true })
+      const lines = buffer.split('\n')
+      buffer = lines.pop() || ''
+      for (const line of lines.filter(Boolean)) {
+        const event = JSON.parse(line) as AnalysisStreamEvent
+        onEvent(event)
+        if (event.event === 'complete') return event
+        if (event.event === 'error') throw new Error(event.detail)
+      }
+    }
+    throw new Error('CV upload stream ended early')
+  }
+
+  // Reusable CV: parsed once, then analyzed against each new job description
+  const createCVProfile = async (file: File): Promise<CVProfileResponse> => {
+    const formData = new FormData()
+    formData.append('file', file)
+
+    return await $fetch<CVProfileResponse>(`${apiBase}/api/cv-profiles`, {
+      method: 'POST',
+      body: formData
+    })
+  }
+
+  const getCVProfile = async (profileId: string): Promise<CVProfileResponse> => {
+    return await $fetch<CVProfileResponse>(`${apiBase}/api/cv-profiles/${profileId}`)
+  }
+
+  const analyzeCVProfile = async (profileId: string, jdText: string): Promise<UploadCVResponse> => {
+    const formData = new FormData()
+    formData.append('jd_text', jdText)
+
+    return await $fetch<UploadCVResponse>(`${apiBase}/api/cv-profiles/${profileId}/analyze`, {
+      method: 'POST',
+      body: formData
+    })
+  }
+
+  // Recruiter screening: many CVs against one JD, candidates streamed in rank order
+  const rankCVsStream = async (
+    files: File[],
+    jdText: string,
+    topK: number,
+    onEvent: (event: RankStreamEvent) => void
+  ): Promise<Extract<RankStreamEvent, { event: 'complete' }>> => {
+    const formData = new FormData()
+    files.forEach(file => formData.append('files', file))
+    formData.append('jd_text', jdText)
+    formData.append('top_k', String(topK))
+
+    const response = await fetch(`${apiBase}/api/rank-cvs/stream`, { method: 'POST', body: formData })
+    if (!response.ok || !response.body) {
+      throw new Error(`CV ranking failed: ${response.status}`)
+    }
+
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+    while (true) {
+      const { done, value } = await reader.read()
+      if (done) break
+      buffer += decoder.decode(value, { stream: true })
+      const lines = buffer.split('\n')
+      buffer = lines.pop() || ''
+      for (const line of lines.filter(Boolean)) {
+        const event = JSON.parse(line) as RankStreamEvent
+        onEvent(event)
+        if (event.event === 'complete') return event
+        if (event.event === 'error') throw new Error(event.detail)
+      }
+    }
+    throw new Error('CV ranking stream ended early')
+  }
+
+  // Background variant: returns at once with a job to poll via getJobStatus
+  const startAnalysisJob = async (file: File, jdText: string): Promise<AnalysisJobResponse> => {
+    const formData = new FormData()
+    formData.append('file', file)
+    formData.append('jd_text', jdText)
+
+    return await $fetch<AnalysisJobResponse>(`${apiBase}/api/upload-cv/jobs`, {
+      method: 'POST',
+      body: formData
+    })
+  }
+
+  const getJobStatus = async (jobId: string): Promise<AnalysisJobResponse> => {
+    return await $fetch<AnalysisJobResponse>(`${apiBase}/api/jobs/${jobId}`)
+  }
+
+  const retryJob = async (jobId: string): Promise<AnalysisJobResponse> => {
+    return await $fetch<AnalysisJobResponse>(`${apiBase}/api/jobs/${jobId}/retry`, { method: 'POST' })
+  }
+
   const getAnalysis = async (id: string): Promise<AnalysisResponse> => {
     return await $fetch<AnalysisResponse>(`${apiBase}/api/analysis/${id}`)
   }
@@ -64,6 +186,51 @@ export const useApi = () => {
     }
   }
 
+  // Reads an SSE generation stream; resolves with the final (persisted) result
+  const readGenerationStream = async <T>(
+    response: Response,
+    onEvent: (event: GenerationStreamEvent<T>) => void
+  ): Promise<T> => {
+    if (!response.ok || !response.body) {
+      throw new Error(`Generation failed: ${response.status}`)
+    }
+
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+    while (true) {
+      const { done, value } = await reader.read()
+      if (done) break
+      buffer += decoder.decode(value, { stream: true })
+      const messages = buffer.split('\n\n')
+      buffer = messages.pop() || ''
+      for (const message of messages) {
+        const name = message.match(/^event: (.*)$/m)?.[1]
+        const data = message.match(/^data: (.*)$/m)?.[1]
+        if (!name || !data) continue
+        const event = { event: name, ...JSON.parse(data) } as GenerationStreamEvent<T>
+        onEvent(event)
+        if (event.event === 'complete') return event.result
+        if (event.event === 'error') throw new Error(event.detail)
+      }
+    }
+    throw new Error('Generation stream ended early')
+  }
+
+  // Streaming variant: onEvent gets the optimized CV's text and fields as they are generated
+  const submitAnswersStream = async (
+    id: string,
+    answers: Record<number, string>,
+    onEvent: (event: GenerationStreamEvent<any>) => void
+  ): Promise<any> => {
+    const response = await fetch(`${apiBase}/api/submit-answers/${id}/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(answers)
+    })
+    return await readGenerationStream(response, onEvent)
+  }
+
   const getDownloadURL = (id: string): string => {
     return `${apiBase}/api/download-cv/${id}`
   }
@@ -86,9 +253,25 @@ export const useApi = () => {
     }
   }
 
+  const generateCoverLetterStream = async (
+    id: string,
+    onEvent: (event: GenerationStreamEvent<CoverLetterData>) => void
+  ): Promise<CoverLetterData> => {
+    const response = await fetch(`${apiBase}/api/generate-cover-letter/${id}/stream`, { method: 'POST' })
+    return await readGenerationStream(response, onEvent)
+  }
+
   const getCoverLetter = async (id: string): Promise<CoverLetterResponse> => {
     const analysis = await getAnalysis(id)
-    return {
+    const getInterviewPrepStream = async (
+    id: string,
+    onEvent: (event: GenerationStreamEvent<InterviewPrepData>) => void
+  ): Promise<InterviewPrepData> => {
+    const response = await fetch(`${apiBase}/api/interview-prep/${id}/stream`)
+    return await readGenerationStream(response, onEvent)
+  }
+
+  return {
       id: analysis.id,
       message: 'Cover letter retrieved',
       cover_letter: analysis.cover_letter
@@ -111,13 +294,24 @@ export const useApi = () => {
 
   return {
     uploadCV,
+    uploadCVStream,
+    rankCVsStream,
+    createCVProfile,
+    getCVProfile,
+    analyzeCVProfile,
+    startAnalysisJob,
+    getJobStatus,
+    retryJob,
     getAnalysis,
     submitAnswers,
+    submitAnswersStream,
     getDownloadURL,
     generateCoverLetter,
+    generateCoverLetterStream,
     getCoverLetter,
     getCoverLetterDownloadURL,
     getLearningRecommendations,
-    getInterviewPrep
+    getInterviewPrep,
+    getInterviewPrepStream
   }
 }
@@ -164,6 +164,81 @@ export interface UploadCVResponse {
   gaps?: Gap[]
   strengths?: string[]
   questions?: Question[]
+  scoring_mode?: 'fast' | 'llm' | 'hybrid'
+  degraded_stages?: string[]
+  deduplicated?: boolean  // Same CV + JD (or Idempotency-Key) as an earlier upload: that analysis is returned
+}
+
+// /api/upload-cv/stream events (one NDJSON line each)
+export type AnalysisStreamEvent =
+  | { event: 'cv_parsed', cv_parsed: any }
+  | { event: 'jd_parsed', jd_parsed: any }
+  | { event: 'analysis', id: string }
+  | { event: 'score', score: number, breakdown?: Record<string, BreakdownItem>, strengths?: string[], scoring_mode?: 'fast' | 'llm' | 'hybrid' }
+  | { event: 'gaps', gaps: Gap[] }
+  | { event: 'questions', questions: Question[] }
+  | ({ event: 'complete' } & UploadCVResponse)
+  | { event: 'error', detail: string }
+
+// A CV parsed and embedded once (/api/cv-profiles), analyzed against many JDs
+export interface CVProfileResponse {
+  id: string
+  filename: string
+  name?: string
+  sections: string[]
+  cv_parsed: any
+  created_at?: string
+}
+
+// /api/rank-cvs/stream events (one NDJSON line each); candidates arrive in rank order
+export interface RankedCandidate {
+  rank: number
+  filename: string
+  name?: string
+  score: number
+  fast_score: number
+  similarity: number
+  refined: boolean
+  breakdown?: Record<string, BreakdownItem>
+  gaps: Gap[]
+  strengths: string[]
+}
+
+export type RankStreamEvent =
+  | { event: 'jd_parsed', jd_parsed: any }
+  | { event: 'shortlist', ranked: number, failed: number, top_k: number }
+  | ({ event: 'candidate' } & RankedCandidate)
+  | { event: 'failed', filename: string, detail: string }
+  | { event: 'complete', ranked: number, refined: number, failed: number, refined_order: number[], seconds: number }
+  | { event: 'error', detail: string }
+
+// SSE events of the streamed generators (submit-answers, cover letter, interview prep)
+export type GenerationStreamEvent<T> =
+  | { event: 'delta', text: string }
+  | { event: 'field', name: string, value: any }
+  | { event: 'complete', id: string, result: T }
+  | { event: 'error', detail: string }
+
+export type PipelineStage =
+  | 'extract' | 'parse_cv' | 'parse_jd' | 'embed' | 'store_vectors' | 'score' | 'questions' | 'persist'
+
+export interface AnalysisJobStage {
+  stage: PipelineStage
+  status: 'pending' | 'running' | 'done' | 'failed'
+  seconds?: number
+}
+
+export interface AnalysisJobResponse {
+  job_id: string
+  status: 'queued' | 'running' | 'completed' | 'failed'
+  status_url?: string
+  current_stage?: PipelineStage | null
+  stages?: AnalysisJobStage[]
+  progress?: number
+  attempts?: number
+  error?: string | null
+  analysis_id?: string | null
+  result?: Partial<UploadCVResponse> | null
 }
 
 export interface AnalysisResponse extends AnalysisData {}